@@ -0,0 +1,121 @@
+import random
+import sys
+import os
+import timeit
+from typing import Callable, List
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(current_dir, "..")))
+
+from my_bot.codec import CaesarCodec
+
+_ALPHABET = (
+    "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    "абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+    "0123456789 .,!?/-🎨"
+)
+
+
+def legacy_encrypt(text: str | int, key: int) -> str:
+    """
+    Посимвольная реализация шифрования, которую заменил CaesarCodec.
+    """
+    text = str(text)
+    encrypted_text = ""
+    key_length = len(str(key))
+
+    for i, char in enumerate(text):
+        shift = int(str(key)[i % key_length])
+        if "a" <= char <= "z":
+            encrypted_text += chr((ord(char) - ord("a") + shift) % 26 + ord("a"))
+        elif "A" <= char <= "Z":
+            encrypted_text += chr((ord(char) - ord("A") + shift) % 26 + ord("A"))
+        elif "а" <= char <= "я":
+            encrypted_text += chr((ord(char) - ord("а") + shift) % 32 + ord("а"))
+        elif "А" <= char <= "Я":
+            encrypted_text += chr((ord(char) - ord("А") + shift) % 32 + ord("А"))
+        else:
+            encrypted_text += char
+
+    return encrypted_text
+
+
+def legacy_decrypt(encrypted_text: str | int, key: int) -> str:
+    """
+    Посимвольная реализация дешифрования, которую заменил CaesarCodec.
+    """
+    encrypted_text = str(encrypted_text)
+    decrypted_text = ""
+    key_length = len(str(key))
+
+    for i, char in enumerate(encrypted_text):
+        shift = int(str(key)[i % key_length])
+        if "a" <= char <= "z":
+            decrypted_text += chr((ord(char) - ord("a") - shift) % 26 + ord("a"))
+        elif "A" <= char <= "Z":
+            decrypted_text += chr((ord(char) - ord("A") - shift) % 26 + ord("A"))
+        elif "а" <= char <= "я":
+            decrypted_text += chr((ord(char) - ord("а") - shift) % 32 + ord("а"))
+        elif "А" <= char <= "Я":
+            decrypted_text += chr((ord(char) - ord("А") - shift) % 32 + ord("А"))
+        else:
+            decrypted_text += char
+
+    return decrypted_text
+
+
+def _random_texts(count: int, length: int, rng: random.Random) -> List[str]:
+    return ["".join(rng.choices(_ALPHABET, k=length)) for _ in range(count)]
+
+
+def check_identical(codec: CaesarCodec, rng: random.Random) -> None:
+    """
+    Проверяет, что CaesarCodec выдаёт тот же результат, что и прежние функции.
+    """
+    keys = [0, 7, 10, 123456789, 5000000001, rng.randrange(10**9, 10**10)]
+    for key in keys:
+        for text in _random_texts(200, rng.randrange(0, 120), rng) + [key, ""]:
+            encrypted = legacy_encrypt(text, key)
+            assert codec.encrypt(text, key) == encrypted, (text, key)
+            assert codec.decrypt(encrypted, key) == legacy_decrypt(encrypted, key)
+        texts = _random_texts(10, 40, rng)
+        assert codec.decrypt_many(texts, key) == [legacy_decrypt(t, key) for t in texts]
+
+
+def _measure(name: str, func: Callable[[], object], number: int) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5))
+    per_call_us = seconds / number * 1_000_000
+    print(f"{name:<40} {per_call_us:>10.2f} мкс")
+    return per_call_us
+
+
+def main() -> None:
+    """
+    Сравнивает скорость CaesarCodec и прежних посимвольных функций.
+    """
+    rng = random.Random(42)
+    codec = CaesarCodec()
+    check_identical(codec, rng)
+    print("Результаты CaesarCodec совпадают с прежними encrypt/decrypt.\n")
+
+    key = 5234567891
+    message = "".join(rng.choices(_ALPHABET, k=60))
+    history = [legacy_encrypt(t, key) for t in _random_texts(10, 60, rng)]
+
+    cases = [
+        ("encrypt chat_id", lambda: legacy_encrypt(key, key), lambda: codec.encrypt(key, key)),
+        ("encrypt message (60 симв.)", lambda: legacy_encrypt(message, key), lambda: codec.encrypt(message, key)),
+        (
+            "decrypt /history (10 строк)",
+            lambda: [legacy_decrypt(t, key) for t in history],
+            lambda: codec.decrypt_many(history, key),
+        ),
+    ]
+    for name, legacy, fast in cases:
+        before = _measure(f"{name}: прежняя реализация", legacy, 2000)
+        after = _measure(f"{name}: CaesarCodec", fast, 2000)
+        print(f"{'ускорение':<40} {before / after:>10.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
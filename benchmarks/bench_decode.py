@@ -0,0 +1,129 @@
+import argparse
+import base64
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(current_dir, "..")))
+
+from stability_API.decode import (
+    CHUNK_SIZE,
+    artifact_bytes,
+    binary_artifact,
+    decode_json_artifacts,
+)
+
+
+def make_response(payload: bytes, content_type: str) -> requests.Response:
+    """
+    Строит ответ requests, тело которого читается из памяти как из сокета.
+
+    Аргументы:
+        payload (bytes): Тело ответа.
+        content_type (str): Значение заголовка Content-Type.
+
+    Возвращает:
+        requests.Response: Ответ с необработанным телом.
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = io.BytesIO(payload)
+    response.headers["Content-Type"] = content_type
+    response.headers["Content-Length"] = str(len(payload))
+    return response
+
+
+def legacy_decode(payload: bytes) -> List[bytes]:
+    """
+    Прежний путь: response.json(), затем b64decode и BytesIO для каждого артефакта.
+    """
+    response = make_response(payload, "application/json")
+    images = []
+    for artifact in response.json()["artifacts"]:
+        img_io = io.BytesIO(base64.b64decode(artifact["base64"]))
+        images.append(img_io.getvalue())
+    return images
+
+
+def streaming_json_decode(payload: bytes) -> List[bytes]:
+    """
+    Потоковый разбор JSON-ответа с декодированием base64 по фрагментам.
+    """
+    response = make_response(payload, "application/json")
+    artifacts = decode_json_artifacts(response.iter_content(CHUNK_SIZE))
+    return [artifact_bytes(artifact) for artifact in artifacts]
+
+
+def binary_decode(payload: bytes) -> List[bytes]:
+    """
+    Ответ на запрос с Accept: image/png, прочитанный в заранее выделенный буфер.
+    """
+    response = make_response(payload, "image/png")
+    return [artifact_bytes(binary_artifact(response))]
+
+
+def measure(
+    decode: Callable[[bytes], List[bytes]], payload: bytes, repeat: int
+) -> Tuple[float, float]:
+    """
+    Возвращает пиковую дополнительную память (МиБ) и среднее время (мс) декодирования.
+    """
+    tracemalloc.start()
+    decode(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode(payload)
+    elapsed = (time.perf_counter() - started) / repeat
+    return peak / (1024 * 1024), elapsed * 1000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Память и время декодирования ответа Stability AI")
+    parser.add_argument("--image-kb", type=int, default=1536, help="Размер изображения в КиБ")
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    images = [os.urandom(args.image_kb * 1024) for _ in range(args.samples)]
+    json_payload = json.dumps(
+        {
+            "artifacts": [
+                {"base64": base64.b64encode(image).decode(), "seed": 0, "finishReason": "SUCCESS"}
+                for image in images
+            ]
+        }
+    ).encode()
+    binary_payload = images[0]
+
+    cases: Dict[str, Tuple[Callable[[bytes], List[bytes]], bytes]] = {
+        "json + b64decode + BytesIO": (legacy_decode, json_payload),
+        "потоковый JSON": (streaming_json_decode, json_payload),
+    }
+    if args.samples == 1:
+        cases["image/png"] = (binary_decode, binary_payload)
+
+    for name, (decode, payload) in cases.items():
+        assert decode(payload) == images, name
+
+    image_mb = args.image_kb * args.samples / 1024
+    print(f"изображений: {args.samples}, суммарно {image_mb:.2f} МиБ")
+    for name, (decode, payload) in cases.items():
+        peak_mb, elapsed_ms = measure(decode, payload, args.repeat)
+        print(
+            f"{name:<28} тело {len(payload) / 2**20:6.2f} МиБ  "
+            f"пик {peak_mb:6.2f} МиБ  время {elapsed_ms:7.2f} мс"
+        )
+
+
+if __name__ == "__main__":
+    main()
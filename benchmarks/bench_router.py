@@ -0,0 +1,99 @@
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(current_dir, "..")))
+
+from telebot import TeleBot, types
+
+from benchmarks.fake_telegram import make_update
+from my_bot.router import Router
+
+_BUTTONS = [
+    "Генерировать изображение 🌄",
+    "Инструкция ❓",
+    "Начать генерацию 🎨",
+    "Вариации 🎲",
+    "Токены 💰",
+    "Вернуться в меню ⬅️",
+]
+
+
+def _noop(message: types.Message) -> None:
+    pass
+
+
+def _linear_bot() -> TeleBot:
+    # Набор фильтров, который был у Bot.register_handlers до таблицы маршрутов
+    bot = TeleBot("123456:bench", threaded=False)
+    bot.message_handler(commands=["start", "menu"])(_noop)
+    for command in ("history", "low", "high"):
+        bot.message_handler(commands=[command])(_noop)
+    bot.message_handler(func=lambda m: m.text == _BUTTONS[0])(_noop)
+    bot.message_handler(func=lambda m: m.text == _BUTTONS[1] or m.text == "/info")(_noop)
+    bot.message_handler(func=lambda m: m.text == _BUTTONS[2])(_noop)
+    bot.message_handler(func=lambda m: m.text == _BUTTONS[3] or m.text == "/variants")(_noop)
+    bot.message_handler(func=lambda m: m.text == _BUTTONS[4] or m.text == "/tokens")(_noop)
+    bot.message_handler(func=lambda m: m.text == _BUTTONS[5])(_noop)
+    bot.message_handler(content_types=["text"])(_noop)
+    bot.message_handler(func=lambda m: True)(_noop)
+    return bot
+
+
+def _routed_bot() -> TeleBot:
+    bot = TeleBot("123456:bench", threaded=False)
+    router = Router(fallback=_noop)
+    router.add(_noop, "/start", "/menu")
+    for command in ("history", "low", "high"):
+        router.add(_noop, f"/{command}")
+    router.add(_noop, _BUTTONS[0])
+    router.add(_noop, _BUTTONS[1], "/info")
+    router.add(_noop, _BUTTONS[2])
+    router.add(_noop, _BUTTONS[3], "/variants")
+    router.add(_noop, _BUTTONS[4], "/tokens")
+    router.add(_noop, _BUTTONS[5])
+    bot.message_handler(content_types=["text"])(router.dispatch)
+    return bot
+
+
+def _measure(bot: TeleBot, messages: List[types.Message], rounds: int) -> float:
+    started = time.perf_counter()
+    for _ in range(rounds):
+        bot.process_new_messages(messages)
+    return (time.perf_counter() - started) / (rounds * len(messages)) * 1e6
+
+
+def run(rounds: int) -> None:
+    """
+    Сравнивает время разбора сообщения перебором фильтров TeleBot и таблицей маршрутов.
+
+    Аргументы:
+        rounds (int): Сколько раз прогнать каждый набор сообщений.
+    """
+    samples = {
+        "команда /start": "/start",
+        "первая кнопка": _BUTTONS[0],
+        "последняя кнопка": _BUTTONS[5],
+        "свободный текст": "a red fox in the snow",
+    }
+    linear, routed = _linear_bot(), _routed_bot()
+    print(f"{'сообщение':<18} {'перебор, мкс':>14} {'таблица, мкс':>14}")
+    for label, text in samples.items():
+        message = types.Update.de_json(json.dumps(make_update(1, 1, text))).message
+        batch = [message] * 100
+        print(f"{label:<18} {_measure(linear, batch, rounds):>14.2f} {_measure(routed, batch, rounds):>14.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарк разбора сообщений по обработчикам")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    run(args.rounds)
+
+
+if __name__ == "__main__":
+    main()
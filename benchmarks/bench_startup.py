@@ -0,0 +1,136 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# Запуск до готовности к polling/webhook: импорт main, настройки, БД и регистрация обработчиков
+_READY_SCRIPT = """
+import time
+started = time.perf_counter()
+import main
+from settings import ProjectSettings
+bot = main.build_bot(ProjectSettings())
+bot.register_handlers()
+print(f"{(time.perf_counter() - started) * 1000:.1f}")
+"""
+
+
+def _environment(tmp_dir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "BOT_TOKEN": "123456:startup",
+            "STABILITY_AI_TOKEN": "startup",
+            "STABILITY_AI_URL": "http://127.0.0.1:9/v1/generation/fake/text-to-image",
+            "DB_PATH": os.path.join(tmp_dir, "startup.db"),
+            "IMAGE_CACHE_DIR": os.path.join(tmp_dir, "image_cache"),
+            "METRICS_ENABLED": "false",
+            "PROFILING_SIGNAL": "false",
+            "HISTORY_MAINTENANCE_INTERVAL": "0",
+        }
+    )
+    return env
+
+
+def import_times(env: Dict[str, str]) -> Tuple[float, List[Tuple[str, float]]]:
+    """
+    Запускает python -X importtime -c "import main" и разбирает вывод.
+
+    Аргументы:
+        env (Dict[str, str]): Переменные окружения процесса.
+
+    Возвращает:
+        Tuple[float, List[Tuple[str, float]]]: Общее время импорта main в мс и
+            время прямых импортов main (вместе с их зависимостями) в мс.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # Модуль печатается после своих зависимостей, поэтому прямые импорты main
+    # идут на уровне 1 перед строкой самого main
+    total = 0.0
+    modules: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        milliseconds = int(cumulative) / 1000
+        if depth == 0:
+            if name.strip() == "main":
+                total = milliseconds
+                break
+            modules = {}
+        elif depth == 1:
+            modules[name.strip()] = milliseconds
+    return total, sorted(modules.items(), key=lambda item: item[1], reverse=True)
+
+
+def ready_time(env: Dict[str, str]) -> Tuple[float, float]:
+    """
+    Замеряет время от старта интерпретатора до готовности бота принимать обновления.
+
+    Аргументы:
+        env (Dict[str, str]): Переменные окружения процесса.
+
+    Возвращает:
+        Tuple[float, float]: Время всего процесса и время внутри процесса после старта интерпретатора, мс.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", _READY_SCRIPT],
+        cwd=_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    wall = (time.perf_counter() - started) * 1000
+    return wall, float(result.stdout.strip().splitlines()[-1])
+
+
+def run(runs: int, top: int) -> None:
+    """
+    Печатает разбивку времени импорта и время холодного и повторного запуска.
+
+    Аргументы:
+        runs (int): Количество повторных запусков для медианы.
+        top (int): Сколько самых медленных модулей показать.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = _environment(tmp_dir)
+
+        total, modules = import_times(env)
+        print(f"import main: {total:.1f} мс")
+        for name, milliseconds in modules[:top]:
+            print(f"  {name:<28} {milliseconds:8.1f} мс")
+
+        first_wall, first_inside = ready_time(env)
+        print(f"первый запуск (новая БД): {first_wall:.1f} мс, из них в процессе {first_inside:.1f} мс")
+        samples = sorted(ready_time(env) for _ in range(runs))
+        wall, inside = samples[len(samples) // 2]
+        print(f"повторный запуск (медиана {runs}): {wall:.1f} мс, из них в процессе {inside:.1f} мс")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Время запуска бота и разбивка времени импорта")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    run(args.runs, args.top)
+
+
+if __name__ == "__main__":
+    main()
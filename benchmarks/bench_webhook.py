@@ -0,0 +1,94 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import peewee as pw
+import requests
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(current_dir, "..")))
+
+from telebot import apihelper
+
+from benchmarks.fake_telegram import FakeTelegramServer, make_update
+from database.common.models import db
+from database.core import crud
+from database.utils.migrations import migrate
+from my_bot.my_bot import Bot
+from my_bot.webhook import SECRET_HEADER, WebhookServer
+
+_TOKEN = "123456:bench"
+_SECRET = "bench-secret"
+_PATH = "/telegram/webhook"
+
+
+def run(updates: int, concurrency: int, bot_threads: int, latency: float) -> None:
+    """
+    Отправляет обновления /tokens на webhook-эндпоинт и замеряет пропускную способность.
+
+    Аргументы:
+        updates (int): Количество обновлений.
+        concurrency (int): Количество одновременных HTTP-клиентов.
+        bot_threads (int): Количество потоков TeleBot.
+        latency (float): Задержка ответов заглушки Telegram в секундах.
+    """
+    telegram = FakeTelegramServer(latency=latency).start()
+    apihelper.API_URL = telegram.api_url
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db.initialize(pw.SqliteDatabase(os.path.join(tmp_dir, "bench.db")))
+        db.connect()
+        migrate(db)
+
+        bot = Bot(_TOKEN, None, crud, bot_threads=bot_threads)
+        bot.register_handlers()
+        server = WebhookServer(bot.bot, "127.0.0.1", 0, _PATH, _SECRET)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.port}{_PATH}"
+
+        session = requests.Session()
+        headers = {SECRET_HEADER: _SECRET, "Content-Type": "application/json"}
+
+        def post(update_id: int) -> float:
+            body = json.dumps(make_update(update_id, 1000 + update_id % 50, "/tokens"))
+            started = time.perf_counter()
+            session.post(url, data=body, headers=headers).raise_for_status()
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            ack_times = sorted(executor.map(post, range(1, updates + 1)))
+        accepted_at = time.perf_counter()
+        done = telegram.wait_for("sendMessage", updates, timeout=120)
+        finished = time.perf_counter()
+
+        rejected = requests.post(url, data="{}", headers={SECRET_HEADER: "wrong"})
+
+        server.shutdown()
+        bot.history_writer.close()
+        db.close()
+    telegram.stop()
+
+    total = finished - started
+    print(f"обновлений: {updates}, клиентов: {concurrency}, потоков TeleBot: {bot_threads}")
+    print(f"приём всех обновлений: {accepted_at - started:.3f} с")
+    print(f"ответ webhook p50: {ack_times[len(ack_times) // 2]:.2f} мс, "
+          f"max: {ack_times[-1]:.2f} мс")
+    print(f"все ответы отправлены: {done}, за {total:.3f} с ({updates / total:.1f} обновлений/с)")
+    print(f"запрос с неверным секретом: HTTP {rejected.status_code}")
+    print(f"webhook: {server.stats()}, telegram: {telegram.stats()['calls']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер пропускной способности webhook-режима")
+    parser.add_argument("--updates", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--bot-threads", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+    run(args.updates, args.concurrency, args.bot_threads, args.latency)
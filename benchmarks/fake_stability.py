@@ -0,0 +1,149 @@
+import base64
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+class FakeStabilityServer:
+    """
+    Локальная заглушка эндпоинта text-to-image Stability AI для нагрузочных замеров.
+
+    Отвечает случайными байтами заданного размера в формате image/png или JSON с
+    base64, в зависимости от заголовка Accept, и с заданной долей ошибок 500.
+
+    Атрибуты:
+        latency (float): Задержка генерации в секундах.
+        error_rate (float): Доля запросов, на которые возвращается ошибка 500.
+        payload_size (int): Размер одного изображения в байтах.
+        url (str): Адрес эндпоинта для ImageGenerationService.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        payload_size: int = 256 * 1024,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        """
+        Инициализирует заглушку.
+
+        Аргументы:
+            latency (float): Задержка генерации в секундах.
+            error_rate (float): Доля запросов, на которые возвращается ошибка 500.
+            payload_size (int): Размер одного изображения в байтах.
+            host (str): Адрес сервера.
+            port (int): Порт сервера, 0 - выбрать свободный.
+        """
+        self.latency: float = latency
+        self.error_rate: float = error_rate
+        self.payload_size: int = payload_size
+        self._image: bytes = os.urandom(payload_size)
+        self._lock = threading.Lock()
+        self._requests: int = 0
+        self._errors: int = 0
+        self._images: int = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self.url: str = (
+            f"http://{host}:{self._server.server_port}/v1/generation/fake/text-to-image"
+        )
+
+    def start(self) -> "FakeStabilityServer":
+        """
+        Запускает сервер в фоновом потоке.
+
+        Возвращает:
+            FakeStabilityServer: Этот же экземпляр.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Останавливает сервер.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает количество запросов, ошибок и отданных изображений.
+
+        Возвращает:
+            Dict[str, int]: Счётчики заглушки.
+        """
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "errors": self._errors,
+                "images": self._images,
+            }
+
+    def _image_for(self, body: Dict[str, Any]) -> bytes:
+        # Одинаковое описание даёт одинаковое изображение, как при фиксированном seed
+        prompt = json.dumps(body.get("text_prompts"), sort_keys=True).encode()
+        return prompt[:64].ljust(64, b"\0") + self._image[64:]
+
+    def _handler_class(self) -> type:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело пишутся отдельно: без TCP_NODELAY ответ ждёт delayed ACK
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if fake.latency:
+                    time.sleep(fake.latency)
+                failed = bool(fake.error_rate) and random.random() < fake.error_rate
+                samples = max(1, int(body.get("samples", 1)))
+                with fake._lock:
+                    fake._requests += 1
+                    if failed:
+                        fake._errors += 1
+                    else:
+                        fake._images += samples
+                if failed:
+                    self._reply(500, "application/json", b'{"message": "fake failure"}')
+                    return
+
+                image = fake._image_for(body)
+                if self.headers.get("Accept") == "image/png":
+                    self._reply(200, "image/png", image, {"Seed": "0", "Finish-Reason": "SUCCESS"})
+                    return
+                encoded = base64.b64encode(image).decode()
+                artifacts: List[Dict[str, Any]] = [
+                    {"base64": encoded, "seed": index, "finishReason": "SUCCESS"}
+                    for index in range(samples)
+                ]
+                self._reply(200, "application/json", json.dumps({"artifacts": artifacts}).encode())
+
+            def _reply(
+                self,
+                status: int,
+                content_type: str,
+                payload: bytes,
+                headers: Optional[Dict[str, str]] = None,
+            ) -> None:
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,237 @@
+import itertools
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+# Методы Bot API, которые возвращают отправленное сообщение
+_MESSAGE_METHODS = {"sendMessage", "sendPhoto", "editMessageText", "editMessageReplyMarkup"}
+
+
+def make_update(
+    update_id: int, chat_id: int, text: str, language_code: str = "ru"
+) -> Dict[str, Any]:
+    """
+    Строит обновление Telegram с текстовым сообщением пользователя.
+
+    Аргументы:
+        update_id (int): Идентификатор обновления.
+        chat_id (int): Идентификатор чата (совпадает с идентификатором пользователя).
+        text (str): Текст сообщения.
+        language_code (str): Язык пользователя.
+
+    Возвращает:
+        Dict[str, Any]: Обновление в формате Bot API.
+    """
+    user = {
+        "id": chat_id,
+        "is_bot": False,
+        "first_name": f"user{chat_id}",
+        "username": f"user{chat_id}",
+        "language_code": language_code,
+    }
+    message: Dict[str, Any] = {
+        "message_id": update_id,
+        "from": user,
+        "chat": {"id": chat_id, "type": "private", "first_name": user["first_name"]},
+        "date": int(time.time()),
+        "text": text,
+    }
+    if text.startswith("/"):
+        command = text.split()[0]
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"update_id": update_id, "message": message}
+
+
+class FakeTelegramServer:
+    """
+    Локальная заглушка Telegram Bot API для офлайн-замеров.
+
+    Отвечает на методы отправки сообщений корректными объектами Message, считает
+    вызовы по методам и объём загруженных данных. Чтобы TeleBot обращался к ней,
+    достаточно присвоить telebot.apihelper.API_URL значение api_url.
+
+    Атрибуты:
+        latency (float): Искусственная задержка каждого ответа в секундах.
+        error_rate (float): Доля запросов, на которые возвращается ошибка 500.
+        api_url (str): Шаблон адреса для telebot.apihelper.API_URL.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        error_rate: float = 0.0,
+    ) -> None:
+        """
+        Инициализирует заглушку.
+
+        Аргументы:
+            latency (float): Искусственная задержка каждого ответа в секундах.
+            host (str): Адрес сервера.
+            port (int): Порт сервера, 0 - выбрать свободный.
+            error_rate (float): Доля запросов, на которые возвращается ошибка 500.
+        """
+        self.latency: float = latency
+        self.error_rate: float = error_rate
+        self._errors: int = 0
+        self._lock = threading.Condition()
+        self._calls: Counter = Counter()
+        self._upload_bytes: int = 0
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self.api_url: str = (
+            f"http://{host}:{self._server.server_port}/bot{{0}}/{{1}}"
+        )
+
+    def start(self) -> "FakeTelegramServer":
+        """
+        Запускает сервер в фоновом потоке.
+
+        Возвращает:
+            FakeTelegramServer: Этот же экземпляр.
+        """
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Останавливает сервер.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def calls(self, method: Optional[str] = None) -> int:
+        """
+        Возвращает количество вызовов метода или всех методов.
+
+        Аргументы:
+            method (Optional[str]): Название метода Bot API.
+
+        Возвращает:
+            int: Количество вызовов.
+        """
+        with self._lock:
+            if method is None:
+                return sum(self._calls.values())
+            return self._calls[method]
+
+    def wait_for(self, method: str, count: int, timeout: float = 60.0) -> bool:
+        """
+        Ждёт, пока метод будет вызван не менее count раз.
+
+        Аргументы:
+            method (str): Название метода Bot API.
+            count (int): Ожидаемое количество вызовов.
+            timeout (float): Максимальное время ожидания в секундах.
+
+        Возвращает:
+            bool: True, если вызовы дождались, False по таймауту.
+        """
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while self._calls[method] < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._lock.wait(remaining)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики вызовов и объём загруженных данных.
+
+        Возвращает:
+            Dict[str, Any]: Статистика заглушки.
+        """
+        with self._lock:
+            return {
+                "calls": dict(self._calls),
+                "errors": self._errors,
+                "upload_bytes": self._upload_bytes,
+            }
+
+    def _respond(self, method: str, params: Dict[str, str], body_size: int) -> Any:
+        with self._lock:
+            self._calls[method] += 1
+            if method in ("sendPhoto", "sendMediaGroup"):
+                self._upload_bytes += body_size
+            self._lock.notify_all()
+        chat_id = int(params.get("chat_id", 0) or 0)
+        if method in _MESSAGE_METHODS:
+            return self._message(chat_id, photo=method == "sendPhoto")
+        if method == "sendMediaGroup":
+            media: List[Any] = json.loads(params.get("media", "[]"))
+            return [self._message(chat_id, photo=True) for _ in media]
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+        return True
+
+    def _message(self, chat_id: int, photo: bool = False) -> Dict[str, Any]:
+        message: Dict[str, Any] = {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+        }
+        if photo:
+            file_id = f"fake-file-{next(self._file_ids)}"
+            message["photo"] = [
+                {"file_id": file_id, "file_unique_id": file_id, "width": 1024, "height": 1024}
+            ]
+        return message
+
+    def _handler_class(self) -> type:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Заголовки и тело пишутся отдельно: без TCP_NODELAY ответ ждёт delayed ACK
+            disable_nagle_algorithm = True
+
+            def _handle(self) -> None:
+                parsed = urlparse(self.path)
+                method = parsed.path.rsplit("/", 1)[-1]
+                params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                length = int(self.headers.get("Content-Length", 0) or 0)
+                body = self.rfile.read(length) if length else b""
+                if body and self.headers.get("Content-Type", "").startswith(
+                    "application/x-www-form-urlencoded"
+                ):
+                    for key, values in parse_qs(body.decode()).items():
+                        params.setdefault(key, values[0])
+                if fake.latency:
+                    time.sleep(fake.latency)
+                if fake.error_rate and random.random() < fake.error_rate:
+                    with fake._lock:
+                        fake._errors += 1
+                    status = 500
+                    payload = json.dumps(
+                        {"ok": False, "error_code": 500, "description": "Internal Server Error"}
+                    ).encode()
+                else:
+                    status = 200
+                    payload = json.dumps(
+                        {"ok": True, "result": fake._respond(method, params, len(body))}
+                    ).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,290 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+import peewee as pw
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.abspath(os.path.join(current_dir, "..")))
+
+from telebot import apihelper, types
+
+from benchmarks.fake_stability import FakeStabilityServer
+from benchmarks.fake_telegram import FakeTelegramServer, make_update
+from database.common.models import db
+from database.core import crud
+from database.utils.migrations import migrate
+from monitoring.metrics import MetricsRegistry
+from monitoring.profiling import Profiler
+from my_bot.my_bot import Bot
+from my_bot.scheduler import FairScheduler
+from my_bot.stats import percentile
+from stability_API.cache import ImageResultCache
+from stability_API.stability_ai import ImageGenerationService
+
+_TOKEN = "123456:load-test"
+_PROMPTS = [
+    "a red fox in the snow",
+    "lighthouse at dawn",
+    "a cat astronaut",
+    "watercolor city street",
+    "mountain lake, oil painting",
+    "robot reading a book",
+]
+
+
+class TimedSqliteDatabase(pw.SqliteDatabase):
+    """
+    SqliteDatabase, которая считает количество и суммарное время SQL-запросов.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.stats_lock = threading.Lock()
+        self.query_count: int = 0
+        self.query_seconds: float = 0.0
+
+    def execute_sql(self, sql: str, params: Any = None, commit: Any = None) -> Any:
+        started = time.perf_counter()
+        try:
+            return super().execute_sql(sql, params)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.stats_lock:
+                self.query_count += 1
+                self.query_seconds += elapsed
+
+
+class HandlerTimer:
+    """
+    Обёртка над обработчиками TeleBot: замеряет их время и сообщает о завершении.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._done: Dict[int, threading.Event] = {}
+        self._sent_at: Dict[int, float] = {}
+        self.handler_ms: Dict[str, List[float]] = {}
+        self.update_ms: List[float] = []
+
+    def install(self, bot: Bot) -> None:
+        for handlers in (bot.bot.message_handlers, bot.router.handlers):
+            for handler in handlers:
+                handler["function"] = self._wrap(handler["function"])
+
+    def expect(self, message_id: int) -> threading.Event:
+        event = threading.Event()
+        with self._lock:
+            self._done[message_id] = event
+            self._sent_at[message_id] = time.perf_counter()
+        return event
+
+    def _wrap(self, function: Callable[[types.Message], None]) -> Callable[[types.Message], None]:
+        name = function.__name__
+
+        def timed(message: types.Message) -> None:
+            started = time.perf_counter()
+            try:
+                function(message)
+            finally:
+                finished = time.perf_counter()
+                with self._lock:
+                    self.handler_ms.setdefault(name, []).append((finished - started) * 1000)
+                    sent_at = self._sent_at.pop(message.message_id, None)
+                    if sent_at is not None:
+                        self.update_ms.append((finished - sent_at) * 1000)
+                    event = self._done.pop(message.message_id, None)
+                if event is not None:
+                    event.set()
+
+        return timed
+
+
+def _summary(values: List[float]) -> str:
+    ordered = sorted(values)
+    return (
+        f"n={len(ordered):<5} p50={percentile(ordered, 50):8.2f}  "
+        f"p95={percentile(ordered, 95):8.2f}  p99={percentile(ordered, 99):8.2f} мс"
+    )
+
+
+def run(args: argparse.Namespace) -> None:
+    """
+    Прогоняет синтетический поток обновлений через обработчики бота и печатает отчёт.
+
+    Аргументы:
+        args (argparse.Namespace): Параметры нагрузки из командной строки.
+    """
+    random.seed(args.seed)
+    stability = FakeStabilityServer(
+        latency=args.stability_latency,
+        error_rate=args.stability_error_rate,
+        payload_size=args.payload_kb * 1024,
+    ).start()
+    telegram = FakeTelegramServer(
+        latency=args.telegram_latency, error_rate=args.telegram_error_rate
+    ).start()
+    apihelper.API_URL = telegram.api_url
+
+    tmp_dir = tempfile.mkdtemp(prefix="load_test_")
+    database = TimedSqliteDatabase(
+        os.path.join(tmp_dir, "load.db"),
+        pragmas={"journal_mode": "wal", "synchronous": "normal"},
+        check_same_thread=False,
+    )
+    db.initialize(database)
+    db.connect()
+    migrate(db)
+
+    cache = ImageResultCache(disk_dir=None) if args.cache else None
+    service = ImageGenerationService(
+        "fake-token",
+        stability.url,
+        pool_size=args.workers,
+        max_retries=args.retries,
+        backoff_base=0.05,
+        cache=cache,
+    )
+    metrics = MetricsRegistry() if args.metrics else None
+    profiler = None
+    if args.profile_rate > 0:
+        profiler = Profiler(
+            enabled=True,
+            sample_rate=args.profile_rate,
+            output_dir=os.path.join(tmp_dir, "profiles"),
+        )
+    bot = Bot(
+        _TOKEN,
+        service,
+        crud,
+        generation_workers=args.workers,
+        generation_queue_size=args.users * args.iterations * 2,
+        bot_threads=args.bot_threads,
+        scheduler=FairScheduler(
+            max_pending=args.users * args.iterations * 2,
+            user_rate=args.user_rate,
+            global_rate=args.global_rate,
+        ),
+        metrics=metrics,
+        profiler=profiler,
+    )
+    bot.register_handlers()
+    timer = HandlerTimer()
+    timer.install(bot)
+    bot.generation_pool.start()
+
+    message_ids = iter(range(1, 10**9))
+    ids_lock = threading.Lock()
+
+    def send(chat_id: int, text: str) -> None:
+        with ids_lock:
+            update_id = next(message_ids)
+        event = timer.expect(update_id)
+        update = types.Update.de_json(json.dumps(make_update(update_id, chat_id, text, "en")))
+        bot.bot.process_new_updates([update])
+        event.wait(60)
+
+    def user_session(chat_id: int) -> None:
+        for _ in range(args.iterations):
+            send(chat_id, "/tokens")
+            if random.random() < args.variant_share:
+                send(chat_id, "/variants")
+            else:
+                send(chat_id, "Начать генерацию 🎨")
+            send(chat_id, random.choice(_PROMPTS))
+            send(chat_id, "/history")
+            send(chat_id, "/low")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as executor:
+        list(executor.map(user_session, range(10_000, 10_000 + args.users)))
+    handlers_done = time.perf_counter()
+
+    while True:
+        pool_stats = bot.generation_pool.stats()
+        if pool_stats["queue_depth"] == 0 and pool_stats["busy_workers"] == 0:
+            break
+        time.sleep(0.05)
+    finished = time.perf_counter()
+    bot.shutdown()
+
+    elapsed = finished - started
+    generated = pool_stats["completed"] + pool_stats["failed"]
+    service_stats = service.stats()
+    print(
+        f"пользователей: {args.users}, итераций: {args.iterations}, "
+        f"воркеров: {args.workers}, потоков TeleBot: {args.bot_threads}"
+    )
+    print(f"обработчики завершены за {handlers_done - started:.2f} с, генерации - за {elapsed:.2f} с")
+    print(f"задержка обновления (очередь TeleBot + обработчик): {_summary(timer.update_ms)}")
+    print("время обработчиков:")
+    for name, values in sorted(timer.handler_ms.items()):
+        print(f"  {name:<28} {_summary(values)}")
+    print(
+        f"генерации: {pool_stats['completed']} успешно, {pool_stats['failed']} с ошибкой, "
+        f"{pool_stats['rejected']} отклонено; {generated / elapsed:.2f} заданий/с"
+    )
+    print(
+        f"  ожидание в очереди p50={pool_stats['wait_ms_p50']} p95={pool_stats['wait_ms_p95']} мс, "
+        f"выполнение p50={pool_stats['run_ms_p50']} p95={pool_stats['run_ms_p95']} мс"
+    )
+    print(
+        f"Stability: {stability.stats()}, повторы: {service_stats['retries']}, "
+        f"объединено запросов: {service_stats['single_flight_coalesced']}"
+    )
+    print(f"Telegram: {telegram.stats()}")
+    with database.stats_lock:
+        print(
+            f"БД: {database.query_count} запросов, {database.query_seconds * 1000:.1f} мс суммарно, "
+            f"{database.query_seconds * 1000 / max(1, database.query_count):.3f} мс на запрос"
+        )
+
+    if metrics is not None:
+        render_started = time.perf_counter()
+        exposition = metrics.render()
+        print(
+            f"метрики: {len(exposition.splitlines())} строк, "
+            f"снятие за {(time.perf_counter() - render_started) * 1000:.2f} мс"
+        )
+
+    if profiler is not None:
+        print(f"профили: {profiler.output_dir}")
+
+    db.close()
+    stability.stop()
+    telegram.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Нагрузочный прогон бота на локальных заглушках API")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--bot-threads", type=int, default=8)
+    parser.add_argument("--variant-share", type=float, default=0.2, help="Доля генераций в режиме вариаций")
+    parser.add_argument("--stability-latency", type=float, default=0.2)
+    parser.add_argument("--stability-error-rate", type=float, default=0.02)
+    parser.add_argument("--payload-kb", type=int, default=512)
+    parser.add_argument("--telegram-latency", type=float, default=0.01)
+    parser.add_argument("--telegram-error-rate", type=float, default=0.0)
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument("--user-rate", type=float, default=0.0)
+    parser.add_argument("--global-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="Включить кэш результатов в памяти")
+    parser.add_argument("--metrics", action="store_true", help="Включить сбор метрик Prometheus")
+    parser.add_argument(
+        "--profile-rate", type=float, default=0.0, help="Доля обновлений под cProfile и tracemalloc"
+    )
+    parser.add_argument("--seed", type=int, default=1)
+    run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,62 @@
-from datetime import datetime
+import functools
+import sys
+import threading
+from datetime import date, datetime
+from typing import Any, Callable, Optional, Tuple, TypeVar
 import peewee as pw
 
-db = pw.SqliteDatabase("lecture.db")
+# Модели привязаны к прокси, чтобы database.core.create_engine мог подменить
+# движок и прагмы по настройкам проекта. По умолчанию - файл lecture.db.
+db = pw.DatabaseProxy()
+db.initialize(pw.SqliteDatabase("lecture.db"))
+
+# Количество токенов, которое пользователь получает каждый день
+DAILY_TOKENS = 50
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def release_connection() -> bool:
+    """
+    Возвращает соединение текущего потока в пул, если база подключена через пул.
+
+    Пул отдаёт соединения потокам и ждёт их возврата через db.close(), а потоки
+    обработчиков TeleBot, воркеры генерации и фоновые писатели живут всё время
+    работы бота. Поэтому соединение возвращается после каждой единицы работы.
+    Без пула ничего не делает: постоянное соединение потока сохраняет кэш страниц.
+
+    Возвращает:
+    - bool: True, если соединение было возвращено в пул.
+    """
+    # Пул может использоваться, только если модуль playhouse.pool уже загружен
+    pool = sys.modules.get("playhouse.pool")
+    engine = db.obj
+    if pool is None or not isinstance(engine, pool.PooledDatabase):
+        return False
+    if engine.in_transaction():
+        return False
+    return engine.close()
+
+
+def releases_connection(function: F) -> F:
+    """
+    Оборачивает функцию так, что после вызова соединение потока возвращается в пул.
+
+    Параметры:
+    - function: F - Обработчик или задание.
+
+    Возвращает:
+    - F: Обёрнутая функция.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        try:
+            return function(*args, **kwargs)
+        finally:
+            release_connection()
+
+    return wrapper  # type: ignore[return-value]
 
 
 class ModelBase(pw.Model):
@@ -27,8 +82,15 @@ class History(ModelBase):
     - token_count: int - Количество доступных токенов для пользователя (по умолчанию 10).
     - last_generated_at: datetime - Время последней генерации токенов.
 
+    Индексы:
+    - (chat_id, last_generated_at) - выборки истории пользователя по chat_id
+      с сортировкой по времени запроса.
+    - (last_generated_at) - выборка старых строк для переноса в архив
+      (database.utils.maintenance).
+
     Методы:
-    - update_token_count(cls, chat_id): Обновляет количество доступных токенов для пользователя.
+    - update_token_count(cls, chat_id): Списывает токен пользователя через UserQuota.
+    - requests_page(cls, chat_id, limit, before, after): Страница запросов по курсору.
     """
 
     chat_id = pw.IntegerField()
@@ -38,30 +100,323 @@ class History(ModelBase):
     token_count = pw.IntegerField(default=10)
     last_generated_at = pw.DateTimeField(default=datetime.now)
 
+    class Meta:
+        indexes = (
+            (("chat_id", "last_generated_at"), False),
+            (("last_generated_at",), False),
+        )
+
     @classmethod
-    def update_token_count(cls, chat_id):
+    def update_token_count(cls, chat_id: int) -> bool:
         """
-        Обновляет количество доступных токенов для пользователя.
+        Списывает один токен пользователя.
+
+        Оставлен для совместимости: токены хранятся в отдельной таблице UserQuota.
 
         Параметры:
         - chat_id: int - Идентификатор чата пользователя.
 
         Возвращает:
-        - bool: True, если обновление прошло успешно, False в противном случае.
+        - bool: True, если токен списан, False, если токенов не осталось.
         """
-        try:
-            user_history = cls.get(cls.chat_id == chat_id)
-
-            current_date = datetime.now().date()
-            if user_history.last_generated_at.date() < current_date:
-                user_history.token_count = 50
-
-            if user_history.token_count > 0:
-                user_history.token_count -= 1
-                user_history.last_generated_at = datetime.now()
-                user_history.save()
-                return True
-            else:
-                return False
-        except cls.DoesNotExist:
+        return UserQuota.consume(int(chat_id))
+
+    @classmethod
+    def requests_page(
+        cls,
+        chat_id: int,
+        limit: int = 10,
+        before: Optional[Tuple[datetime, int]] = None,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> pw.ModelSelect:
+        """
+        Возвращает страницу запросов пользователя без команд по ключу (last_generated_at, id).
+
+        Вместо OFFSET страница начинается сразу за курсором, поэтому это один
+        диапазонный проход по индексу (chat_id, last_generated_at) на любой глубине
+        истории: SQLite хранит id (rowid) в каждой записи индекса.
+
+        Параметры:
+        - chat_id: int - Идентификатор чата пользователя.
+        - limit: int - Максимальное количество запросов.
+        - before: Optional[Tuple[datetime, int]] - Курсор: вернуть более старые запросы,
+          от новых к старым.
+        - after: Optional[Tuple[datetime, int]] - Курсор: вернуть более новые запросы,
+          от старых к новым.
+
+        Возвращает:
+        - ModelSelect: Запрос страницы.
+        """
+        key = pw.Tuple(cls.last_generated_at, cls.id)
+        condition = (cls.chat_id == chat_id) & ~(cls.message.startswith("/"))
+        if after is not None:
+            return (
+                cls.select()
+                .where(condition & (key > pw.Tuple(*after)))
+                .order_by(cls.last_generated_at.asc(), cls.id.asc())
+                .limit(limit)
+            )
+        if before is not None:
+            condition &= key < pw.Tuple(*before)
+        return (
+            cls.select()
+            .where(condition)
+            .order_by(cls.last_generated_at.desc(), cls.id.desc())
+            .limit(limit)
+        )
+
+
+class MonthlyRequests(ModelBase):
+    """
+    Количество запросов пользователя за месяц без учёта команд, начинающихся с '/'.
+
+    Обновляется в той же транзакции, что и вставка строк History, поэтому
+    /low и /high читают готовый агрегат вместо группировки всей истории.
+
+    Поля:
+    - chat_id: int - Идентификатор чата пользователя.
+    - month: str - Месяц в формате 'YYYY-MM'.
+    - total_requests: int - Количество запросов за месяц.
+
+    Методы:
+    - record(cls, rows): Учитывает новые строки History.
+    - ranked(cls, chat_id, descending): Месяцы пользователя по количеству запросов.
+    - lowest(cls, chat_id): Месяц с наименьшим количеством запросов.
+    - highest(cls, chat_id): Месяц с наибольшим количеством запросов.
+    """
+
+    chat_id = pw.IntegerField()
+    month = pw.CharField(max_length=7)
+    total_requests = pw.IntegerField(default=0)
+
+    class Meta:
+        primary_key = pw.CompositeKey("chat_id", "month")
+        indexes = ((("chat_id", "total_requests", "month"), False),)
+
+    @classmethod
+    def record(cls, rows: list) -> None:
+        """
+        Увеличивает счётчики месяцев для новых строк History.
+
+        Должен вызываться внутри транзакции, в которой вставляются сами строки.
+
+        Параметры:
+        - rows: list - Словари с полями chat_id, message и last_generated_at.
+        """
+        counts: dict = {}
+        for row in rows:
+            if str(row["message"]).startswith("/"):
+                continue
+            key = (int(row["chat_id"]), row["last_generated_at"].strftime("%Y-%m"))
+            counts[key] = counts.get(key, 0) + 1
+        for (chat_id, month), count in counts.items():
+            cls.insert(chat_id=chat_id, month=month, total_requests=count).on_conflict(
+                conflict_target=[cls.chat_id, cls.month],
+                update={cls.total_requests: cls.total_requests + count},
+            ).execute()
+
+    @classmethod
+    def ranked(cls, chat_id: int, descending: bool = False) -> pw.ModelSelect:
+        """
+        Возвращает месяцы пользователя, упорядоченные по количеству запросов.
+
+        Параметры:
+        - chat_id: int - Идентификатор чата пользователя.
+        - descending: bool - Сортировать от большего количества к меньшему.
+
+        Возвращает:
+        - ModelSelect: Запрос по индексу (chat_id, total_requests, month).
+        """
+        if descending:
+            order = (cls.total_requests.desc(), cls.month.desc())
+        else:
+            order = (cls.total_requests, cls.month)
+        return cls.select().where(cls.chat_id == chat_id).order_by(*order)
+
+    @classmethod
+    def lowest(cls, chat_id: int) -> "MonthlyRequests | None":
+        """
+        Возвращает месяц с наименьшим количеством запросов пользователя.
+
+        Параметры:
+        - chat_id: int - Идентификатор чата пользователя.
+
+        Возвращает:
+        - MonthlyRequests | None: Запись месяца или None, если запросов нет.
+        """
+        return cls.ranked(chat_id).first()
+
+    @classmethod
+    def highest(cls, chat_id: int) -> "MonthlyRequests | None":
+        """
+        Возвращает месяц с наибольшим количеством запросов пользователя.
+
+        Параметры:
+        - chat_id: int - Идентификатор чата пользователя.
+
+        Возвращает:
+        - MonthlyRequests | None: Запись месяца или None, если запросов нет.
+        """
+        return cls.ranked(chat_id, descending=True).first()
+
+
+class UserQuota(ModelBase):
+    """
+    Дневная квота токенов пользователя, одна строка на чат.
+
+    Списание выполняется одним условным UPDATE, поэтому параллельные обработчики
+    не могут уйти в минус. Ежедневное пополнение выполняется одним запросом для
+    всех пользователей при первом обращении в новые сутки.
+
+    Поля:
+    - chat_id: int - Идентификатор чата пользователя.
+    - token_count: int - Количество оставшихся на сегодня токенов.
+    - refilled_on: date - Дата последнего пополнения.
+
+    Методы:
+    - consume(cls, chat_id, amount): Атомарно списывает токены.
+    - refund(cls, chat_id, amount): Возвращает списанные токены.
+    - remaining(cls, chat_id): Возвращает количество оставшихся токенов.
+    - refill_daily(cls): Пополняет квоты всех пользователей, не пополненные сегодня.
+    """
+
+    chat_id = pw.IntegerField(primary_key=True)
+    token_count = pw.IntegerField(default=DAILY_TOKENS)
+    refilled_on = pw.DateField(default=date.today)
+
+    _refill_lock = threading.Lock()
+    _refilled_for = None
+
+    @classmethod
+    def refill_daily(cls) -> int:
+        """
+        Пополняет квоты всех пользователей, которые ещё не пополнялись сегодня.
+
+        Возвращает:
+        - int: Количество пополненных квот.
+        """
+        today = date.today()
+        return (
+            cls.update(token_count=DAILY_TOKENS, refilled_on=today)
+            .where(cls.refilled_on < today)
+            .execute()
+        )
+
+    @classmethod
+    def _ensure_refilled(cls) -> None:
+        today = date.today()
+        if cls._refilled_for == today:
+            return
+        with cls._refill_lock:
+            if cls._refilled_for != today:
+                cls.refill_daily()
+                cls._refilled_for = today
+
+    @classmethod
+    def consume(cls, chat_id: int, amount: int = 1) -> bool:
+        """
+        Атомарно списывает токены, если их достаточно.
+
+        Параметры:
+        - chat_id: int - Идентификатор чата пользователя.
+        - amount: int - Количество списываемых токенов.
+
+        Возвращает:
+        - bool: True, если токены списаны, False, если их недостаточно.
+        """
+        cls._ensure_refilled()
+        query = cls.update(token_count=cls.token_count - amount).where(
+            (cls.chat_id == chat_id) & (cls.token_count >= amount)
+        )
+        if query.execute():
+            return True
+        if amount > DAILY_TOKENS:
             return False
+        created = (
+            cls.insert(chat_id=chat_id, token_count=DAILY_TOKENS - amount)
+            .on_conflict_ignore()
+            .as_rowcount()
+            .execute()
+        )
+        # Строка могла появиться в параллельном обработчике, повторяем списание
+        return bool(created) or bool(query.execute())
+
+    @classmethod
+    def refund(cls, chat_id: int, amount: int = 1) -> None:
+        """
+        Возвращает токены, списанные за неудавшуюся генерацию.
+
+        Параметры:
+        - chat_id: int - Идентификатор чата пользователя.
+        - amount: int - Количество возвращаемых токенов.
+        """
+        cls.update(token_count=pw.fn.MIN(cls.token_count + amount, DAILY_TOKENS)).where(
+            cls.chat_id == chat_id
+        ).execute()
+
+    @classmethod
+    def remaining(cls, chat_id: int) -> int:
+        """
+        Возвращает количество оставшихся на сегодня токенов.
+
+        Параметры:
+        - chat_id: int - Идентификатор чата пользователя.
+
+        Возвращает:
+        - int: Количество токенов. Для нового пользователя - полная дневная квота.
+        """
+        cls._ensure_refilled()
+        quota = cls.get_or_none(cls.chat_id == chat_id)
+        return quota.token_count if quota is not None else DAILY_TOKENS
+
+
+class ChatState(ModelBase):
+    """
+    Сохранённое состояние диалога с пользователем.
+
+    Используется хранилищем сессий бота, чтобы состояние чата переживало перезапуск.
+
+    Поля:
+    - chat_id: int - Идентификатор чата пользователя.
+    - is_generating: bool - Ожидает ли бот описание изображения от пользователя.
+    - samples: int - Сколько вариантов изображения сгенерировать по описанию.
+    - updated_at: float - Время последнего обращения (unix time).
+    """
+
+    chat_id = pw.IntegerField(primary_key=True)
+    is_generating = pw.BooleanField(default=False)
+    samples = pw.IntegerField(default=1)
+    updated_at = pw.FloatField()
+
+
+class TelegramFile(ModelBase):
+    """
+    Файл, уже загруженный в Telegram, и его идентификатор для повторной отправки.
+
+    Поля:
+    - content_hash: str - SHA-256 содержимого файла.
+    - file_id: str - Идентификатор файла, который вернул Telegram.
+    - size: int - Размер файла в байтах.
+    """
+
+    content_hash = pw.CharField(max_length=64, primary_key=True)
+    file_id = pw.TextField()
+    size = pw.IntegerField()
+
+
+class Translation(ModelBase):
+    """
+    Сохранённый перевод текста, чтобы не обращаться к переводчику повторно.
+
+    Поля:
+    - source: str - Исходный текст.
+    - target_lang: str - Язык перевода.
+    - text: str - Переведённый текст.
+    """
+
+    source = pw.TextField()
+    target_lang = pw.CharField(max_length=8)
+    text = pw.TextField()
+
+    class Meta:
+        primary_key = pw.CompositeKey("source", "target_lang")
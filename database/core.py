@@ -1,3 +1,68 @@
+from typing import Any, Dict
+
+import peewee as pw
+
+from database.common.models import db
 from database.utils.CRUD import CRUDInterface
 
 crud = CRUDInterface()
+
+
+def sqlite_pragmas(settings: Any) -> Dict[str, Any]:
+    """
+    Собирает прагмы SQLite из настроек проекта.
+
+    Параметры:
+    - settings: ProjectSettings - Настройки проекта.
+
+    Возвращает:
+    - Dict[str, Any]: Прагмы, применяемые к каждому новому соединению.
+    """
+    # auto_vacuum действует, только если задан до создания первой таблицы,
+    # поэтому стоит раньше journal_mode; для существующей базы его включает
+    # database.utils.maintenance.enable_incremental_vacuum
+    return {
+        "auto_vacuum": settings.db_auto_vacuum,
+        "journal_mode": settings.db_journal_mode,
+        "synchronous": settings.db_synchronous,
+        "cache_size": settings.db_cache_size,
+        "mmap_size": settings.db_mmap_size,
+        "busy_timeout": settings.db_busy_timeout,
+    }
+
+
+def create_engine(settings: Any) -> pw.Database:
+    """
+    Создаёт движок базы данных по настройкам проекта и привязывает к нему модели.
+
+    В режиме WAL читатели не ждут завершения записи. Если задан
+    db_pool_max_connections, каждый поток берёт собственное соединение из пула
+    и возвращает его при закрытии (db.close()), а при исчерпании пула ждёт до
+    db_pool_timeout секунд. Обработчики, задания генерации, перевод и фоновая
+    запись истории возвращают соединение после каждой единицы работы
+    (database.common.models.release_connection), поэтому пулу достаточно
+    соединений по числу одновременно работающих потоков, а не всех созданных.
+    Иначе Peewee открывает по соединению на поток.
+
+    Параметры:
+    - settings: ProjectSettings - Настройки проекта.
+
+    Возвращает:
+    - pw.Database: Созданный движок, к которому привязан прокси db.
+    """
+    pragmas = sqlite_pragmas(settings)
+    if settings.db_pool_max_connections > 0:
+        from playhouse.pool import PooledSqliteDatabase
+
+        engine: pw.Database = PooledSqliteDatabase(
+            settings.db_path,
+            pragmas=pragmas,
+            max_connections=settings.db_pool_max_connections,
+            stale_timeout=settings.db_pool_stale_timeout,
+            timeout=settings.db_pool_timeout,
+            check_same_thread=False,
+        )
+    else:
+        engine = pw.SqliteDatabase(settings.db_path, pragmas=pragmas)
+    db.initialize(engine)
+    return engine
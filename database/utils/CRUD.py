@@ -1,30 +1,61 @@
 import sys
 import os
+import atexit
 import logging
+import threading
+import time
 
-current_dir = os.path.dirname(os.path.abspath(__file__))
-database_dir = os.path.join(current_dir, "..", "..", "database")
-sys.path.append(database_dir)
+if not __package__:
+    # Файл запущен напрямую (python database/utils/CRUD.py): пакеты проекта ищутся от корня
+    sys.path.append(
+        os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+    )
 
-from typing import Dict, TypeVar
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, TypeVar
 from peewee import ModelSelect
-from common.models import db, History
+from database.common.models import db, History, MonthlyRequests, release_connection
 import peewee as pw
 
 T = TypeVar("T")
 
-# Настройка логгера
-logging.basicConfig(
-    filename="error.log",
-    level=logging.ERROR,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-)
+
+def _insert_rows(db_instance: pw.Database, model: pw.Model, *data: Dict[str, T]) -> None:
+    """
+    Сохраняет строки одной транзакцией, не перехватывая ошибки.
+
+    Для модели History в той же транзакции обновляются месячные агрегаты MonthlyRequests.
+    Переданные словари не изменяются, поэтому ту же пачку можно сохранить повторно.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+    - model: pw.Model - Модель Peewee.
+    - *data: Dict[str, T] - Данные для сохранения.
+
+    Исключения:
+    - pw.PeeweeError: Если строки не удалось сохранить; транзакция откатывается.
+    """
+    rows = []
+    for entry in data:
+        row = dict(entry)
+        if "token_count" in row:
+            row["token_count"] = int(row["token_count"]) - 1
+        if model is History:
+            row.setdefault("last_generated_at", datetime.now())
+        rows.append(row)
+    with db_instance.atomic():
+        model.insert_many(rows).execute()
+        if model is History:
+            MonthlyRequests.record(rows)
 
 
 def _store_data(db_instance: pw.Database, model: pw.Model, *data: Dict[str, T]) -> None:
     """
     Сохраняет данные в базе данных.
 
+    Для модели History в той же транзакции обновляются месячные агрегаты MonthlyRequests.
+
     Параметры:
     - db_instance: pw.Database - Экземпляр базы данных.
     - model: pw.Model - Модель Peewee.
@@ -33,15 +64,11 @@ def _store_data(db_instance: pw.Database, model: pw.Model, *data: Dict[str, T])
     Возвращает:
     - None
     """
-    with db_instance.atomic():
-        for entry in data:
-            if "token_count" in entry:
-                entry["token_count"] = int(entry["token_count"]) - 1
-        try:
-            model.insert_many(data).execute()
-            logging.info("Data stored successfully.")
-        except Exception as e:
-            logging.error(f"Error storing data: {e}")
+    try:
+        _insert_rows(db_instance, model, *data)
+        logging.info("Data stored successfully.")
+    except Exception as e:
+        logging.error(f"Error storing data: {e}")
 
 
 def _retrieve_all_data(
@@ -64,6 +91,180 @@ def _retrieve_all_data(
     return response
 
 
+class BufferedWriter:
+    """
+    Буферизованная запись строк в базу данных в фоновом потоке.
+
+    Обработчики добавляют строки в буфер в памяти, а фоновый поток сохраняет их
+    одной транзакцией, когда в буфере набирается batch_size строк или проходит
+    flush_interval секунд. Если пачка не сохранилась, строки записываются по одной,
+    чтобы одна ошибочная строка не лишила записи остальные. При остановке буфер
+    сбрасывается полностью.
+
+    Атрибуты:
+    - model: pw.Model - Модель Peewee, в которую записываются строки.
+    - batch_size: int - Количество строк, при котором буфер сбрасывается сразу.
+    - flush_interval: float - Максимальное время хранения строки в буфере, в секундах.
+    """
+
+    def __init__(
+        self,
+        db_instance: pw.Database,
+        model: pw.Model,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+    ) -> None:
+        """
+        Параметры:
+        - db_instance: pw.Database - Экземпляр базы данных.
+        - model: pw.Model - Модель Peewee.
+        - batch_size: int - Количество строк, при котором буфер сбрасывается сразу.
+        - flush_interval: float - Максимальное время хранения строки в буфере, в секундах.
+        """
+        self.db_instance = db_instance
+        self.model = model
+        self.batch_size: int = max(1, batch_size)
+        self.flush_interval: float = flush_interval
+        self._buffer: List[Dict[str, Any]] = []
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._closed: bool = False
+        self._flushes: int = 0
+        self._rows_written: int = 0
+        self._failed_batches: int = 0
+        self._rows_failed: int = 0
+        self._flush_times: Deque[float] = deque(maxlen=500)
+
+    def start(self) -> "BufferedWriter":
+        """
+        Запускает фоновый поток записи и регистрирует сброс буфера при завершении процесса.
+
+        Возвращает:
+        - BufferedWriter: Этот же экземпляр.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="history-writer", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self.close)
+        return self
+
+    def add(self, entry: Dict[str, T]) -> None:
+        """
+        Добавляет строку в буфер без обращения к базе данных.
+
+        После остановки записи строка сохраняется сразу. Время запроса History
+        проставляется здесь, а не при сбросе буфера, чтобы оно не отставало на
+        flush_interval и строки шли по порядку.
+
+        Параметры:
+        - entry: Dict[str, T] - Данные строки.
+        """
+        if self.model is History:
+            entry.setdefault("last_generated_at", datetime.now())
+        with self._condition:
+            if not self._closed:
+                self._buffer.append(entry)
+                if len(self._buffer) >= self.batch_size:
+                    self._condition.notify()
+                return
+        _store_data(self.db_instance, self.model, entry)
+
+    def flush(self) -> int:
+        """
+        Сохраняет все строки из буфера одной транзакцией.
+
+        Если транзакция не прошла, строки сохраняются по одной; строки, которые
+        не удалось сохранить и так, записываются в лог и учитываются в stats().
+
+        Возвращает:
+        - int: Количество сохранённых строк.
+        """
+        with self._flush_lock:
+            with self._condition:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            started = time.monotonic()
+            batch_failed = False
+            failed = 0
+            try:
+                _insert_rows(self.db_instance, self.model, *batch)
+            except Exception as e:
+                batch_failed = True
+                logging.error(f"Error storing batch of {len(batch)} rows, retrying one by one: {e}")
+                for entry in batch:
+                    try:
+                        _insert_rows(self.db_instance, self.model, entry)
+                    except Exception as row_error:
+                        failed += 1
+                        logging.error(f"Error storing row: {row_error}")
+            elapsed_ms = (time.monotonic() - started) * 1000
+            written = len(batch) - failed
+            with self._condition:
+                self._flushes += 1
+                self._rows_written += written
+                if batch_failed:
+                    self._failed_batches += 1
+                self._rows_failed += failed
+                self._flush_times.append(elapsed_ms)
+            return written
+
+    def close(self) -> None:
+        """
+        Останавливает фоновый поток и сохраняет оставшиеся строки.
+        """
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает глубину буфера, длительность сбросов и количество ошибок записи.
+
+        Возвращает:
+        - Dict[str, Any]: Статистика записи.
+        """
+        with self._condition:
+            flush_times = sorted(self._flush_times)
+            return {
+                "buffer_depth": len(self._buffer),
+                "flushes": self._flushes,
+                "rows_written": self._rows_written,
+                "failed_batches": self._failed_batches,
+                "rows_failed": self._rows_failed,
+                "flush_ms_p50": round(flush_times[len(flush_times) // 2], 2)
+                if flush_times
+                else 0.0,
+                "flush_ms_max": round(flush_times[-1], 2) if flush_times else 0.0,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                deadline = time.monotonic() + self.flush_interval
+                while (
+                    not self._closed
+                    and len(self._buffer) < self.batch_size
+                    and time.monotonic() < deadline
+                ):
+                    self._condition.wait(max(0.0, deadline - time.monotonic()))
+                closed = self._closed
+            try:
+                self.flush()
+            finally:
+                release_connection()
+            if closed:
+                return
+
+
 class CRUDInterface:
     """
     Интерфейс для выполнения операций CRUD.
@@ -71,6 +272,7 @@ class CRUDInterface:
     Методы:
     - create(): Возвращает функцию для создания записей.
     - retrieve(): Возвращает функцию для извлечения записей.
+    - buffered(): Возвращает запущенный буферизованный писатель.
     """
 
     @staticmethod
@@ -93,8 +295,35 @@ class CRUDInterface:
         """
         return _retrieve_all_data
 
+    @staticmethod
+    def buffered(
+        db_instance: pw.Database,
+        model: pw.Model,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+    ) -> BufferedWriter:
+        """
+        Возвращает запущенный писатель, сохраняющий записи пакетами в фоне.
+
+        Параметры:
+        - db_instance: pw.Database - Экземпляр базы данных.
+        - model: pw.Model - Модель Peewee.
+        - batch_size: int - Количество строк, при котором буфер сбрасывается сразу.
+        - flush_interval: float - Максимальное время хранения строки в буфере, в секундах.
+
+        Возвращает:
+        - BufferedWriter: Писатель с запущенным фоновым потоком.
+        """
+        return BufferedWriter(db_instance, model, batch_size, flush_interval).start()
+
 
 def main():
+    logging.basicConfig(
+        filename="error.log",
+        level=logging.ERROR,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
     # Создание записи
     create_function = CRUDInterface.create()
     create_function(
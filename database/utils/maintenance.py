@@ -0,0 +1,359 @@
+import argparse
+import gzip
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import peewee as pw
+
+from database.common.models import History
+from database.utils.migrations import MODELS, migrate
+
+# Значение PRAGMA auto_vacuum в режиме INCREMENTAL
+_AUTO_VACUUM_INCREMENTAL = 2
+
+# Сколько страниц возвращается за одну транзакцию incremental_vacuum
+_VACUUM_STEP = 1000
+
+
+def archive_path(archive_dir: str, month: str) -> str:
+    """
+    Возвращает путь к архиву History за месяц.
+
+    Параметры:
+    - archive_dir: str - Каталог архива.
+    - month: str - Месяц в формате 'YYYY-MM'.
+
+    Возвращает:
+    - str: Путь к файлу history-YYYY-MM.jsonl.gz.
+    """
+    return os.path.join(archive_dir, f"history-{month}.jsonl.gz")
+
+
+def _append_archive(path: str, rows: List[Dict[str, Any]]) -> None:
+    # Каждая дозапись - отдельный член gzip; gzip.open читает их подряд как один поток.
+    # fsync до удаления строк из базы: при сбое строка окажется в архиве дважды, но не пропадёт
+    with open(path, "ab") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            for row in rows:
+                archive.write(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive_history(
+    db_instance: pw.Database,
+    archive_dir: str,
+    retention_days: int,
+    batch_size: int = 5000,
+    now: Optional[datetime] = None,
+) -> int:
+    """
+    Переносит строки History старше retention_days в сжатые помесячные архивы JSONL.
+
+    Строки выбираются по индексу (last_generated_at) пачками по batch_size;
+    каждая пачка дописывается в архивы своих месяцев и удаляется из базы
+    короткой транзакцией, поэтому запись истории ботом не блокируется надолго.
+    Сообщения остаются зашифрованными, как в базе. Агрегаты MonthlyRequests не
+    меняются, поэтому /low и /high учитывают и перенесённые строки.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+    - archive_dir: str - Каталог архива.
+    - retention_days: int - Сколько дней истории оставлять в базе.
+    - batch_size: int - Количество строк в одной пачке.
+    - now: Optional[datetime] - Текущее время. По умолчанию datetime.now().
+
+    Возвращает:
+    - int: Количество перенесённых строк.
+    """
+    cutoff = (now or datetime.now()) - timedelta(days=retention_days)
+    os.makedirs(archive_dir, exist_ok=True)
+    archived = 0
+    with db_instance.bind_ctx(MODELS):
+        while True:
+            batch = list(
+                History.select()
+                .where(History.last_generated_at < cutoff)
+                .order_by(History.last_generated_at, History.id)
+                .limit(batch_size)
+                .dicts()
+            )
+            if not batch:
+                return archived
+
+            last_key = pw.Tuple(batch[-1]["last_generated_at"], batch[-1]["id"])
+            by_month: Dict[str, List[Dict[str, Any]]] = {}
+            for row in batch:
+                generated_at = row["last_generated_at"]
+                row["last_generated_at"] = generated_at.isoformat(sep=" ")
+                by_month.setdefault(generated_at.strftime("%Y-%m"), []).append(row)
+            for month, rows in by_month.items():
+                _append_archive(archive_path(archive_dir, month), rows)
+
+            # Пачка - это все строки с ключом не больше последнего, поэтому удаление
+            # идёт диапазоном по тому же индексу, без списка id в параметрах
+            with db_instance.atomic():
+                History.delete().where(
+                    (History.last_generated_at < cutoff)
+                    & (pw.Tuple(History.last_generated_at, History.id) <= last_key)
+                ).execute()
+            archived += len(batch)
+            logging.info(f"Archived {len(batch)} History rows.")
+
+
+def read_archive(path: str) -> List[Dict[str, Any]]:
+    """
+    Читает строки History из архива за месяц.
+
+    Параметры:
+    - path: str - Путь к файлу history-YYYY-MM.jsonl.gz.
+
+    Возвращает:
+    - List[Dict[str, Any]]: Строки в порядке переноса.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as archive:
+        return [json.loads(line) for line in archive if line.strip()]
+
+
+def enable_incremental_vacuum(db_instance: pw.Database) -> bool:
+    """
+    Включает auto_vacuum = INCREMENTAL в существующей базе.
+
+    Для уже созданной базы режим меняется только полной перезаписью файла
+    (VACUUM), которая держит эксклюзивную блокировку, поэтому функция
+    вызывается вручную, а не из фоновой задачи.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+
+    Возвращает:
+    - bool: True, если база была перезаписана, False, если режим уже включён.
+    """
+    if db_instance.execute_sql("PRAGMA auto_vacuum").fetchone()[0] == _AUTO_VACUUM_INCREMENTAL:
+        return False
+    db_instance.execute_sql("PRAGMA auto_vacuum = INCREMENTAL")
+    db_instance.execute_sql("VACUUM")
+    return True
+
+
+def compact(db_instance: pw.Database, vacuum_pages: int = 0) -> Dict[str, int]:
+    """
+    Возвращает освободившиеся страницы файлу базы и обновляет статистику планировщика.
+
+    Выполняет PRAGMA incremental_vacuum (если режим включён), сбрасывает WAL в
+    основной файл с усечением журнала и PRAGMA optimize.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+    - vacuum_pages: int - Сколько свободных страниц вернуть за вызов, 0 - все.
+
+    Возвращает:
+    - Dict[str, int]: Количество страниц и свободных страниц до и после.
+    """
+
+    def pragma(name: str) -> int:
+        return db_instance.execute_sql(f"PRAGMA {name}").fetchone()[0]
+
+    before = {"pages": pragma("page_count"), "free_pages": pragma("freelist_count")}
+    if pragma("auto_vacuum") == _AUTO_VACUUM_INCREMENTAL:
+        remaining = before["free_pages"]
+        if vacuum_pages > 0:
+            remaining = min(remaining, vacuum_pages)
+        # Модуль sqlite3 делает один шаг PRAGMA incremental_vacuum, а шаг возвращает
+        # одну страницу, поэтому прагма повторяется; транзакции короткие, чтобы не
+        # задерживать запись истории
+        while remaining > 0:
+            step = min(remaining, _VACUUM_STEP)
+            with db_instance.atomic():
+                for _ in range(step):
+                    db_instance.execute_sql("PRAGMA incremental_vacuum(1)")
+            remaining -= step
+    db_instance.execute_sql("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+    db_instance.execute_sql("PRAGMA optimize")
+    return {
+        "pages_before": before["pages"],
+        "free_pages_before": before["free_pages"],
+        "pages_after": pragma("page_count"),
+        "free_pages_after": pragma("freelist_count"),
+    }
+
+
+def run_maintenance(
+    db_instance: pw.Database,
+    archive_dir: str,
+    retention_days: int,
+    vacuum_pages: int = 0,
+) -> Dict[str, int]:
+    """
+    Переносит старую историю в архив и уплотняет базу.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+    - archive_dir: str - Каталог архива.
+    - retention_days: int - Сколько дней истории оставлять в базе.
+    - vacuum_pages: int - Сколько свободных страниц вернуть за вызов, 0 - все.
+
+    Возвращает:
+    - Dict[str, int]: Количество перенесённых строк и размеры базы в страницах.
+    """
+    started = time.monotonic()
+    result: Dict[str, int] = {
+        "archived_rows": archive_history(db_instance, archive_dir, retention_days)
+    }
+    result.update(compact(db_instance, vacuum_pages))
+    result["duration_ms"] = int((time.monotonic() - started) * 1000)
+    return result
+
+
+class HistoryMaintenance:
+    """
+    Периодический запуск run_maintenance в фоновом потоке.
+
+    Атрибуты:
+    - archive_dir: str - Каталог архива.
+    - retention_days: int - Сколько дней истории оставлять в базе.
+    - interval: float - Период запуска в секундах.
+    - vacuum_pages: int - Сколько свободных страниц вернуть за запуск, 0 - все.
+    """
+
+    def __init__(
+        self,
+        db_instance: pw.Database,
+        archive_dir: str,
+        retention_days: int,
+        interval: float = 24 * 60 * 60,
+        vacuum_pages: int = 0,
+    ) -> None:
+        """
+        Параметры:
+        - db_instance: pw.Database - Экземпляр базы данных.
+        - archive_dir: str - Каталог архива.
+        - retention_days: int - Сколько дней истории оставлять в базе.
+        - interval: float - Период запуска в секундах.
+        - vacuum_pages: int - Сколько свободных страниц вернуть за запуск, 0 - все.
+        """
+        self.db_instance = db_instance
+        self.archive_dir: str = archive_dir
+        self.retention_days: int = retention_days
+        self.interval: float = interval
+        self.vacuum_pages: int = vacuum_pages
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._runs: int = 0
+        self._errors: int = 0
+        self._archived_rows: int = 0
+        self._last: Dict[str, int] = {}
+
+    def start(self) -> "HistoryMaintenance":
+        """
+        Запускает фоновый поток. Первый запуск обслуживания - сразу.
+
+        Возвращает:
+        - HistoryMaintenance: Этот же экземпляр.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="history-maintenance", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def run_once(self) -> Dict[str, int]:
+        """
+        Выполняет обслуживание в текущем потоке.
+
+        Возвращает:
+        - Dict[str, int]: Результат run_maintenance.
+        """
+        try:
+            result = run_maintenance(
+                self.db_instance, self.archive_dir, self.retention_days, self.vacuum_pages
+            )
+        except Exception:
+            with self._lock:
+                self._errors += 1
+            raise
+        with self._lock:
+            self._runs += 1
+            self._archived_rows += result["archived_rows"]
+            self._last = result
+        return result
+
+    def close(self) -> None:
+        """
+        Останавливает фоновый поток, дожидаясь текущего запуска.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает количество запусков и результат последнего.
+
+        Возвращает:
+        - Dict[str, Any]: Статистика обслуживания.
+        """
+        with self._lock:
+            result: Dict[str, Any] = {
+                "runs": self._runs,
+                "errors": self._errors,
+                "archived_rows": self._archived_rows,
+            }
+            result.update({f"last_{name}": value for name, value in self._last.items()})
+            return result
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logging.error(f"Ошибка обслуживания истории: {e}")
+            finally:
+                # Поток держит собственное соединение Peewee
+                self.db_instance.close()
+            self._stop.wait(self.interval)
+
+
+def main() -> int:
+    """
+    Переносит старую историю в архив и уплотняет базу из командной строки.
+
+    Возвращает:
+    - int: Код завершения.
+    """
+    parser = argparse.ArgumentParser(description="Архивация и уплотнение таблицы History")
+    parser.add_argument("db_path", help="Путь к файлу базы, например lecture.db")
+    parser.add_argument("--archive-dir", default="history_archive")
+    parser.add_argument("--retention-days", type=int, default=180)
+    parser.add_argument("--vacuum-pages", type=int, default=0)
+    parser.add_argument(
+        "--enable-incremental-vacuum",
+        action="store_true",
+        help="Однократно перевести базу в auto_vacuum = INCREMENTAL (полный VACUUM)",
+    )
+    args = parser.parse_args()
+
+    db_instance = pw.SqliteDatabase(args.db_path, pragmas={"busy_timeout": 5000})
+    db_instance.connect()
+    migrate(db_instance)
+    if args.enable_incremental_vacuum and enable_incremental_vacuum(db_instance):
+        print("База перезаписана в режиме auto_vacuum = INCREMENTAL.")
+    result = run_maintenance(
+        db_instance, args.archive_dir, args.retention_days, args.vacuum_pages
+    )
+    db_instance.close()
+    for name, value in result.items():
+        print(f"{name}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
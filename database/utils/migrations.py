@@ -0,0 +1,141 @@
+import logging
+from typing import List, Type
+
+import peewee as pw
+
+from database.common.models import (
+    ChatState,
+    History,
+    MonthlyRequests,
+    TelegramFile,
+    Translation,
+    UserQuota,
+)
+
+# Версия схемы в PRAGMA user_version. Увеличивается при каждом изменении моделей:
+# база с такой же версией при запуске не проверяется
+SCHEMA_VERSION = 2
+
+# Все модели проекта в порядке создания таблиц
+MODELS: List[Type[pw.Model]] = [
+    History,
+    MonthlyRequests,
+    UserQuota,
+    ChatState,
+    TelegramFile,
+    Translation,
+]
+
+
+def backfill_monthly_requests(db_instance: pw.Database) -> int:
+    """
+    Заполняет агрегаты MonthlyRequests по уже существующим строкам History.
+
+    Уже посчитанные месяцы не перезаписываются, поэтому повторный запуск безопасен.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+
+    Возвращает:
+    - int: Количество добавленных агрегатов.
+    """
+    month = pw.fn.strftime("%Y-%m", History.last_generated_at)
+    source = (
+        History.select(History.chat_id, month, pw.fn.COUNT(History.id))
+        .where(~(History.message.startswith("/")))
+        .group_by(History.chat_id, month)
+    )
+    with db_instance.bind_ctx([History, MonthlyRequests]):
+        with db_instance.atomic():
+            return (
+                MonthlyRequests.insert_from(
+                    source,
+                    [
+                        MonthlyRequests.chat_id,
+                        MonthlyRequests.month,
+                        MonthlyRequests.total_requests,
+                    ],
+                )
+                .on_conflict_ignore()
+                .as_rowcount()
+                .execute()
+            )
+
+
+def add_missing_columns(db_instance: pw.Database) -> List[str]:
+    """
+    Добавляет в существующие таблицы столбцы, появившиеся в моделях.
+
+    Новые поля должны иметь значение по умолчанию или допускать NULL.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+
+    Возвращает:
+    - List[str]: Добавленные столбцы в виде "таблица.столбец".
+    """
+    from playhouse.migrate import SchemaMigrator
+
+    if isinstance(db_instance, pw.DatabaseProxy):
+        db_instance = db_instance.obj
+    migrator = SchemaMigrator.from_database(db_instance)
+    added: List[str] = []
+    with db_instance.bind_ctx(MODELS):
+        for model in MODELS:
+            table = model._meta.table_name
+            if not model.table_exists():
+                continue
+            existing = {column.name for column in db_instance.get_columns(table)}
+            for field in model._meta.sorted_fields:
+                if field.column_name not in existing:
+                    migrator.add_column(table, field.column_name, field).run()
+                    added.append(f"{table}.{field.column_name}")
+    return added
+
+
+def schema_version(db_instance: pw.Database) -> int:
+    """
+    Возвращает версию схемы, записанную в базе (PRAGMA user_version).
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+
+    Возвращает:
+    - int: Версия схемы, 0 - база новая или ещё не мигрировалась с учётом версий.
+    """
+    return db_instance.execute_sql("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(db_instance: pw.Database, force: bool = False) -> bool:
+    """
+    Приводит схему базы данных к описанию моделей.
+
+    Если версия схемы в базе уже равна SCHEMA_VERSION, проверка пропускается:
+    запуск стоит одного PRAGMA. Иначе недостающие таблицы и индексы создаются
+    через CREATE ... IF NOT EXISTS, поэтому функция безопасна для уже
+    существующих файлов lecture.db. Новые поля моделей добавляются в
+    существующие таблицы. Если таблица MonthlyRequests создаётся впервые, она
+    заполняется по истории. В конце обновляется статистика планировщика
+    (ANALYZE) и записывается версия схемы.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+    - force: bool - Проверить схему, даже если версия совпадает.
+
+    Возвращает:
+    - bool: True, если схема проверялась, False, если версия уже актуальна.
+    """
+    if not force and schema_version(db_instance) == SCHEMA_VERSION:
+        return False
+    with db_instance.bind_ctx(MODELS):
+        needs_backfill = not MonthlyRequests.table_exists()
+    for column in add_missing_columns(db_instance):
+        logging.info(f"Added column {column}.")
+    with db_instance.bind_ctx(MODELS):
+        db_instance.create_tables(MODELS, safe=True)
+    if needs_backfill:
+        backfill_monthly_requests(db_instance)
+    db_instance.execute_sql("ANALYZE")
+    db_instance.execute_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    logging.info("Database schema is up to date.")
+    return True
@@ -0,0 +1,104 @@
+import re
+import sys
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import peewee as pw
+
+from database.common.models import History, MonthlyRequests, UserQuota
+from database.utils.migrations import MODELS, migrate
+
+# Строка плана SQLite, означающая полный просмотр таблицы без индекса
+_FULL_SCAN = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+
+def bot_queries() -> Dict[str, pw.Query]:
+    """
+    Возвращает запросы, которые бот выполняет при обработке сообщений.
+
+    Возвращает:
+    - Dict[str, pw.Query]: Название запроса и сам запрос.
+    """
+    chat_id = 123456789
+    return {
+        "history.requests_page_first": History.requests_page(chat_id, 11),
+        "history.requests_page": History.requests_page(
+            chat_id, 11, before=(datetime(2024, 1, 1), 1000)
+        ),
+        "history.requests_page_newer": History.requests_page(
+            chat_id, 11, after=(datetime(2024, 1, 1), 1000)
+        ),
+        "monthly.lowest": MonthlyRequests.ranked(chat_id).limit(1),
+        "monthly.highest": MonthlyRequests.ranked(chat_id, descending=True).limit(1),
+        "quota.remaining": UserQuota.select().where(UserQuota.chat_id == chat_id),
+        "quota.consume": UserQuota.update(
+            token_count=UserQuota.token_count - 1
+        ).where((UserQuota.chat_id == chat_id) & (UserQuota.token_count >= 1)),
+    }
+
+
+def explain(db_instance: pw.Database, query: pw.Query) -> List[str]:
+    """
+    Выполняет EXPLAIN QUERY PLAN для запроса.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных.
+    - query: pw.Query - Запрос Peewee.
+
+    Возвращает:
+    - List[str]: Строки плана выполнения.
+    """
+    sql, params = query.sql()
+    cursor = db_instance.execute_sql(f"EXPLAIN QUERY PLAN {sql}", params)
+    return [row[-1] for row in cursor.fetchall()]
+
+
+def audit(db_instance: pw.Database) -> List[Tuple[str, str]]:
+    """
+    Проверяет, что ни один запрос бота не выполняет полный просмотр таблицы.
+
+    Параметры:
+    - db_instance: pw.Database - Экземпляр базы данных с актуальной схемой.
+
+    Возвращает:
+    - List[Tuple[str, str]]: Пары (название запроса, строка плана) с полным просмотром.
+    """
+    problems = []
+    with db_instance.bind_ctx(MODELS):
+        for name, query in bot_queries().items():
+            for detail in explain(db_instance, query):
+                if _FULL_SCAN.match(detail):
+                    problems.append((name, detail))
+    return problems
+
+
+def main() -> int:
+    """
+    Проверяет планы запросов на базе из аргумента командной строки
+    или на пустой базе в памяти со схемой из моделей.
+
+    Возвращает:
+    - int: 0, если полных просмотров нет, иначе 1.
+    """
+    path = sys.argv[1] if len(sys.argv) > 1 else ":memory:"
+    db_instance = pw.SqliteDatabase(path)
+    db_instance.connect()
+    migrate(db_instance, force=True)
+    problems = audit(db_instance)
+    with db_instance.bind_ctx(MODELS):
+        for name, query in bot_queries().items():
+            print(f"{name}:")
+            for detail in explain(db_instance, query):
+                print(f"    {detail}")
+    db_instance.close()
+
+    if problems:
+        for name, detail in problems:
+            print(f"Полный просмотр таблицы в запросе {name}: {detail}")
+        return 1
+    print("Все запросы используют индексы.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,40 +1,141 @@
 from settings import ProjectSettings
 from stability_API.stability_ai import ImageGenerationService
 from my_bot.my_bot import Bot
+from my_bot.sessions import SessionStore
+from my_bot.scheduler import FairScheduler
+from my_bot.file_ids import FileIdCache
+from my_bot.translation import TranslationService
+from my_bot.postprocess import ImagePostProcessor
 from database.common.models import db, History
-from database.core import CRUDInterface
+from database.core import CRUDInterface, create_engine
+from database.utils.migrations import migrate
+from database.utils.maintenance import HistoryMaintenance
+from monitoring.metrics import MetricsRegistry
+from monitoring.server import MetricsServer
+from monitoring.profiling import Profiler
 
 import logging
 
 
+def build_bot(settings: ProjectSettings) -> Bot:
+    """
+    Подключает базу данных, приводит схему к актуальной версии и собирает бота по настройкам.
+
+    Аргументы:
+        settings (ProjectSettings): Настройки проекта.
+
+    Возвращает:
+        Bot: Бот, готовый к запуску start() или start_webhook().
+    """
+    create_engine(settings)
+    db.connect()
+    migrate(db)
+
+    crud: CRUDInterface = CRUDInterface()
+
+    metrics: MetricsRegistry | None = None
+    if settings.metrics_enabled:
+        # Метрики необязательны: занятый порт не должен мешать запуску бота
+        try:
+            server = MetricsServer(
+                MetricsRegistry(), settings.metrics_host, settings.metrics_port
+            )
+        except OSError as e:
+            logging.error(
+                f"Сервер метрик не запущен ({settings.metrics_host}:{settings.metrics_port}): {e}"
+            )
+        else:
+            metrics = server.start().registry
+
+    profiler: Profiler | None = None
+    if settings.profiling_enabled or settings.profiling_signal:
+        profiler = Profiler(
+            enabled=settings.profiling_enabled,
+            sample_rate=settings.profiling_sample_rate,
+            output_dir=settings.profiling_dir,
+            max_files=settings.profiling_max_files,
+        )
+        if settings.profiling_signal:
+            profiler.install_signal()
+
+    if settings.history_maintenance_interval > 0:
+        maintenance = HistoryMaintenance(
+            db,
+            settings.history_archive_dir,
+            settings.history_retention_days,
+            interval=settings.history_maintenance_interval,
+            vacuum_pages=settings.history_vacuum_pages,
+        ).start()
+        if metrics is not None:
+            metrics.gauge_callback(
+                "db_history_maintenance", "Архивация History и уплотнение базы", maintenance.stats
+            )
+
+    return Bot(
+        settings.bot_token.get_secret_value(),
+        ImageGenerationService.from_settings(settings),
+        crud,
+        generation_workers=settings.generation_workers,
+        generation_queue_size=settings.generation_queue_size,
+        shutdown_timeout=settings.generation_shutdown_timeout,
+        scheduler=FairScheduler(
+            max_pending=settings.generation_queue_size,
+            user_rate=settings.scheduler_user_rate,
+            user_burst=settings.scheduler_user_burst,
+            global_rate=settings.scheduler_global_rate,
+            global_burst=settings.scheduler_global_burst,
+        ),
+        sessions=SessionStore(
+            ttl=settings.session_ttl, persistent=settings.session_persistent
+        ),
+        bot_threads=settings.bot_threads,
+        file_ids=FileIdCache(persistent=settings.file_id_cache_persistent),
+        translator=TranslationService(persistent=settings.translation_persistent),
+        variant_samples=settings.variant_samples,
+        postprocessor=ImagePostProcessor(
+            enabled=settings.image_postprocess_enabled,
+            image_format=settings.image_postprocess_format,
+            quality=settings.image_postprocess_quality,
+            max_side=settings.image_postprocess_max_side,
+            workers=settings.image_postprocess_workers,
+        ),
+        history_writer=crud.buffered(
+            db,
+            History,
+            batch_size=settings.history_batch_size,
+            flush_interval=settings.history_flush_interval,
+        ),
+        metrics=metrics,
+        profiler=profiler,
+    )
+
+
 def main() -> None:
     """
     Основная функция запуска бота.
     """
 
-    # Конфигурация логгера
+    # Единственная конфигурация логгера: модули проекта только получают свои логгеры
     logging.basicConfig(
         filename="error.log",
         level=logging.ERROR,
-        format="%(asctime)s - %(levelname)s - %(message)s",
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
     )
 
     try:
         settings: ProjectSettings = ProjectSettings()
-        TOKEN: str = settings.bot_token.get_secret_value()
-        STABILITY_AI_TOKEN: str = settings.stability_ai_token.get_secret_value()
-        STABILITY_AI_URL: str = settings.stability_ai_url
-
-        db.connect()
-        db.create_tables([History])
-
-        crud: CRUDInterface = CRUDInterface()
-
-        bot: Bot = Bot(
-            TOKEN, ImageGenerationService(STABILITY_AI_TOKEN, STABILITY_AI_URL), crud
-        )
+        bot: Bot = build_bot(settings)
 
-        bot.start()
+        if settings.bot_mode == "webhook":
+            bot.start_webhook(
+                settings.webhook_host,
+                settings.webhook_port,
+                settings.webhook_url,
+                settings.webhook_path,
+                settings.webhook_secret.get_secret_value(),
+            )
+        else:
+            bot.start()
     except RuntimeError as e:
         logging.error(f"Ошибка: {e}")
         print(f"Ошибка: {e}")
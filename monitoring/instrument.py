@@ -0,0 +1,102 @@
+import functools
+import time
+from typing import Any, Callable, Dict, List, TypeVar
+
+from telebot import TeleBot
+
+from monitoring.metrics import Counter, Histogram, MetricsRegistry
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def timed(histogram: Histogram, errors: Counter, *labels: str) -> Callable[[F], F]:
+    """
+    Декоратор: замеряет время вызова в гистограмме и считает исключения.
+
+    Аргументы:
+        histogram (Histogram): Гистограмма длительности в секундах.
+        errors (Counter): Счётчик вызовов, завершившихся исключением.
+        *labels (str): Значения меток обеих метрик.
+
+    Возвращает:
+        Callable[[F], F]: Декоратор.
+    """
+    child = histogram.labels(*labels)
+    error_child = errors.labels(*labels)
+
+    def decorator(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            except BaseException:
+                error_child.inc()
+                raise
+            finally:
+                child.observe(time.perf_counter() - started)
+
+        wrapper.__wrapped_by_metrics__ = True
+        return wrapper
+
+    return decorator
+
+
+def _already_wrapped(function: Callable[..., Any]) -> bool:
+    return getattr(function, "__wrapped_by_metrics__", False)
+
+
+def instrument_handlers(
+    bot: TeleBot, registry: MetricsRegistry, *extra: List[Dict[str, Any]]
+) -> None:
+    """
+    Оборачивает зарегистрированные обработчики сообщений и нажатий кнопок.
+
+    Метка handler - имя функции обработчика. Повторный вызов не оборачивает уже
+    обёрнутые обработчики.
+
+    Аргументы:
+        bot (TeleBot): Экземпляр TeleBot с зарегистрированными обработчиками.
+        registry (MetricsRegistry): Реестр метрик.
+        *extra (List[Dict[str, Any]]): Другие списки обработчиков с ключом "function",
+            например маршруты Router.handlers.
+    """
+    histogram = registry.histogram(
+        "bot_handler_duration_seconds", "Длительность обработчиков Telegram", ["handler"]
+    )
+    errors = registry.counter(
+        "bot_handler_errors_total", "Обработчики, завершившиеся исключением", ["handler"]
+    )
+    for handlers in (bot.message_handlers, bot.callback_query_handlers, *extra):
+        for handler in handlers:
+            function = handler["function"]
+            if not _already_wrapped(function):
+                handler["function"] = timed(histogram, errors, function.__name__)(function)
+
+
+def instrument_method(
+    obj: Any, method: str, registry: MetricsRegistry, component: str
+) -> None:
+    """
+    Подменяет метод экземпляра или функцию модуля версией, которая замеряет время вызова.
+
+    Для модуля в метрики попадают и вызовы через его глобальное имя изнутри него.
+    Метрики: upstream_duration_seconds и upstream_errors_total с меткой call.
+
+    Аргументы:
+        obj (Any): Экземпляр, например ImageGenerationService, или модуль.
+        method (str): Имя метода или функции.
+        registry (MetricsRegistry): Реестр метрик.
+        component (str): Значение метки call.
+    """
+    function = getattr(obj, method)
+    if _already_wrapped(function):
+        return
+    histogram = registry.histogram(
+        "upstream_duration_seconds", "Длительность вызовов внешних сервисов и БД", ["call"]
+    )
+    errors = registry.counter(
+        "upstream_errors_total", "Вызовы внешних сервисов и БД, завершившиеся исключением", ["call"]
+    )
+    setattr(obj, method, timed(histogram, errors, component)(function))
+
@@ -0,0 +1,335 @@
+import abc
+import bisect
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Границы корзин гистограмм задержек в секундах
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric(abc.ABC):
+    """
+    Общая часть метрик: имя, описание и дочерние значения по наборам меток.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name: str = name
+        self.documentation: str = documentation
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, object] = {}
+
+    def labels(self, *values: str) -> object:
+        """
+        Возвращает значение метрики для набора меток, создавая его при первом обращении.
+
+        Аргументы:
+            *values (str): Значения меток в порядке labelnames.
+
+        Возвращает:
+            object: Дочерний счётчик или гистограмма.
+        """
+        key = tuple(str(value) for value in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"Метрика {self.name} ожидает метки {self.labelnames}")
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self) -> object:
+        """
+        Создаёт значение метрики для нового набора меток.
+        """
+
+    @abc.abstractmethod
+    def _samples(self) -> Iterable[Tuple[str, str, float]]:
+        """
+        Возвращает строки значений: суффикс имени, метки и значение.
+        """
+
+    def render(self) -> List[str]:
+        """
+        Возвращает строки метрики в текстовом формате Prometheus.
+
+        Возвращает:
+            List[str]: Строки HELP, TYPE и значений.
+        """
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+    def _items(self) -> List[Tuple[LabelValues, object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+
+class _CounterChild:
+    __slots__ = ("_lock", "value")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.value: float = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """
+    Монотонно растущий счётчик.
+    """
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0) -> None:
+        """
+        Увеличивает счётчик без меток.
+
+        Аргументы:
+            amount (float): Величина увеличения.
+        """
+        self.labels().inc(amount)
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def _samples(self) -> Iterable[Tuple[str, str, float]]:
+        for values, child in self._items():
+            yield "", _format_labels(self.labelnames, values), child.value
+
+
+class _HistogramChild:
+    __slots__ = ("_lock", "_upper_bounds", "counts", "sum")
+
+    def __init__(self, upper_bounds: Sequence[float]) -> None:
+        self._lock = threading.Lock()
+        self._upper_bounds = upper_bounds
+        self.counts: List[int] = [0] * (len(upper_bounds) + 1)
+        self.sum: float = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self._upper_bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """
+    Гистограмма с фиксированными границами корзин.
+
+    Наблюдение стоит одного бинарного поиска и одного захвата блокировки, поэтому
+    её можно оставлять включённой на горячем пути.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+
+    def observe(self, value: float) -> None:
+        """
+        Добавляет наблюдение в гистограмму без меток.
+
+        Аргументы:
+            value (float): Наблюдаемое значение.
+        """
+        self.labels().observe(value)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def _samples(self) -> Iterable[Tuple[str, str, float]]:
+        bucket_names = self.labelnames + ("le",)
+        for values, child in self._items():
+            with child._lock:
+                counts = list(child.counts)
+                total = child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield "_bucket", _format_labels(
+                    bucket_names, values + (_format_value(bound),)
+                ), cumulative
+            labels = _format_labels(self.labelnames, values)
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class _GaugeCallback:
+    """
+    Набор gauge-метрик, значения которых вычисляются при каждом снятии.
+    """
+
+    def __init__(self, prefix: str, documentation: str, collect: Callable[[], Dict[str, object]]) -> None:
+        self.prefix = prefix
+        self.documentation = documentation
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines: List[str] = []
+        for name, value in sorted(self.collect().items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {_escape(self.documentation)}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {_format_value(float(value))}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса с выводом в текстовом формате Prometheus.
+    """
+
+    def __init__(self) -> None:
+        """
+        Инициализирует пустой реестр.
+        """
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+        self._callbacks: List[_GaugeCallback] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """
+        Возвращает счётчик с указанным именем, создавая его при первом обращении.
+
+        Аргументы:
+            name (str): Имя метрики.
+            documentation (str): Описание для строки HELP.
+            labelnames (Sequence[str]): Имена меток.
+
+        Возвращает:
+            Counter: Счётчик.
+        """
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        """
+        Возвращает гистограмму с указанным именем, создавая её при первом обращении.
+
+        Аргументы:
+            name (str): Имя метрики.
+            documentation (str): Описание для строки HELP.
+            labelnames (Sequence[str]): Имена меток.
+            buckets (Optional[Sequence[float]]): Границы корзин. По умолчанию DEFAULT_BUCKETS.
+
+        Возвращает:
+            Histogram: Гистограмма.
+        """
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = Histogram(
+                    name, documentation, labelnames, buckets or DEFAULT_BUCKETS
+                )
+        if not isinstance(metric, Histogram):
+            raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом")
+        return metric
+
+    def gauge_callback(
+        self, prefix: str, documentation: str, collect: Callable[[], Dict[str, object]]
+    ) -> None:
+        """
+        Регистрирует функцию, числовые значения которой выводятся как gauge-метрики prefix_<ключ>.
+
+        Аргументы:
+            prefix (str): Префикс имён метрик.
+            documentation (str): Описание для строк HELP.
+            collect (Callable[[], Dict[str, object]]): Функция, например stats() компонента.
+        """
+        with self._lock:
+            self._callbacks.append(_GaugeCallback(prefix, documentation, collect))
+
+    def render(self) -> str:
+        """
+        Возвращает все метрики в текстовом формате Prometheus 0.0.4.
+
+        Возвращает:
+            str: Текст для эндпоинта /metrics.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            callbacks = list(self._callbacks)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for callback in callbacks:
+            try:
+                lines.extend(callback.render())
+            except Exception as e:
+                lines.append(f"# {callback.prefix}: {_escape(str(e))}")
+        return "\n".join(lines) + "\n"
+
+    def _get_or_create(
+        self, cls: type, name: str, documentation: str, labelnames: Sequence[str]
+    ) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames)
+        if not isinstance(metric, cls):
+            raise ValueError(f"Метрика {name} уже зарегистрирована с другим типом")
+        return metric
@@ -0,0 +1,215 @@
+import cProfile
+import functools
+import logging
+import os
+import random
+import signal
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from telebot import TeleBot
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Общая для всех профилировщиков процесса: активным может быть только один cProfile
+_profile_lock = threading.Lock()
+
+
+class Profiler:
+    """
+    Выборочное профилирование обработчиков и конвейера генерации.
+
+    Обёрнутая функция с вероятностью sample_rate выполняется под cProfile и
+    tracemalloc. Для каждого такого вызова в output_dir пишутся профиль
+    (<время>-<имя>.prof, открывается pstats или snakeviz) и список мест с
+    наибольшим приростом памяти (<время>-<имя>.txt). Хранятся только последние
+    max_files пар файлов.
+
+    Пока профилирование выключено, обёртка только проверяет флаг enabled. В процессе
+    одновременно профилируется только один вызов: cProfile не допускает двух активных
+    профилей (Python 3.12+ поднимает ValueError), поэтому остальные вызовы выполняются
+    без профиля, а вложенные попадают в профиль внешнего вызова.
+
+    Атрибуты:
+        enabled (bool): Включено ли профилирование.
+        sample_rate (float): Доля профилируемых вызовов от 0 до 1.
+        output_dir (str): Каталог для профилей.
+        max_files (int): Сколько последних профилей хранить.
+        top_allocations (int): Сколько мест выделения памяти записывать.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        sample_rate: float = 0.01,
+        output_dir: str = "profiles",
+        max_files: int = 200,
+        top_allocations: int = 25,
+    ) -> None:
+        """
+        Инициализирует профилировщик.
+
+        Аргументы:
+            enabled (bool): Включить профилирование сразу.
+            sample_rate (float): Доля профилируемых вызовов от 0 до 1.
+            output_dir (str): Каталог для профилей.
+            max_files (int): Сколько последних профилей хранить.
+            top_allocations (int): Сколько мест выделения памяти записывать.
+        """
+        self.enabled: bool = enabled
+        self.sample_rate: float = min(1.0, max(0.0, sample_rate))
+        self.output_dir: str = output_dir
+        self.max_files: int = max(1, max_files)
+        self.top_allocations: int = top_allocations
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._sequence: int = 0
+
+    def toggle(self, *args: Any) -> None:
+        """
+        Переключает профилирование. Подходит как обработчик сигнала.
+        """
+        self.enabled = not self.enabled
+        self.logger.info(f"Профилирование {'включено' if self.enabled else 'выключено'}")
+
+    def install_signal(self, signum: Optional[int] = None) -> bool:
+        """
+        Переключает профилирование по сигналу (по умолчанию SIGUSR2).
+
+        Вызывается из главного потока.
+
+        Аргументы:
+            signum (Optional[int]): Номер сигнала.
+
+        Возвращает:
+            bool: True, если обработчик установлен, False, если сигнал недоступен на платформе.
+        """
+        if signum is None:
+            signum = getattr(signal, "SIGUSR2", None)
+        if signum is None:
+            return False
+        signal.signal(signum, self.toggle)
+        return True
+
+    def wrap(self, name: str) -> Callable[[F], F]:
+        """
+        Декоратор: выборочно профилирует вызовы функции.
+
+        Аргументы:
+            name (str): Имя функции в именах файлов профилей.
+
+        Возвращает:
+            Callable[[F], F]: Декоратор.
+        """
+
+        def decorator(function: F) -> F:
+            @functools.wraps(function)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled or random.random() >= self.sample_rate:
+                    return function(*args, **kwargs)
+                return self._profile(name, function, args, kwargs)
+
+            wrapper.__wrapped_by_profiler__ = True
+            return wrapper
+
+        return decorator
+
+    def instrument_handlers(self, bot: TeleBot, *extra: List[Dict[str, Any]]) -> None:
+        """
+        Оборачивает зарегистрированные обработчики сообщений и нажатий кнопок.
+
+        Аргументы:
+            bot (TeleBot): Экземпляр TeleBot с зарегистрированными обработчиками.
+            *extra (List[Dict[str, Any]]): Другие списки обработчиков с ключом "function",
+                например маршруты Router.handlers.
+        """
+        for handlers in (bot.message_handlers, bot.callback_query_handlers, *extra):
+            for handler in handlers:
+                function = handler["function"]
+                if not getattr(function, "__wrapped_by_profiler__", False):
+                    handler["function"] = self.wrap(function.__name__)(function)
+
+    def instrument_method(self, obj: Any, method: str, name: Optional[str] = None) -> None:
+        """
+        Подменяет метод экземпляра или функцию модуля профилируемой версией.
+
+        Аргументы:
+            obj (Any): Экземпляр или модуль.
+            method (str): Имя метода или функции.
+            name (Optional[str]): Имя в файлах профилей. По умолчанию имя метода.
+        """
+        function = getattr(obj, method)
+        if not getattr(function, "__wrapped_by_profiler__", False):
+            setattr(obj, method, self.wrap(name or method)(function))
+
+    def _profile(self, name: str, function: Callable[..., Any], args: Any, kwargs: Any) -> Any:
+        if not _profile_lock.acquire(blocking=False):
+            return function(*args, **kwargs)
+        try:
+            # Чужую трассировку tracemalloc профилировщик не выключает
+            owns_tracing = not tracemalloc.is_tracing()
+            if owns_tracing:
+                tracemalloc.start()
+            before = tracemalloc.take_snapshot()
+            profile = cProfile.Profile()
+            started = time.perf_counter()
+            try:
+                return profile.runcall(function, *args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                after = tracemalloc.take_snapshot()
+                if owns_tracing:
+                    tracemalloc.stop()
+                try:
+                    self._dump(name, elapsed, profile, before, after)
+                except OSError as e:
+                    self.logger.error(f"Не удалось сохранить профиль {name}: {e}")
+        finally:
+            _profile_lock.release()
+
+    def _dump(
+        self,
+        name: str,
+        elapsed: float,
+        profile: cProfile.Profile,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+    ) -> None:
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        os.makedirs(self.output_dir, exist_ok=True)
+        stem = os.path.join(
+            self.output_dir,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence:06d}-{name}",
+        )
+        profile.dump_stats(stem + ".prof")
+
+        # Снимки охватывают весь процесс: в них попадают и выделения других потоков
+        ignore = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+        ]
+        differences = after.filter_traces(ignore).compare_to(
+            before.filter_traces(ignore), "lineno"
+        )
+        lines: List[str] = [f"{name}: {elapsed * 1000:.1f} мс", ""]
+        lines.extend(str(difference) for difference in differences[: self.top_allocations])
+        with open(stem + ".txt", "w", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+        self._rotate()
+
+    def _rotate(self) -> None:
+        profiles = sorted(
+            entry.path
+            for entry in os.scandir(self.output_dir)
+            if entry.name.endswith(".prof")
+        )
+        for path in profiles[: max(0, len(profiles) - self.max_files)]:
+            for stale in (path, path[: -len(".prof")] + ".txt"):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,76 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+
+from monitoring.metrics import MetricsRegistry
+
+# Content-Type текстового формата Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsServer:
+    """
+    HTTP-сервер, отдающий метрики реестра по адресу /metrics.
+
+    Атрибуты:
+        registry (MetricsRegistry): Реестр метрик.
+        port (int): Фактический порт сервера (при port=0 выбирается свободный).
+    """
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9108) -> None:
+        """
+        Инициализирует сервер.
+
+        Аргументы:
+            registry (MetricsRegistry): Реестр метрик.
+            host (str): Адрес, на котором слушает сервер.
+            port (int): Порт сервера.
+
+        Исключения:
+            OSError: Если адрес занят или недоступен.
+        """
+        self.registry: MetricsRegistry = registry
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+        self.port: int = self._server.server_port
+
+    def start(self) -> "MetricsServer":
+        """
+        Запускает сервер в фоновом потоке.
+
+        Возвращает:
+            MetricsServer: Этот же экземпляр.
+        """
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-server", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def shutdown(self) -> None:
+        """
+        Останавливает сервер.
+        """
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _handler_class(self) -> type:
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                payload = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+        return Handler
@@ -0,0 +1,104 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+# Алфавиты шифра: (первая буква, размер алфавита). Остальные символы не меняются.
+_ALPHABETS: Tuple[Tuple[str, int], ...] = (("a", 26), ("A", 26), ("а", 32), ("А", 32))
+
+
+def _build_table(shift: int) -> Dict[int, int]:
+    table: Dict[int, int] = {}
+    for first, size in _ALPHABETS:
+        start = ord(first)
+        for offset in range(size):
+            table[start + offset] = start + (offset + shift) % size
+    return table
+
+
+@lru_cache(maxsize=4096)
+def _key_shifts(key: int) -> Tuple[int, ...]:
+    """
+    Возвращает цикл сдвигов для ключа: по одной цифре ключа на позицию символа.
+
+    Ключ из одинаковых цифр сворачивается в цикл длины 1.
+    """
+    shifts = tuple(int(digit) for digit in str(key))
+    return shifts[:1] if len(set(shifts)) == 1 else shifts
+
+
+class CaesarCodec:
+    """
+    Шифр Цезаря с ключом-числом, в котором сдвиг символа задаёт цифра ключа.
+
+    Таблицы перевода для всех десяти сдвигов строятся один раз, а текст
+    переводится целыми срезами через str.translate: символы с одинаковым
+    сдвигом (позиции i, i + len(key), ...) обрабатываются за один вызов.
+    Результат совпадает с посимвольной реализацией encrypt/decrypt.
+    """
+
+    def __init__(self) -> None:
+        """
+        Инициализирует таблицы перевода для сдвигов от 0 до 9.
+        """
+        self._encode_tables: List[Dict[int, int]] = [_build_table(s) for s in range(10)]
+        self._decode_tables: List[Dict[int, int]] = [
+            _build_table(-s) for s in range(10)
+        ]
+
+    def encrypt(self, text: str | int, key: int) -> str:
+        """
+        Шифрует текст.
+
+        Аргументы:
+            text (str | int): Текст или число.
+            key (int): Ключ шифрования.
+
+        Возвращает:
+            str: Зашифрованный текст.
+        """
+        return self._apply(str(text), _key_shifts(key), self._encode_tables)
+
+    def decrypt(self, encrypted_text: str | int, key: int) -> str:
+        """
+        Расшифровывает текст.
+
+        Аргументы:
+            encrypted_text (str | int): Зашифрованный текст или число.
+            key (int): Ключ шифрования.
+
+        Возвращает:
+            str: Расшифрованный текст.
+        """
+        return self._apply(str(encrypted_text), _key_shifts(key), self._decode_tables)
+
+    def decrypt_many(self, encrypted_texts: Iterable[str | int], key: int) -> List[str]:
+        """
+        Расшифровывает набор текстов одним ключом, например сообщения из History.
+
+        Аргументы:
+            encrypted_texts (Iterable[str | int]): Зашифрованные тексты.
+            key (int): Ключ шифрования.
+
+        Возвращает:
+            List[str]: Расшифрованные тексты в исходном порядке.
+        """
+        shifts = _key_shifts(key)
+        tables = self._decode_tables
+        return [self._apply(str(text), shifts, tables) for text in encrypted_texts]
+
+    @staticmethod
+    def _apply(text: str, shifts: Tuple[int, ...], tables: List[Dict[int, int]]) -> str:
+        if text.isdigit():
+            # Цифры не шифруются, так что chat_id возвращается без изменений
+            return text
+        step = len(shifts)
+        if step == 1:
+            return text.translate(tables[shifts[0]])
+        chars = list(text)
+        for position, shift in enumerate(shifts[: len(text)]):
+            if shift:
+                chars[position::step] = text[position::step].translate(tables[shift])
+        return "".join(chars)
+
+
+# Общий экземпляр кодека: таблицы не меняются, поэтому он потокобезопасен
+codec = CaesarCodec()
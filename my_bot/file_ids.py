@@ -0,0 +1,155 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from database.common.models import TelegramFile
+
+
+def content_hash(data: bytes) -> str:
+    """
+    Возвращает хэш содержимого изображения.
+
+    Аргументы:
+        data (bytes): Содержимое файла.
+
+    Возвращает:
+        str: SHA-256 в шестнадцатеричном виде.
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+class FileIdCache:
+    """
+    Соответствие хэша содержимого и file_id уже загруженных в Telegram изображений.
+
+    Повторная отправка того же изображения по file_id не загружает байты заново.
+    Вместе с file_id хранится размер загруженного файла (после постобработки),
+    по нему считается сэкономленный трафик. При persistent=True соответствия
+    хранятся в таблице TelegramFile.
+
+    Атрибуты:
+        max_entries (int): Максимальное число записей в памяти.
+        persistent (bool): Сохранять ли соответствия в базе данных.
+    """
+
+    def __init__(self, max_entries: int = 10000, persistent: bool = True) -> None:
+        """
+        Инициализирует кэш идентификаторов файлов.
+
+        Аргументы:
+            max_entries (int): Максимальное число записей в памяти.
+            persistent (bool): Сохранять ли соответствия в таблицу TelegramFile.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries: int = max_entries
+        self.persistent: bool = persistent
+        self._lock = threading.Lock()
+        # Хэш исходного изображения -> (file_id, размер загруженного файла)
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._uploads: int = 0
+        self._upload_bytes: int = 0
+        self._reuses: int = 0
+        self._bytes_saved: int = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Возвращает file_id для изображения с указанным хэшем.
+
+        Аргументы:
+            key (str): Хэш содержимого изображения.
+
+        Возвращает:
+            Optional[str]: file_id или None, если изображение ещё не загружалось.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry[0]
+        if not self.persistent:
+            return None
+        try:
+            record = TelegramFile.get_or_none(TelegramFile.content_hash == key)
+        except Exception as e:
+            self.logger.error(f"Ошибка при чтении file_id: {str(e)}")
+            return None
+        if record is None:
+            return None
+        with self._lock:
+            self._remember_locked(key, record.file_id, record.size)
+        return record.file_id
+
+    def record_upload(self, key: str, file_id: str, size: int) -> None:
+        """
+        Запоминает file_id, который Telegram вернул после загрузки изображения.
+
+        Аргументы:
+            key (str): Хэш содержимого изображения.
+            file_id (str): Идентификатор файла в Telegram.
+            size (int): Размер загруженного файла в байтах.
+        """
+        with self._lock:
+            self._uploads += 1
+            self._upload_bytes += size
+            self._remember_locked(key, file_id, size)
+        if self.persistent:
+            try:
+                TelegramFile.insert(
+                    content_hash=key, file_id=file_id, size=size
+                ).on_conflict_replace().execute()
+            except Exception as e:
+                self.logger.error(f"Ошибка при сохранении file_id: {str(e)}")
+
+    def record_reuse(self, key: str) -> None:
+        """
+        Учитывает отправку по file_id вместо повторной загрузки.
+
+        Сэкономленным считается размер файла, который был загружен в Telegram,
+        а не исходного изображения: при постобработке они различаются.
+
+        Аргументы:
+            key (str): Хэш содержимого изображения, полученного через get().
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            self._reuses += 1
+            self._bytes_saved += entry[1] if entry is not None else 0
+
+    def forget(self, key: str) -> None:
+        """
+        Удаляет запись, если Telegram больше не принимает этот file_id.
+
+        Аргументы:
+            key (str): Хэш содержимого изображения.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.persistent:
+            try:
+                TelegramFile.delete().where(TelegramFile.content_hash == key).execute()
+            except Exception as e:
+                self.logger.error(f"Ошибка при удалении file_id: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает количество загрузок и сэкономленный объём исходящего трафика.
+
+        Возвращает:
+            Dict[str, Any]: Статистика кэша.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "uploads": self._uploads,
+                "upload_bytes": self._upload_bytes,
+                "reuses": self._reuses,
+                "upload_bytes_saved": self._bytes_saved,
+            }
+
+    def _remember_locked(self, key: str, file_id: str, size: int) -> None:
+        self._entries[key] = (file_id, size)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
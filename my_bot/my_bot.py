@@ -1,29 +1,52 @@
 import os
 import sys
 import logging
+import secrets
 
-# Добавляем пути к модулям в пути поиска Python
-current_dir = os.path.dirname(os.path.abspath(__file__))
-project_root = os.path.abspath(os.path.join(current_dir, ".."))
-sys.path.insert(0, project_root)
+if not __package__:
+    # Файл запущен напрямую (python my_bot/my_bot.py): пакеты проекта ищутся от корня
+    sys.path.insert(
+        0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    )
 
 # Импортируем модули
-import base64
-import io
-from mtranslate import translate
-from typing import List, Dict, Any
+from concurrent.futures import Future
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple, Union
 from telebot import TeleBot, types
+from telebot.apihelper import ApiException
 from stability_API.stability_ai import ImageGenerationService
-from peewee import fn
-
-from dotenv import load_dotenv
-
-# Загружаем переменные окружения из файла .env
-load_dotenv()
-
-from settings import ProjectSettings
-from database.core import CRUDInterface
-from database.common.models import db, History
+from stability_API.decode import artifact_bytes
+from my_bot.workers import GenerationJob, GenerationWorkerPool
+from my_bot.sessions import SessionStore
+from my_bot.scheduler import FairScheduler
+from my_bot.file_ids import FileIdCache, content_hash
+from my_bot.translation import TranslationService
+from my_bot.postprocess import ImagePostProcessor
+from my_bot.codec import codec
+from my_bot.router import Router
+from monitoring.metrics import MetricsRegistry
+from monitoring.instrument import instrument_handlers, instrument_method
+from monitoring.profiling import Profiler
+import database.utils.CRUD as crud_module
+from database.utils.CRUD import BufferedWriter
+from database.common.models import (
+    db,
+    History,
+    MonthlyRequests,
+    UserQuota,
+    release_connection,
+    releases_connection,
+)
+
+# Максимальное количество изображений в одном альбоме Telegram
+MAX_MEDIA_GROUP = 10
+
+# Количество запросов на странице /history
+HISTORY_PAGE_SIZE = 10
+
+# Префикс callback_data кнопок листания истории: "history:<older|newer>:<id>:<время>"
+HISTORY_CALLBACK = "history"
 
 
 def encrypt(text: str | int, key: int) -> str:
@@ -38,24 +61,7 @@ def encrypt(text: str | int, key: int) -> str:
     - str: Зашифрованный текст.
 
     """
-    text = str(text)
-    encrypted_text = ""
-    key_length = len(str(key))
-
-    for i, char in enumerate(text):
-        shift = int(str(key)[i % key_length])
-        if "a" <= char <= "z":
-            encrypted_text += chr((ord(char) - ord("a") + shift) % 26 + ord("a"))
-        elif "A" <= char <= "Z":
-            encrypted_text += chr((ord(char) - ord("A") + shift) % 26 + ord("A"))
-        elif "а" <= char <= "я":
-            encrypted_text += chr((ord(char) - ord("а") + shift) % 32 + ord("а"))
-        elif "А" <= char <= "Я":
-            encrypted_text += chr((ord(char) - ord("А") + shift) % 32 + ord("А"))
-        else:
-            encrypted_text += char
-
-    return encrypted_text
+    return codec.encrypt(text, key)
 
 
 def decrypt(encrypted_text: str | int, key: int) -> str:
@@ -70,24 +76,7 @@ def decrypt(encrypted_text: str | int, key: int) -> str:
     - str: Расшифрованный текст.
 
     """
-    encrypted_text = str(encrypted_text)
-    decrypted_text = ""
-    key_length = len(str(key))
-
-    for i, char in enumerate(encrypted_text):
-        shift = int(str(key)[i % key_length])
-        if "a" <= char <= "z":
-            decrypted_text += chr((ord(char) - ord("a") - shift) % 26 + ord("a"))
-        elif "A" <= char <= "Z":
-            decrypted_text += chr((ord(char) - ord("A") - shift) % 26 + ord("A"))
-        elif "а" <= char <= "я":
-            decrypted_text += chr((ord(char) - ord("а") - shift) % 32 + ord("а"))
-        elif "А" <= char <= "Я":
-            decrypted_text += chr((ord(char) - ord("А") - shift) % 32 + ord("А"))
-        else:
-            decrypted_text += char
-
-    return decrypted_text
+    return codec.decrypt(encrypted_text, key)
 
 
 class Bot:
@@ -99,11 +88,34 @@ class Bot:
         image_generation_service (ImageGenerationService): Экземпляр сервиса генерации изображений.
         crud (object): Объект, предоставляющий операции CRUD для базы данных.
         bot (TeleBot): Экземпляр библиотеки TeleBot для обработки функциональности Telegram-бота.
-        is_generating (bool): Флаг, указывающий, идет ли процесс генерации изображения.
+        sessions (SessionStore): Хранилище состояний диалога для каждого чата.
+        generation_pool (GenerationWorkerPool): Пул фоновых воркеров генерации изображений.
+        file_ids (FileIdCache): Идентификаторы уже загруженных в Telegram изображений.
+        translator (TranslationService): Сервис перевода описаний с запоминанием результатов.
+        history_writer (BufferedWriter): Фоновая пакетная запись строк History.
+        postprocessor (ImagePostProcessor): Перекодирование изображений перед отправкой.
+        variant_samples (int): Количество изображений в режиме вариаций.
+        shutdown_timeout (float): Сколько секунд при остановке ждать обработки очереди генераций.
     """
 
     def __init__(
-        self, token: str, image_generation_service: ImageGenerationService, crud
+        self,
+        token: str,
+        image_generation_service: ImageGenerationService,
+        crud,
+        generation_workers: int = 2,
+        generation_queue_size: int = 100,
+        sessions: SessionStore | None = None,
+        bot_threads: int = 2,
+        file_ids: FileIdCache | None = None,
+        translator: TranslationService | None = None,
+        history_writer: BufferedWriter | None = None,
+        postprocessor: ImagePostProcessor | None = None,
+        variant_samples: int = 4,
+        scheduler: FairScheduler | None = None,
+        metrics: MetricsRegistry | None = None,
+        profiler: Profiler | None = None,
+        shutdown_timeout: float = 30.0,
     ) -> None:
         print("Bot is starting...")
         """
@@ -113,23 +125,80 @@ class Bot:
             token (str): Токен Telegram Bot API.
             image_generation_service (ImageGenerationService): Экземпляр сервиса генерации изображений.
             crud (object): Объект, предоставляющий операции CRUD для базы данных.
+            generation_workers (int): Количество фоновых воркеров генерации.
+            generation_queue_size (int): Максимальная длина очереди заданий на генерацию.
+            sessions (SessionStore | None): Хранилище состояний диалога. По умолчанию в памяти.
+            bot_threads (int): Количество потоков TeleBot для обработки обновлений.
+            file_ids (FileIdCache | None): Кэш file_id отправленных изображений.
+            translator (TranslationService | None): Сервис перевода описаний.
+            history_writer (BufferedWriter | None): Писатель строк History. По умолчанию
+                создаётся через crud.buffered().
+            postprocessor (ImagePostProcessor | None): Перекодирование изображений. По умолчанию выключено.
+            variant_samples (int): Количество изображений в режиме вариаций (от 2 до 10).
+            scheduler (FairScheduler | None): Планировщик очереди генераций. По умолчанию
+                чередование пользователей без ограничения частоты.
+            metrics (MetricsRegistry | None): Реестр метрик. Если не задан, бот не
+                инструментируется.
+            profiler (Profiler | None): Выборочный профилировщик обработчиков, генерации
+                и CRUD. Если не задан, обёртки не устанавливаются.
+            shutdown_timeout (float): Сколько секунд при остановке ждать обработки очереди
+                генераций; за задания, которые не успели запуститься, токены возвращаются.
         """
 
+        # Обработчики логов настраивает точка входа (main)
         self.logger = logging.getLogger(__name__)
-        self.logger.setLevel(logging.ERROR)
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
-        file_handler = logging.FileHandler("error.log")
-        file_handler.setLevel(logging.ERROR)
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
 
         self.token: str = token
-        self.bot: TeleBot = TeleBot(token)
+        self.bot: TeleBot = TeleBot(token, num_threads=bot_threads)
         self.image_generation_service: ImageGenerationService = image_generation_service
-        self.is_generating: bool = False
+        self.sessions: SessionStore = sessions or SessionStore()
         self.crud = crud
+        self.file_ids: FileIdCache = file_ids or FileIdCache(persistent=False)
+        self.translator: TranslationService = translator or TranslationService(
+            persistent=False
+        )
+        self.history_writer: BufferedWriter = history_writer or self.crud.buffered(
+            db, History
+        )
+        self.postprocessor: ImagePostProcessor = postprocessor or ImagePostProcessor()
+        self.variant_samples: int = min(MAX_MEDIA_GROUP, max(2, variant_samples))
+        self.shutdown_timeout: float = shutdown_timeout
+        self.profiler: Profiler | None = profiler
+        if self.profiler is not None:
+            self.profiler.instrument_method(self, "generate_and_send_image")
+            self.profiler.instrument_method(self, "_run_generation_job", "generation_job")
+            # Все записи в базу, и буферизованные, и прямые, проходят через _insert_rows
+            self.profiler.instrument_method(crud_module, "_insert_rows", "db_store")
+        self.generation_pool: GenerationWorkerPool = GenerationWorkerPool(
+            self._run_generation_job,
+            workers=generation_workers,
+            queue_size=generation_queue_size,
+            scheduler=scheduler,
+        )
+        self.metrics: MetricsRegistry | None = metrics
+        if self.metrics is not None:
+            self._instrument(self.metrics)
+
+    def _instrument(self, registry: MetricsRegistry) -> None:
+        """
+        Подключает замеры времени внешних вызовов и статистику компонентов к реестру метрик.
+
+        Аргументы:
+            registry (MetricsRegistry): Реестр метрик.
+        """
+        service = self.image_generation_service
+        instrument_method(service, "generate_image", registry, "stability_generate")
+        instrument_method(service, "_fetch", registry, "stability_upstream")
+        instrument_method(self.translator, "translate", registry, "translate")
+        instrument_method(crud_module, "_insert_rows", registry, "db_store")
+
+        registry.gauge_callback("bot_generation", "Пул воркеров генерации", self.generation_pool.stats)
+        registry.gauge_callback("bot_stability", "Сервис генерации Stability AI", service.stats)
+        registry.gauge_callback("bot_file_ids", "Кэш file_id", self.file_ids.stats)
+        registry.gauge_callback("bot_translation", "Сервис перевода", self.translator.stats)
+        registry.gauge_callback("bot_sessions", "Состояния диалогов", self.sessions.stats)
+        registry.gauge_callback("bot_postprocess", "Перекодирование изображений", self.postprocessor.stats)
+        registry.gauge_callback("bot_history_writer", "Буфер записи History", self.history_writer.stats)
 
     def send_main_menu(self, message: types.Message) -> None:
         """
@@ -156,54 +225,51 @@ class Bot:
             self.logger.error(f"В send_main_menu методе произошла ошибка: {str(e)}")
 
     def generate_and_send_image(
-        self, message: types.Message, text_description: str
+        self,
+        message: types.Message,
+        text_description: Union[str, "Future[str]"],
+        samples: int = 1,
     ) -> None:
         """
-        Генерирует изображение на основе предоставленного текстового описания и отправляет его пользователю.
+        Списывает токены и ставит генерацию изображения в очередь фоновых воркеров.
+
+        Обработчик сразу отвечает пользователю, а изображение отправляет воркер,
+        когда оно будет готово. Каждый вариант изображения стоит один токен.
 
         Аргументы:
             message (types.Message): Объект сообщения, полученный от Telegram.
-            text_description (str): Текстовое описание изображения для генерации.
+            text_description (Union[str, Future]): Описание изображения или будущий результат его перевода.
+            samples (int): Количество вариантов изображения.
         """
         try:
             chat_id: int = message.chat.id
-            encrypt_id = encrypt(chat_id, chat_id)
-            if History.update_token_count(encrypt_id):
-                user_name: str = (
-                    message.from_user.first_name or message.from_user.username
-                )
+            if UserQuota.consume(chat_id, samples):
+                ack_text: str = "Идёт🚶‍♂️ генерация изображения... 😊"
+                if samples > 1:
+                    ack_text = f"Идёт🚶‍♂️ генерация {samples} вариантов изображения... 😊"
                 generating_message: types.Message = self.bot.send_message(
-                    message.chat.id, "Идёт🚶‍♂️ генерация изображения... 😊"
+                    message.chat.id, ack_text
                 )
-                try:
-                    images: List[Dict[str, Any]] = (
-                        self.image_generation_service.generate_image(text_description)
-                    )
-                    for image in images:
-                        img_data: bytes = base64.b64decode(image["base64"])
-                        img_io: io.BytesIO = io.BytesIO(img_data)
-                        self.bot.send_photo(message.chat.id, img_io)
+                job = GenerationJob(
+                    message,
+                    text_description,
+                    generating_message.message_id,
+                    samples=samples,
+                )
+                if not self.generation_pool.submit(job):
+                    self._refund_job(job)
                     self.bot.delete_message(
                         message.chat.id, generating_message.message_id
                     )
-                    self.send_main_menu(message)
-                    token_count: int = History.get(
-                        History.chat_id == encrypt_id
-                    ).token_count
-
-                    self.crud.create()(
-                        db,
-                        History,
-                        {
-                            "chat_id": encrypt_id,
-                            "name": user_name,
-                            "number": message.message_id,
-                            "message": encrypt(message.text, chat_id),
-                            "token_count": token_count,
-                        },
+                    self.bot.reply_to(
+                        message,
+                        "Сейчас слишком много запросов на генерацию. Попробуйте чуть позже 🙏",
                     )
-                except Exception as e:
-                    self.bot.reply_to(message, f"Произошла ошибка: {str(e)}")
+            elif samples > 1:
+                self.bot.reply_to(
+                    message,
+                    f"Недостаточно токенов для вариаций. Нужно: {samples}, на сегодня осталось: {UserQuota.remaining(chat_id)}",
+                )
             else:
                 self.bot.reply_to(
                     message,
@@ -214,16 +280,250 @@ class Bot:
                 f"В generate_and_send_image методе произошла ошибка: {str(e)}"
             )
 
-    def start(self) -> None:
+    def _run_generation_job(self, job: GenerationJob) -> None:
+        """
+        Выполняет задание из очереди: генерирует изображение и отправляет его пользователю.
+
+        Вызывается в потоке воркера GenerationWorkerPool. Если изображения не удалось
+        доставить, пользователю возвращаются токены; исключение после ответа
+        пользователю пробрасывается, чтобы пул залогировал его и учёл в статистике.
+
+        Аргументы:
+            job (GenerationJob): Задание на генерацию.
+        """
+        message: types.Message = job.message
+        chat_id: int = message.chat.id
+        user_name: str = message.from_user.first_name or message.from_user.username
+        delivered: bool = False
+        try:
+            images: List[Dict[str, Any]] = self.image_generation_service.generate_image(
+                job.description(), samples=job.samples
+            )
+            if len(images) > 1:
+                self.send_media_group(
+                    chat_id, [artifact_bytes(image) for image in images]
+                )
+            else:
+                for image in images:
+                    img_data: bytes = artifact_bytes(image)
+                    self.send_image(chat_id, img_data)
+            delivered = True
+            if job.ack_message_id is not None:
+                self.bot.delete_message(chat_id, job.ack_message_id)
+            self.send_main_menu(message)
+            self.record_history(
+                message, user_name, token_count=UserQuota.remaining(chat_id)
+            )
+        except Exception as e:
+            if not delivered:
+                try:
+                    self._refund_job(job)
+                except Exception as refund_error:
+                    self.logger.error(
+                        f"Не удалось вернуть токены за неудавшуюся генерацию: {str(refund_error)}"
+                    )
+            self.bot.reply_to(message, f"Произошла ошибка: {str(e)}")
+            raise
+        finally:
+            release_connection()
+
+    def _refund_job(self, job: GenerationJob) -> None:
         """
-        Метод запускает бота и обрабатывает различные типы сообщений пользователя.
+        Возвращает пользователю токены за задание, если они ещё не были возвращены.
+
+        Аргументы:
+            job (GenerationJob): Задание на генерацию.
+        """
+        if job.claim_refund():
+            UserQuota.refund(job.message.chat.id, job.samples)
+
+    def record_history(
+        self, message: types.Message, user_name: str, **extra: Any
+    ) -> None:
+        """
+        Ставит запись о сообщении пользователя в буфер записи History.
+
+        Аргументы:
+            message (types.Message): Объект сообщения, полученный от Telegram.
+            user_name (str): Имя пользователя.
+            **extra (Any): Дополнительные поля строки, например token_count.
+        """
+        chat_id: int = message.chat.id
+        self.history_writer.add(
+            {
+                "chat_id": encrypt(chat_id, chat_id),
+                "name": user_name,
+                "number": message.message_id,
+                "message": encrypt(message.text, chat_id),
+                **extra,
+            }
+        )
+
+    def send_image(self, chat_id: int, img_data: bytes) -> None:
+        """
+        Отправляет изображение, повторно используя file_id, если оно уже загружалось.
+
+        Ключ file_id строится по исходным байтам, поэтому повторная отправка не
+        требует перекодирования; перед загрузкой изображение проходит постобработку.
+
+        Аргументы:
+            chat_id (int): Идентификатор чата.
+            img_data (bytes): Содержимое изображения.
+        """
+        key: str = content_hash(img_data)
+        file_id = self.file_ids.get(key)
+        if file_id is not None:
+            try:
+                self.bot.send_photo(chat_id, file_id)
+                self.file_ids.record_reuse(key)
+                return
+            except ApiException as e:
+                self.logger.error(f"Не удалось отправить фото по file_id: {str(e)}")
+                self.file_ids.forget(key)
+
+        upload: bytes = self.postprocessor.process(img_data)
+        # Байты уходят в multipart-запрос напрямую, без промежуточной копии в BytesIO
+        sent: types.Message = self.bot.send_photo(chat_id, upload)
+        if sent.photo:
+            self.file_ids.record_upload(key, sent.photo[-1].file_id, len(upload))
+
+    def send_media_group(self, chat_id: int, images: List[bytes]) -> None:
+        """
+        Отправляет несколько изображений одним альбомом.
+
+        Уже загружавшиеся изображения отправляются по file_id, остальные проходят
+        постобработку и загружаются в том же запросе.
+
+        Аргументы:
+            chat_id (int): Идентификатор чата.
+            images (List[bytes]): Содержимое изображений, не больше MAX_MEDIA_GROUP.
+        """
+        keys: List[str] = [content_hash(img_data) for img_data in images]
+        file_ids = [self.file_ids.get(key) for key in keys]
+        uploads: List[bytes | None] = [
+            None if file_id is not None else self.postprocessor.process(img_data)
+            for file_id, img_data in zip(file_ids, images)
+        ]
+        media = [
+            types.InputMediaPhoto(file_id if file_id is not None else upload)
+            for file_id, upload in zip(file_ids, uploads)
+        ]
+        try:
+            sent: List[types.Message] = self.bot.send_media_group(chat_id, media)
+        except ApiException as e:
+            if all(file_id is None for file_id in file_ids):
+                raise
+            self.logger.error(f"Не удалось отправить альбом по file_id: {str(e)}")
+            for key, file_id in zip(keys, file_ids):
+                if file_id is not None:
+                    self.file_ids.forget(key)
+            file_ids = [None] * len(images)
+            uploads = [
+                upload if upload is not None else self.postprocessor.process(img_data)
+                for upload, img_data in zip(uploads, images)
+            ]
+            sent = self.bot.send_media_group(
+                chat_id, [types.InputMediaPhoto(upload) for upload in uploads]
+            )
+
+        for key, file_id, upload, message in zip(keys, file_ids, uploads, sent):
+            if file_id is not None:
+                self.file_ids.record_reuse(key)
+            elif message.photo:
+                self.file_ids.record_upload(
+                    key, message.photo[-1].file_id, len(upload)
+                )
+
+    def history_page(
+        self,
+        chat_id: int,
+        user_name: str,
+        direction: Optional[str] = None,
+        cursor: Optional[Tuple[datetime, int]] = None,
+    ) -> Tuple[str, Optional[types.InlineKeyboardMarkup]]:
+        """
+        Собирает страницу истории запросов пользователя с кнопками листания.
+
+        Страница читается одним запросом по курсору (время, id), на одну строку
+        больше размера страницы, чтобы узнать, есть ли следующая. Расшифровываются
+        только строки показываемой страницы.
+
+        Аргументы:
+            chat_id (int): Идентификатор чата пользователя.
+            user_name (str): Имя пользователя.
+            direction (Optional[str]): "older" или "newer" относительно курсора. None - первая страница.
+            cursor (Optional[Tuple[datetime, int]]): Время и id крайней строки текущей страницы.
+
+        Возвращает:
+            Tuple[str, Optional[types.InlineKeyboardMarkup]]: Текст страницы и кнопки листания.
+        """
+        encrypt_id: str = encrypt(chat_id, chat_id)
+        newer: bool = direction == "newer" and cursor is not None
+        entries: List[History] = list(
+            History.requests_page(
+                encrypt_id,
+                HISTORY_PAGE_SIZE + 1,
+                before=cursor if direction == "older" else None,
+                after=cursor if newer else None,
+            )
+        )
+        has_more: bool = len(entries) > HISTORY_PAGE_SIZE
+        entries = entries[:HISTORY_PAGE_SIZE]
+        if newer:
+            entries.reverse()
+        has_newer: bool = has_more if newer else cursor is not None
+        has_older: bool = True if newer else has_more
+
+        if not entries:
+            if cursor is not None:
+                # Строки за курсором удалены или перенесены в архив: начинаем сначала
+                return self.history_page(chat_id, user_name)
+            return f"У пользователя {user_name} пока нет запросов.", None
+
+        lines: List[str] = [
+            f"Последние запросы пользователя {user_name}:"
+            if not has_newer
+            else f"Более ранние запросы пользователя {user_name}:"
+        ]
+        for entry, text in zip(
+            entries,
+            codec.decrypt_many([entry.message for entry in entries], chat_id),
+        ):
+            lines.append(f"{entry.last_generated_at:%d.%m.%Y %H:%M} - {text}")
+
+        buttons: List[types.InlineKeyboardButton] = []
+        if has_newer:
+            first = entries[0]
+            buttons.append(
+                types.InlineKeyboardButton(
+                    "⬅️ Новее",
+                    callback_data=f"{HISTORY_CALLBACK}:newer:{first.id}:{first.last_generated_at}",
+                )
+            )
+        if has_older:
+            last = entries[-1]
+            buttons.append(
+                types.InlineKeyboardButton(
+                    "Старше ➡️",
+                    callback_data=f"{HISTORY_CALLBACK}:older:{last.id}:{last.last_generated_at}",
+                )
+            )
+        markup: Optional[types.InlineKeyboardMarkup] = None
+        if buttons:
+            markup = types.InlineKeyboardMarkup()
+            markup.row(*buttons)
+        return "\n".join(lines), markup
+
+    def register_handlers(self) -> None:
+        """
+        Регистрирует обработчики команд, сообщений и нажатий кнопок пользователя.
 
         Бот реагирует на команды, сообщения и нажатия кнопок, выполняя соответствующие действия.
+        Текстовые сообщения разбирает один обработчик TeleBot через таблицу маршрутов self.router.
         """
 
         try:
 
-            @self.bot.message_handler(commands=["start", "menu"])
             def send_welcome(message: types.Message) -> None:
                 """
                 Приветствует пользователя и отправляет основное меню.
@@ -236,16 +536,7 @@ class Bot:
                     message.from_user.first_name or message.from_user.username
                 )
 
-                self.crud.create()(
-                    db,
-                    History,
-                    {
-                        "chat_id": encrypt(message.chat.id, message.chat.id),
-                        "name": user_name,
-                        "number": message.message_id,
-                        "message": encrypt(message.text, message.chat.id),
-                    },
-                )
+                self.record_history(message, user_name)
                 welcome_message: str = f"""Здравствуй, {user_name}🙃! Я твой бот 'Мастер фломастер 😉'. 
 
     Хочешь создать красивое изображение по своему описанию? Просто напиши мне, что ты хочешь увидеть, и я нарисую это для тебя!
@@ -256,15 +547,15 @@ class Bot:
     /high - наибольшее количество запросов
     /history - история Ваших запросов
     /tokens - токены
+    /variants - несколько вариантов изображения за один запрос
     /info - информация
     """
                 self.bot.reply_to(message, welcome_message)
                 self.send_main_menu(message)
 
-            @self.bot.message_handler(commands=["history"])
             def send_history(message: types.Message) -> None:
                 """
-                Отправляет пользовательскую историю запросов, исключая запросы, начинающиеся с '/'.
+                Отправляет первую страницу истории запросов, исключая запросы, начинающиеся с '/'.
 
                 Аргументы:
                     message (types.Message): Объект сообщения, полученный от Telegram.
@@ -272,35 +563,48 @@ class Bot:
                 user_name: str = (
                     message.from_user.first_name or message.from_user.username
                 )
-                user_id: int = message.chat.id
-                encrypt_id: str = encrypt(message.chat.id, message.chat.id)
-                history_entries = (
-                    History.select()
-                    .where(
-                        (History.chat_id == encrypt_id)
-                        & ~(History.message.startswith("/"))
-                    )
-                    .order_by(History.last_generated_at.desc())
-                    .limit(10)
+                history_text, markup = self.history_page(message.chat.id, user_name)
+
+                self.record_history(message, user_name)
+                self.bot.send_message(
+                    message.chat.id, history_text, reply_markup=markup
                 )
 
-                history_text: str = f"Последние 10 запросов пользователя {user_name}:\n"
-                for entry in history_entries:
-                    history_text += f"Сообщение: {decrypt(entry.message, user_id)}\n"
-
-                self.crud.create()(
-                    db,
-                    History,
-                    {
-                        "chat_id": encrypt(message.chat.id, message.chat.id),
-                        "name": user_name,
-                        "number": message.message_id,
-                        "message": encrypt(message.text, message.chat.id),
-                    },
+            @self.bot.callback_query_handler(
+                func=lambda call: (call.data or "").startswith(f"{HISTORY_CALLBACK}:")
+            )
+            def handle_history_page(call: types.CallbackQuery) -> None:
+                """
+                Обрабатывает нажатие кнопок листания истории: заменяет страницу в том же сообщении.
+
+                Аргументы:
+                    call (types.CallbackQuery): Нажатие inline-кнопки.
+                """
+                try:
+                    _, direction, entry_id, generated_at = call.data.split(":", 3)
+                    cursor = (datetime.fromisoformat(generated_at), int(entry_id))
+                except ValueError:
+                    direction = None
+                if direction not in ("older", "newer"):
+                    self.bot.answer_callback_query(call.id, "Кнопка устарела")
+                    return
+                user_name: str = call.from_user.first_name or call.from_user.username
+                history_text, markup = self.history_page(
+                    call.message.chat.id, user_name, direction, cursor
                 )
-                self.bot.send_message(message.chat.id, history_text)
+                try:
+                    self.bot.edit_message_text(
+                        history_text,
+                        call.message.chat.id,
+                        call.message.message_id,
+                        reply_markup=markup,
+                    )
+                except ApiException as e:
+                    self.logger.error(
+                        f"Не удалось обновить страницу истории: {str(e)}"
+                    )
+                self.bot.answer_callback_query(call.id)
 
-            @self.bot.message_handler(commands=["low"])
             def send_low_months(message: types.Message) -> None:
                 """
                 Отправляет месяц с наименьшим количеством запросов.
@@ -313,31 +617,10 @@ class Bot:
                     message.from_user.first_name or message.from_user.username
                 )
 
-                self.crud.create()(
-                    db,
-                    History,
-                    {
-                        "chat_id": encrypt(message.chat.id, message.chat.id),
-                        "name": user_name,
-                        "number": message.message_id,
-                        "message": encrypt(message.text, message.chat.id),
-                    },
-                )
-                months = (
-                    History.select(
-                        fn.strftime("%Y-%m", History.last_generated_at).alias("month"),
-                        fn.COUNT(History.id).alias("total_requests"),
-                    )
-                    .where(
-                        (History.chat_id == user_id)
-                        & ~(History.message.startswith("/"))
-                    )
-                    .group_by("month")
-                    .order_by("total_requests")
-                )
+                self.record_history(message, user_name)
+                lowest_month = MonthlyRequests.lowest(user_id)
 
-                if months:
-                    lowest_month = min(months, key=lambda x: x.total_requests)
+                if lowest_month is not None:
                     self.bot.send_message(
                         message.chat.id,
                         f"Наименьшее количество запросов у вас было в месяце {lowest_month.month}, всего {lowest_month.total_requests} запросов.",
@@ -348,7 +631,6 @@ class Bot:
                         "У вас нет запросов, которые не начинаются с символа '/'.",
                     )
 
-            @self.bot.message_handler(commands=["high"])
             def send_high_months(message: types.Message) -> None:
                 """
                 Отправляет месяц с наибольшим количеством запросов.
@@ -361,31 +643,10 @@ class Bot:
                     message.from_user.first_name or message.from_user.username
                 )
 
-                self.crud.create()(
-                    db,
-                    History,
-                    {
-                        "chat_id": encrypt(message.chat.id, message.chat.id),
-                        "name": user_name,
-                        "number": message.message_id,
-                        "message": encrypt(message.text, message.chat.id),
-                    },
-                )
-                months = (
-                    History.select(
-                        fn.strftime("%Y-%m", History.last_generated_at).alias("month"),
-                        fn.COUNT(History.id).alias("total_requests"),
-                    )
-                    .where(
-                        (History.chat_id == user_id)
-                        & ~(History.message.startswith("/"))
-                    )
-                    .group_by("month")
-                    .order_by("total_requests")
-                )
+                self.record_history(message, user_name)
+                highest_month = MonthlyRequests.highest(user_id)
 
-                if months:
-                    highest_month = max(months, key=lambda x: x.total_requests)
+                if highest_month is not None:
                     self.bot.send_message(
                         message.chat.id,
                         f"Наибольшее количество запросов у вас было в месяце {highest_month.month}, всего {highest_month.total_requests} запросов.",
@@ -396,9 +657,6 @@ class Bot:
                         "У вас нет запросов, которые не начинаются с символа '/'.",
                     )
 
-            @self.bot.message_handler(
-                func=lambda message: message.text == "Генерировать изображение 🌄"
-            )
             def handle_generate_button(message: types.Message) -> None:
                 """
                 Обрабатывает нажатие кнопки "Генерировать изображение".
@@ -406,12 +664,14 @@ class Bot:
                 Аргументы:
                     message (types.Message): Объект сообщения, полученный от Telegram.
                 """
-                self.is_generating = False
+                self.sessions.set_generating(message.chat.id, False)
                 markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
                 button_start_generate = types.KeyboardButton("Начать генерацию 🎨")
+                button_variants = types.KeyboardButton("Вариации 🎲")
                 button_settings_generate = types.KeyboardButton("Токены 💰")
                 button_back = types.KeyboardButton("Вернуться в меню ⬅️")
-                markup.add(button_start_generate, button_settings_generate)
+                markup.add(button_start_generate, button_variants)
+                markup.add(button_settings_generate)
                 markup.row(button_back)
                 self.bot.send_message(
                     message.chat.id,
@@ -419,11 +679,7 @@ class Bot:
                     reply_markup=markup,
                 )
 
-            @self.bot.message_handler(
-                func=lambda message: message.text == "Инструкция ❓"
-                or message.text == "/info"
-            )
-            def handle_generate_button(message: types.Message) -> None:
+            def handle_info_button(message: types.Message) -> None:
                 """
                 Обрабатывает нажатие кнопки "Инструкция".
 
@@ -446,6 +702,8 @@ class Bot:
                 3. Введите краткое описание для изображения и отправьте мне
                 4. Дождитесь генерации изображения. После этого вы можете продолжить генерацию новых изображений или вернуться в главное меню.
 
+            Кнопка "Вариации 🎲" (или /variants) рисует сразу несколько вариантов по одному описанию и присылает их одним альбомом.
+
             Обратите внимание❗️ Количество генераций ограничено. На день даётся 50 токенов. Один токен - одна картинка.
             Посмотреть токены можно нажав на кнопку Токены 💰 или написав /tokens.
             Для получения более подробной инструкции по использованию других функций, просто напишите /menu.
@@ -456,10 +714,6 @@ class Bot:
                     message.chat.id, instruction_text, reply_markup=markup
                 )
 
-            @self.bot.message_handler(
-                func=lambda message: message.text == "Начать генерацию 🎨"
-                and not self.is_generating
-            )
             def handle_generate_start(message: types.Message) -> None:
                 """
                 Обрабатывает начало процесса генерации изображения.
@@ -467,7 +721,7 @@ class Bot:
                 Аргументы:
                     message (types.Message): Объект сообщения, полученный от Telegram.
                 """
-                self.is_generating = True
+                self.sessions.set_generating(message.chat.id, True)
                 markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
                 button_return_menu = types.KeyboardButton("Вернуться в меню ⬅️")
                 markup.add(button_return_menu)
@@ -477,10 +731,25 @@ class Bot:
                     reply_markup=markup,
                 )
 
-            @self.bot.message_handler(
-                func=lambda message: message.text == "Токены 💰"
-                or message.text == "/tokens"
-            )
+            def handle_variants_start(message: types.Message) -> None:
+                """
+                Обрабатывает начало генерации нескольких вариантов изображения.
+
+                Аргументы:
+                    message (types.Message): Объект сообщения, полученный от Telegram.
+                """
+                self.sessions.set_generating(
+                    message.chat.id, True, samples=self.variant_samples
+                )
+                markup = types.ReplyKeyboardMarkup(resize_keyboard=True)
+                button_return_menu = types.KeyboardButton("Вернуться в меню ⬅️")
+                markup.add(button_return_menu)
+                self.bot.send_message(
+                    message.chat.id,
+                    f"Напишите мне краткое описание изображения. Количество вариантов: {self.variant_samples}, каждый стоит один токен",
+                    reply_markup=markup,
+                )
+
             def handle_generate_settings(message: types.Message) -> None:
                 """
                 Обрабатывает запросы информации о токенах.
@@ -488,20 +757,12 @@ class Bot:
                 Аргументы:
                     message (types.Message): Объект сообщения, полученный от Telegram.
                 """
-                chat_id: str = encrypt(message.chat.id, message.chat.id)
-                try:
-                    user_history = History.get(History.chat_id == chat_id)
-                    remaining_tokens: int = user_history.token_count
-                    self.bot.send_message(
-                        message.chat.id,
-                        f"На сегодня осталось: {remaining_tokens} токен",
-                    )
-                except History.DoesNotExist:
-                    self.bot.reply_to(message, "Ошибка: у вас нет истории запросов.")
+                remaining_tokens: int = UserQuota.remaining(message.chat.id)
+                self.bot.send_message(
+                    message.chat.id,
+                    f"На сегодня осталось: {remaining_tokens} токен",
+                )
 
-            @self.bot.message_handler(
-                func=lambda message: message.text == "Вернуться в меню ⬅️"
-            )
             def handle_return_to_menu(message: types.Message) -> None:
                 """
                 Обрабатывает возвращение в основное меню.
@@ -511,65 +772,170 @@ class Bot:
                 """
                 self.send_main_menu(message)
 
-            @self.bot.message_handler(content_types=["text"])
             def handle_generate_description(message: types.Message) -> None:
                 """
                 Обрабатывает текстовое описание для генерации изображения.
 
+                Вне режима генерации отвечает, что запрос не распознан.
+
                 Аргументы:
                     message (types.Message): Объект сообщения, полученный от Telegram.
                 """
-                if self.is_generating:
+                if self.sessions.is_generating(message.chat.id):
                     try:
                         if message.text == "Вернуться в меню ⬅️":
                             self.send_main_menu(message)
-                            self.is_generating = False
+                            self.sessions.set_generating(message.chat.id, False)
                         else:
-                            text_description: str = message.text
+                            text_description: Union[str, Future] = message.text
                             if message.from_user.language_code == "ru":
-                                text_description = translate(text_description, "en")
-                            self.generate_and_send_image(message, text_description)
-                            self.is_generating = False
+                                # Перевод идёт в фоне, пока проверяются токены
+                                text_description = self.translator.submit(
+                                    message.text, "en"
+                                )
+                            self.generate_and_send_image(
+                                message,
+                                text_description,
+                                samples=self.sessions.samples(message.chat.id),
+                            )
+                            self.sessions.set_generating(message.chat.id, False)
                     except Exception as e:
                         self.bot.reply_to(message, f"Произошла ошибка: {str(e)}")
-
-            @self.bot.message_handler(func=lambda message: True)
-            def handle_other_messages(message: types.Message) -> None:
-                """
-                Обрабатывает другие сообщения пользователя.
-
-                Аргументы:
-                    message (types.Message): Объект сообщения, полученный от Telegram.
-                """
-                if not self.is_generating:
+                else:
                     self.bot.reply_to(
                         message, "Извините, я не могу обработать ваш запрос."
                     )
 
+            def not_generating(message: types.Message) -> bool:
+                return not self.sessions.is_generating(message.chat.id)
+
+            # Во время генерации кнопки запуска считаются описанием, как и любой текст
+            self.router = Router(fallback=handle_generate_description)
+            self.router.add(send_welcome, "/start", "/menu")
+            self.router.add(send_history, "/history")
+            self.router.add(send_low_months, "/low")
+            self.router.add(send_high_months, "/high")
+            self.router.add(handle_generate_button, "Генерировать изображение 🌄")
+            self.router.add(handle_info_button, "Инструкция ❓", "/info")
+            self.router.add(
+                handle_generate_start, "Начать генерацию 🎨", when=not_generating
+            )
+            self.router.add(
+                handle_variants_start, "Вариации 🎲", "/variants", when=not_generating
+            )
+            self.router.add(handle_generate_settings, "Токены 💰", "/tokens")
+            self.router.add(handle_return_to_menu, "Вернуться в меню ⬅️")
+            self.bot.message_handler(content_types=["text"])(self.router.dispatch)
+
+            for handlers in (self.bot.message_handlers, self.bot.callback_query_handlers):
+                for handler in handlers:
+                    handler["function"] = releases_connection(handler["function"])
+
+            if self.metrics is not None:
+                instrument_handlers(self.bot, self.metrics, self.router.handlers)
+            if self.profiler is not None:
+                self.profiler.instrument_handlers(self.bot, self.router.handlers)
+
+        except Exception as e:
+            self.logger.error(
+                f"Произошла ошибка в методе register_handlers: {str(e)}"
+            )
+
+    def start(self) -> None:
+        """
+        Метод запускает бота и получает обновления через long polling.
+        """
+
+        try:
+            self.register_handlers()
+            self.generation_pool.start()
             self.bot.polling()
         except Exception as e:
             self.logger.error(f"Произошла ошибка в методе start: {str(e)}")
+        finally:
+            self.shutdown()
+
+    def start_webhook(
+        self, host: str, port: int, url: str, path: str, secret_token: str
+    ) -> None:
+        """
+        Метод запускает бота в режиме webhook: обновления принимает HTTP-сервер.
 
+        Аргументы:
+            host (str): Адрес, на котором слушает HTTP-сервер.
+            port (int): Порт HTTP-сервера.
+            url (str): Публичный адрес сервера для setWebhook. Пустая строка - не регистрировать.
+            path (str): Путь эндпоинта обновлений.
+            secret_token (str): Секрет, который Telegram передаёт в заголовке запроса.
+                Пустая строка - сгенерировать случайный секрет при регистрации адреса.
+
+        Исключения:
+            RuntimeError: Если не заданы ни secret_token, ни url: проверять заголовок было бы нечем.
+        """
 
-def main() -> None:
-    """
-    Основная функция запуска бота.
-    """
-    settings: ProjectSettings = ProjectSettings()
-    TOKEN: str = settings.bot_token.get_secret_value()
-    STABILITY_AI_TOKEN: str = settings.stability_ai_token.get_secret_value()
-    STABILITY_AI_URL: str = settings.stability_ai_url
+        # Flask нужен только в режиме webhook
+        from my_bot.webhook import WebhookServer
 
-    db.connect()
-    db.create_tables([History])
+        try:
+            if not secret_token:
+                if not url:
+                    raise RuntimeError(
+                        "Для режима webhook без WEBHOOK_URL задайте WEBHOOK_SECRET"
+                    )
+                # Адрес регистрирует сам бот, поэтому случайный секрет достаточно передать в setWebhook
+                secret_token = secrets.token_urlsafe(32)
+            self.register_handlers()
+            self.generation_pool.start()
+            server = WebhookServer(self.bot, host, port, path, secret_token)
+            if url:
+                server.set_webhook(url.rstrip("/") + path)
+            server.serve_forever()
+        except RuntimeError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Произошла ошибка в методе start_webhook: {str(e)}")
+        finally:
+            self.shutdown()
 
-    crud: CRUDInterface = CRUDInterface()
+    def shutdown(self) -> None:
+        """
+        Останавливает фоновые компоненты бота.
 
-    bot: Bot = Bot(
-        TOKEN, ImageGenerationService(STABILITY_AI_TOKEN, STABILITY_AI_URL), crud
-    )
+        Сначала пул генерации обрабатывает очередь в пределах shutdown_timeout, а за
+        задания, которые не успели запуститься или завершиться, пользователям
+        возвращаются токены. Затем сохраняется буфер History и останавливаются
+        перевод и постобработка, которые нужны заданиям генерации.
+        """
+        unstarted: List[GenerationJob] = self.generation_pool.shutdown(
+            timeout=self.shutdown_timeout
+        )
+        running: List[GenerationJob] = self.generation_pool.running()
+        for job in unstarted + running:
+            try:
+                self._refund_job(job)
+            except Exception as e:
+                self.logger.error(f"Не удалось вернуть токены за отменённую генерацию: {str(e)}")
+        if unstarted:
+            self.logger.error(
+                f"Генерации отменены при остановке, токены возвращены: {len(unstarted)}"
+            )
+        if running:
+            chat_ids = ", ".join(str(job.message.chat.id) for job in running)
+            self.logger.error(
+                f"Генерации не завершились за {self.shutdown_timeout} с, токены возвращены чатам: {chat_ids}"
+            )
+        self.history_writer.close()
+        self.translator.shutdown()
+        self.postprocessor.shutdown()
+
+
+def main() -> None:
+    """
+    Основная функция запуска бота. Делает то же, что и python main.py.
+    """
+    from main import main as run
 
-    bot.start()
+    run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,204 @@
+import io
+import logging
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, List, Optional, Tuple
+
+from my_bot.stats import percentile
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Форматы, в которые умеет перекодировать постобработка
+SUPPORTED_FORMATS = ("JPEG", "WEBP")
+
+
+def reencode_image(
+    data: bytes, image_format: str, quality: int, max_side: int
+) -> Tuple[bytes, float]:
+    """
+    Перекодирует изображение с заданным качеством, уменьшая его до max_side по большей стороне.
+
+    Выполняется в дочернем процессе, поэтому Pillow импортируется здесь, а не при
+    загрузке модуля.
+
+    Аргументы:
+        data (bytes): Исходное изображение.
+        image_format (str): Формат результата: JPEG или WEBP.
+        quality (int): Качество сжатия от 1 до 100.
+        max_side (int): Максимальный размер большей стороны в пикселях. 0 - не уменьшать.
+
+    Возвращает:
+        Tuple[bytes, float]: Перекодированное изображение и время кодирования в мс.
+    """
+    from PIL import Image
+
+    started = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as image:
+        if max_side and max(image.size) > max_side:
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format=image_format, quality=quality, optimize=True)
+    return output.getvalue(), (time.perf_counter() - started) * 1000
+
+
+class ImagePostProcessor:
+    """
+    Перекодирование изображений перед отправкой в Telegram, чтобы уменьшить загрузку.
+
+    Telegram всё равно пережимает фотографии, поэтому PNG от Stability AI можно
+    отправлять в JPEG или WebP. Кодирование выполняется в пуле процессов и не
+    держит GIL в потоках обработчиков.
+
+    Атрибуты:
+        enabled (bool): Включена ли постобработка.
+        image_format (str): Формат результата: JPEG или WEBP.
+        quality (int): Качество сжатия от 1 до 100.
+        max_side (int): Максимальный размер большей стороны в пикселях.
+        workers (int): Количество процессов кодирования.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        image_format: str = "JPEG",
+        quality: int = 85,
+        max_side: int = 1024,
+        workers: int = 2,
+        history_size: int = 500,
+    ) -> None:
+        """
+        Инициализирует постобработку. Пул процессов создаётся при первом изображении.
+
+        Аргументы:
+            enabled (bool): Включена ли постобработка.
+            image_format (str): Формат результата: JPEG или WEBP.
+            quality (int): Качество сжатия от 1 до 100.
+            max_side (int): Максимальный размер большей стороны в пикселях. 0 - не уменьшать.
+            workers (int): Количество процессов кодирования.
+            history_size (int): Количество последних изображений, хранимых для статистики.
+
+        Исключения:
+            ValueError: Если формат не поддерживается.
+        """
+        image_format = image_format.upper()
+        if image_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Неподдерживаемый формат постобработки: {image_format}")
+        self.logger = logging.getLogger(__name__)
+        self.enabled: bool = enabled
+        self.image_format: str = image_format
+        self.quality: int = min(100, max(1, quality))
+        self.max_side: int = max(0, max_side)
+        self.workers: int = max(1, workers)
+        self._executor: Optional["ProcessPoolExecutor"] = None
+        self._lock = threading.Lock()
+        self._processed: int = 0
+        self._errors: int = 0
+        self._bytes_before: int = 0
+        self._bytes_after: int = 0
+        self._records: Deque[Dict[str, float]] = deque(maxlen=history_size)
+
+    def process(self, data: bytes) -> bytes:
+        """
+        Перекодирует изображение. При ошибке или выключенной постобработке возвращает исходное.
+
+        Аргументы:
+            data (bytes): Исходное изображение.
+
+        Возвращает:
+            bytes: Изображение для отправки.
+        """
+        if not self.enabled:
+            return data
+        started = time.perf_counter()
+        try:
+            result, encode_ms = self._get_executor().submit(
+                reencode_image, bytes(data), self.image_format, self.quality, self.max_side
+            ).result()
+        except Exception as e:
+            self.logger.error(f"Ошибка при перекодировании изображения: {str(e)}")
+            with self._lock:
+                self._errors += 1
+            return data
+        if len(result) >= len(data):
+            result = data
+        with self._lock:
+            self._processed += 1
+            self._bytes_before += len(data)
+            self._bytes_after += len(result)
+            self._records.append(
+                {
+                    "bytes_before": len(data),
+                    "bytes_after": len(result),
+                    "encode_ms": encode_ms,
+                    "total_ms": (time.perf_counter() - started) * 1000,
+                }
+            )
+        return result
+
+    def records(self) -> List[Dict[str, float]]:
+        """
+        Возвращает сведения о последних перекодированных изображениях.
+
+        Возвращает:
+            List[Dict[str, float]]: Размер до и после, время кодирования и полное время для каждого изображения.
+        """
+        with self._lock:
+            return [dict(record) for record in self._records]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает суммарную экономию и задержки перекодирования.
+
+        Возвращает:
+            Dict[str, Any]: Количество изображений, байты до и после, перцентили времени (мс).
+        """
+        with self._lock:
+            encode_times = sorted(record["encode_ms"] for record in self._records)
+            total_times = sorted(record["total_ms"] for record in self._records)
+            return {
+                "enabled": self.enabled,
+                "processed": self._processed,
+                "errors": self._errors,
+                "bytes_before": self._bytes_before,
+                "bytes_after": self._bytes_after,
+                "saved_ratio": round(1 - self._bytes_after / self._bytes_before, 4)
+                if self._bytes_before
+                else 0.0,
+                "encode_ms_p50": percentile(encode_times, 50),
+                "encode_ms_p95": percentile(encode_times, 95),
+                "total_ms_p50": percentile(total_times, 50),
+                "total_ms_p95": percentile(total_times, 95),
+            }
+
+    def shutdown(self) -> None:
+        """
+        Останавливает пул процессов.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def _get_executor(self) -> "ProcessPoolExecutor":
+        with self._lock:
+            if self._executor is None:
+                # multiprocessing нужен только при включённой постобработке
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+
+                # fork из многопоточного процесса копирует захваченные другими потоками
+                # блокировки (логирование, пул соединений), и дочерний процесс может зависнуть
+                start_method = (
+                    "forkserver"
+                    if "forkserver" in multiprocessing.get_all_start_methods()
+                    else "spawn"
+                )
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(start_method),
+                )
+            return self._executor
@@ -0,0 +1,98 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from telebot import types
+
+Handler = Callable[[types.Message], None]
+Guard = Callable[[types.Message], bool]
+
+
+def route_key(text: Optional[str]) -> str:
+    """
+    Возвращает ключ маршрута для текста сообщения.
+
+    Для команды это сама команда без аргументов и без @имени бота ("/start@bot x" -> "/start"),
+    как при разборе команд в TeleBot. Для остального текста - текст целиком.
+
+    Аргументы:
+        text (Optional[str]): Текст сообщения.
+
+    Возвращает:
+        str: Ключ маршрута.
+    """
+    if not text:
+        return ""
+    if text.startswith("/"):
+        return text.split(maxsplit=1)[0].split("@", 1)[0]
+    return text
+
+
+class Router:
+    """
+    Таблица маршрутов текстовых сообщений: команда или текст кнопки -> обработчик.
+
+    Вместо перебора фильтров всех обработчиков TeleBot сообщение разбирается
+    одним поиском в словаре. Сообщения без маршрута, а также сообщения, чей
+    маршрут отклонило условие when, уходят в обработчик свободного текста.
+
+    Маршруты хранятся словарями с ключом "function", как обработчики в TeleBot,
+    поэтому их можно обернуть теми же средствами, что и обработчики бота.
+
+    Атрибуты:
+        handlers (List[Dict[str, Any]]): Маршруты и обработчик свободного текста в порядке регистрации.
+    """
+
+    def __init__(self, fallback: Handler) -> None:
+        """
+        Инициализирует таблицу с обработчиком свободного текста.
+
+        Аргументы:
+            fallback (Handler): Обработчик сообщений без маршрута.
+        """
+        self._fallback: Dict[str, Any] = {"function": fallback, "when": None}
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self.handlers: List[Dict[str, Any]] = [self._fallback]
+
+    def add(self, handler: Handler, *keys: str, when: Optional[Guard] = None) -> None:
+        """
+        Регистрирует обработчик для команд и текстов кнопок.
+
+        Аргументы:
+            handler (Handler): Обработчик сообщения.
+            *keys (str): Команды ("/tokens") и тексты кнопок ("Токены 💰").
+            when (Optional[Guard]): Дополнительное условие. Если оно ложно, сообщение
+                обрабатывается как свободный текст.
+
+        Исключения:
+            ValueError: Если ключ уже занят другим маршрутом.
+        """
+        route: Dict[str, Any] = {"function": handler, "when": when}
+        for key in keys:
+            key = route_key(key)
+            if key in self._routes:
+                raise ValueError(f"Маршрут {key!r} уже зарегистрирован")
+            self._routes[key] = route
+        self.handlers.append(route)
+
+    def resolve(self, message: types.Message) -> Dict[str, Any]:
+        """
+        Находит маршрут сообщения.
+
+        Аргументы:
+            message (types.Message): Объект сообщения, полученный от Telegram.
+
+        Возвращает:
+            Dict[str, Any]: Маршрут с обработчиком в ключе "function".
+        """
+        route = self._routes.get(route_key(message.text))
+        if route is None or (route["when"] is not None and not route["when"](message)):
+            return self._fallback
+        return route
+
+    def dispatch(self, message: types.Message) -> None:
+        """
+        Передаёт сообщение обработчику его маршрута.
+
+        Аргументы:
+            message (types.Message): Объект сообщения, полученный от Telegram.
+        """
+        self.resolve(message)["function"](message)
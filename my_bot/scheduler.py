@@ -0,0 +1,276 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Generic, Hashable, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты по алгоритму token bucket.
+
+    Токены пополняются со скоростью rate в секунду, но не больше capacity.
+    Не потокобезопасен: вызывающий код держит собственную блокировку.
+
+    Атрибуты:
+        rate (float): Скорость пополнения в токенах в секунду. 0 отключает ограничение.
+        capacity (float): Максимальное количество накопленных токенов.
+    """
+
+    __slots__ = ("rate", "capacity", "_tokens", "_updated_at")
+
+    def __init__(self, rate: float, capacity: float, now: Optional[float] = None) -> None:
+        """
+        Инициализирует заполненную корзину.
+
+        Аргументы:
+            rate (float): Скорость пополнения в токенах в секунду. 0 отключает ограничение.
+            capacity (float): Максимальное количество накопленных токенов.
+            now (Optional[float]): Текущее время (time.monotonic()).
+        """
+        self.rate: float = max(0.0, rate)
+        self.capacity: float = max(1.0, capacity)
+        self._tokens: float = self.capacity
+        self._updated_at: float = time.monotonic() if now is None else now
+
+    def delay(self, cost: float, now: float) -> float:
+        """
+        Возвращает, через сколько секунд в корзине наберётся cost токенов.
+
+        Аргументы:
+            cost (float): Требуемое количество токенов.
+            now (float): Текущее время (time.monotonic()).
+
+        Возвращает:
+            float: Задержка в секундах, 0 - токенов уже достаточно.
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill(now)
+        missing = min(cost, self.capacity) - self._tokens
+        return max(0.0, missing / self.rate)
+
+    def take(self, cost: float, now: float) -> None:
+        """
+        Списывает токены. Вызывается после того, как delay() вернул 0.
+
+        Аргументы:
+            cost (float): Количество токенов.
+            now (float): Текущее время (time.monotonic()).
+        """
+        if self.rate <= 0:
+            return
+        self._refill(now)
+        self._tokens -= min(cost, self.capacity)
+
+    def is_full(self, now: float) -> bool:
+        """
+        Проверяет, восстановилась ли корзина полностью.
+
+        Аргументы:
+            now (float): Текущее время (time.monotonic()).
+
+        Возвращает:
+            bool: True, если корзина заполнена.
+        """
+        if self.rate <= 0:
+            return True
+        self._refill(now)
+        return self._tokens >= self.capacity
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+
+class FairScheduler(Generic[T]):
+    """
+    Очередь заданий с честным чередованием пользователей и ограничением частоты.
+
+    У каждого пользователя своя очередь и своя корзина токенов, поверх них действует
+    общая корзина. Следующее задание берётся у пользователя, которому корзины
+    разрешают запуск, а среди них - у пользователя с наименьшим числом ожидающих
+    заданий; при равенстве - у того, кто дольше не обслуживался. Все проверки
+    выполняются в памяти.
+
+    Атрибуты:
+        max_pending (int): Максимальное количество ожидающих заданий всех пользователей.
+        user_rate (float): Запусков в секунду на пользователя. 0 отключает ограничение.
+        user_burst (int): Сколько запусков пользователь может сделать подряд.
+        global_rate (float): Запусков в секунду на всех. 0 отключает ограничение.
+        global_burst (int): Сколько запусков можно сделать подряд на всех.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 100,
+        user_rate: float = 0.0,
+        user_burst: int = 4,
+        global_rate: float = 0.0,
+        global_burst: int = 10,
+    ) -> None:
+        """
+        Инициализирует планировщик.
+
+        Аргументы:
+            max_pending (int): Максимальное количество ожидающих заданий всех пользователей.
+            user_rate (float): Запусков в секунду на пользователя. 0 отключает ограничение.
+            user_burst (int): Сколько запусков пользователь может сделать подряд.
+            global_rate (float): Запусков в секунду на всех. 0 отключает ограничение.
+            global_burst (int): Сколько запусков можно сделать подряд на всех.
+        """
+        self.max_pending: int = max(1, max_pending)
+        self.user_rate: float = user_rate
+        self.user_burst: int = user_burst
+        self.global_rate: float = global_rate
+        self.global_burst: int = global_burst
+        self._condition = threading.Condition()
+        # Порядок ключей - порядок обслуживания: в конце тот, кого обслужили последним
+        self._queues: "OrderedDict[Hashable, Deque[Tuple[T, float]]]" = OrderedDict()
+        self._buckets: Dict[Hashable, TokenBucket] = {}
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+        self._pending: int = 0
+        self._closed: bool = False
+        self._dispatched: int = 0
+        self._rejected: int = 0
+        self._throttled_waits: int = 0
+
+    def put(self, key: Hashable, item: T, cost: float = 1.0) -> bool:
+        """
+        Ставит задание пользователя в очередь без ожидания.
+
+        Аргументы:
+            key (Hashable): Идентификатор пользователя.
+            item (T): Задание.
+            cost (float): Сколько токенов корзин стоит запуск задания.
+
+        Возвращает:
+            bool: True, если задание принято, False, если очередь переполнена или закрыта.
+        """
+        with self._condition:
+            if self._closed or self._pending >= self.max_pending:
+                self._rejected += 1
+                return False
+            user_queue = self._queues.get(key)
+            if user_queue is None:
+                user_queue = self._queues[key] = deque()
+            user_queue.append((item, cost))
+            self._pending += 1
+            self._condition.notify()
+            return True
+
+    def get(self) -> Optional[T]:
+        """
+        Ждёт и возвращает следующее задание.
+
+        Возвращает:
+            Optional[T]: Задание или None, если планировщик закрыт и очередь пуста.
+        """
+        with self._condition:
+            while True:
+                if self._pending == 0:
+                    if self._closed:
+                        return None
+                    self._condition.wait()
+                    continue
+                item, wait = self._pick_locked(time.monotonic())
+                if item is not None:
+                    return item
+                self._throttled_waits += 1
+                self._condition.wait(wait)
+
+    def close(self) -> None:
+        """
+        Перестаёт принимать задания. Ожидающие задания всё ещё выдаются get().
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def drain(self) -> List[T]:
+        """
+        Забирает из очереди все ожидающие задания, не выдавая их get().
+
+        Возвращает:
+            List[T]: Задания в порядке постановки в очередь каждого пользователя.
+        """
+        with self._condition:
+            items = [item for user_queue in self._queues.values() for item, _ in user_queue]
+            self._queues.clear()
+            self._pending = 0
+            self._condition.notify_all()
+            return items
+
+    def qsize(self) -> int:
+        """
+        Возвращает количество ожидающих заданий.
+
+        Возвращает:
+            int: Длина очереди.
+        """
+        with self._condition:
+            return self._pending
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние планировщика.
+
+        Возвращает:
+            Dict[str, Any]: Ожидающие задания и пользователи, счётчики выдачи и ожиданий из-за лимитов.
+        """
+        with self._condition:
+            depths = [len(user_queue) for user_queue in self._queues.values()]
+            return {
+                "pending": self._pending,
+                "waiting_users": len(depths),
+                "max_user_depth": max(depths, default=0),
+                "dispatched": self._dispatched,
+                "rejected": self._rejected,
+                "throttled_waits": self._throttled_waits,
+                "tracked_buckets": len(self._buckets),
+            }
+
+    def _pick_locked(self, now: float) -> Tuple[Optional[T], float]:
+        best_key = None
+        best_depth = 0
+        wait = float("inf")
+        for key, user_queue in self._queues.items():
+            _, cost = user_queue[0]
+            delay = max(
+                self._global_bucket.delay(cost, now),
+                self._bucket(key, now).delay(cost, now),
+            )
+            if delay > 0:
+                wait = min(wait, delay)
+            elif best_key is None or len(user_queue) < best_depth:
+                best_key, best_depth = key, len(user_queue)
+        if best_key is None:
+            return None, wait
+
+        user_queue = self._queues.pop(best_key)
+        item, cost = user_queue.popleft()
+        if user_queue:
+            self._queues[best_key] = user_queue
+        self._pending -= 1
+        self._dispatched += 1
+        self._global_bucket.take(cost, now)
+        self._buckets[best_key].take(cost, now)
+        self._forget_idle_locked(now)
+        return item, 0.0
+
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.user_rate, self.user_burst, now)
+        return bucket
+
+    def _forget_idle_locked(self, now: float) -> None:
+        # Полная корзина без заданий ничем не отличается от новой
+        if len(self._buckets) <= 4 * len(self._queues) + 64:
+            return
+        for key in [key for key in self._buckets if key not in self._queues]:
+            if self._buckets[key].is_full(now):
+                del self._buckets[key]
@@ -0,0 +1,204 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from database.common.models import ChatState
+
+
+class ChatSession:
+    """
+    Состояние диалога с одним чатом.
+
+    Атрибуты:
+        chat_id (int): Идентификатор чата.
+        is_generating (bool): Ожидает ли бот описание изображения от пользователя.
+        samples (int): Сколько вариантов изображения сгенерировать по описанию.
+        updated_at (float): Время последнего обращения (time.time()).
+    """
+
+    __slots__ = ("chat_id", "is_generating", "samples", "updated_at")
+
+    def __init__(
+        self,
+        chat_id: int,
+        is_generating: bool = False,
+        updated_at: float = 0.0,
+        samples: int = 1,
+    ) -> None:
+        self.chat_id: int = chat_id
+        self.is_generating: bool = is_generating
+        self.samples: int = samples
+        self.updated_at: float = updated_at or time.time()
+
+
+class SessionStore:
+    """
+    Потокобезопасное хранилище состояний диалога, ключом служит chat_id.
+
+    Заменяет общий для всех чатов флаг Bot.is_generating, поэтому обработчики
+    TeleBot можно выполнять в нескольких потоках. Неактивные чаты вытесняются
+    по TTL, а при persistent=True состояние дублируется в таблицу ChatState.
+
+    Атрибуты:
+        ttl (float): Время жизни неактивной сессии в секундах.
+        persistent (bool): Сохранять ли состояние в базе данных.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 24 * 60 * 60,
+        persistent: bool = False,
+        sweep_interval: float = 60.0,
+    ) -> None:
+        """
+        Инициализирует хранилище сессий.
+
+        Аргументы:
+            ttl (float): Время жизни неактивной сессии в секундах.
+            persistent (bool): Сохранять ли состояние в таблицу ChatState.
+            sweep_interval (float): Минимальный интервал между очистками устаревших сессий.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.ttl: float = ttl
+        self.persistent: bool = persistent
+        self._sweep_interval: float = sweep_interval
+        self._sessions: Dict[int, ChatSession] = {}
+        self._lock = threading.Lock()
+        self._last_sweep: float = time.time()
+        self._evicted: int = 0
+
+    def is_generating(self, chat_id: int) -> bool:
+        """
+        Проверяет, ожидает ли бот описание изображения в указанном чате.
+
+        Аргументы:
+            chat_id (int): Идентификатор чата.
+
+        Возвращает:
+            bool: Текущее значение флага для чата.
+        """
+        with self._lock:
+            session = self._get_locked(chat_id)
+            return session.is_generating if session else False
+
+    def samples(self, chat_id: int) -> int:
+        """
+        Возвращает количество вариантов, которое нужно сгенерировать в указанном чате.
+
+        Аргументы:
+            chat_id (int): Идентификатор чата.
+
+        Возвращает:
+            int: Количество вариантов изображения.
+        """
+        with self._lock:
+            session = self._get_locked(chat_id)
+            return session.samples if session else 1
+
+    def set_generating(self, chat_id: int, value: bool, samples: int = 1) -> None:
+        """
+        Устанавливает флаг ожидания описания изображения для указанного чата.
+
+        Аргументы:
+            chat_id (int): Идентификатор чата.
+            value (bool): Новое значение флага.
+            samples (int): Сколько вариантов изображения сгенерировать по описанию.
+        """
+        now = time.time()
+        with self._lock:
+            session = self._get_locked(chat_id)
+            if session is None:
+                session = ChatSession(chat_id)
+                self._sessions[chat_id] = session
+            session.is_generating = value
+            session.samples = samples
+            session.updated_at = now
+            if self.persistent:
+                self._save(session)
+            if now - self._last_sweep >= self._sweep_interval:
+                self._sweep_locked(now)
+
+    def evict_expired(self) -> int:
+        """
+        Удаляет сессии, неактивные дольше TTL.
+
+        Возвращает:
+            int: Количество удалённых сессий.
+        """
+        with self._lock:
+            return self._sweep_locked(time.time())
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает размер хранилища и количество вытесненных сессий.
+
+        Возвращает:
+            Dict[str, Any]: Статистика хранилища.
+        """
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "evicted": self._evicted,
+                "persistent": self.persistent,
+            }
+
+    def _get_locked(self, chat_id: int) -> Optional[ChatSession]:
+        session = self._sessions.get(chat_id)
+        if session is None and self.persistent:
+            session = self._load(chat_id)
+            if session is not None:
+                self._sessions[chat_id] = session
+        if session is not None and time.time() - session.updated_at > self.ttl:
+            self._sessions.pop(chat_id, None)
+            self._evicted += 1
+            if self.persistent:
+                self._delete(chat_id)
+            return None
+        return session
+
+    def _sweep_locked(self, now: float) -> int:
+        self._last_sweep = now
+        expired = [
+            chat_id
+            for chat_id, session in self._sessions.items()
+            if now - session.updated_at > self.ttl
+        ]
+        for chat_id in expired:
+            del self._sessions[chat_id]
+        self._evicted += len(expired)
+        if self.persistent:
+            try:
+                ChatState.delete().where(ChatState.updated_at < now - self.ttl).execute()
+            except Exception as e:
+                self.logger.error(f"Ошибка при очистке сессий: {str(e)}")
+        return len(expired)
+
+    def _load(self, chat_id: int) -> Optional[ChatSession]:
+        try:
+            state = ChatState.get_or_none(ChatState.chat_id == chat_id)
+        except Exception as e:
+            self.logger.error(f"Ошибка при загрузке сессии: {str(e)}")
+            return None
+        if state is None:
+            return None
+        return ChatSession(
+            state.chat_id, state.is_generating, state.updated_at, state.samples
+        )
+
+    def _save(self, session: ChatSession) -> None:
+        try:
+            ChatState.insert(
+                chat_id=session.chat_id,
+                is_generating=session.is_generating,
+                samples=session.samples,
+                updated_at=session.updated_at,
+            ).on_conflict_replace().execute()
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении сессии: {str(e)}")
+
+    def _delete(self, chat_id: int) -> None:
+        try:
+            ChatState.delete().where(ChatState.chat_id == chat_id).execute()
+        except Exception as e:
+            self.logger.error(f"Ошибка при удалении сессии: {str(e)}")
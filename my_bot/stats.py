@@ -0,0 +1,18 @@
+from typing import List
+
+
+def percentile(sorted_values: List[float], percent: int) -> float:
+    """
+    Возвращает перцентиль по заранее отсортированному списку значений.
+
+    Аргументы:
+        sorted_values (List[float]): Отсортированные значения.
+        percent (int): Перцентиль от 0 до 100.
+
+    Возвращает:
+        float: Значение перцентиля, округлённое до сотых, или 0.0 для пустого списка.
+    """
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * percent / 100))
+    return round(sorted_values[index], 2)
@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, Tuple
+
+from database.common.models import Translation, releases_connection
+from my_bot.stats import percentile
+
+
+class TranslationService:
+    """
+    Перевод описаний изображений с запоминанием результатов.
+
+    Текст, уже состоящий из ASCII-символов, не переводится. Остальные переводы
+    ищутся в LRU-кэше в памяти, затем в таблице Translation и только после этого
+    запрашиваются у mtranslate.
+
+    Атрибуты:
+        max_entries (int): Максимальное число переводов в памяти.
+        persistent (bool): Сохранять ли переводы в базе данных.
+    """
+
+    def __init__(
+        self, max_entries: int = 5000, persistent: bool = True, workers: int = 2
+    ) -> None:
+        """
+        Инициализирует сервис перевода.
+
+        Аргументы:
+            max_entries (int): Максимальное число переводов в памяти.
+            persistent (bool): Сохранять ли переводы в таблицу Translation.
+            workers (int): Количество потоков для фонового перевода.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.max_entries: int = max_entries
+        self.persistent: bool = persistent
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, workers), thread_name_prefix="translation"
+        )
+        self._lock = threading.Lock()
+        self._memo: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+        self._skipped: int = 0
+        self._memory_hits: int = 0
+        self._db_hits: int = 0
+        self._misses: int = 0
+        self._errors: int = 0
+        self._latencies: Deque[float] = deque(maxlen=500)
+
+    def translate(self, text: str, target_lang: str = "en") -> str:
+        """
+        Переводит текст, используя сохранённые ранее переводы.
+
+        При ошибке переводчика возвращается исходный текст.
+
+        Аргументы:
+            text (str): Исходный текст.
+            target_lang (str): Язык перевода.
+
+        Возвращает:
+            str: Переведённый текст.
+        """
+        if text.isascii():
+            with self._lock:
+                self._skipped += 1
+            return text
+
+        key = (text, target_lang)
+        with self._lock:
+            cached = self._memo.get(key)
+            if cached is not None:
+                self._memo.move_to_end(key)
+                self._memory_hits += 1
+                return cached
+
+        if self.persistent:
+            stored = self._load(text, target_lang)
+            if stored is not None:
+                with self._lock:
+                    self._db_hits += 1
+                    self._remember_locked(key, stored)
+                return stored
+
+        started = time.monotonic()
+        try:
+            from mtranslate import translate
+
+            result: str = translate(text, target_lang)
+        except Exception as e:
+            self.logger.error(f"Ошибка при переводе текста: {str(e)}")
+            with self._lock:
+                self._errors += 1
+            return text
+        with self._lock:
+            self._misses += 1
+            self._latencies.append((time.monotonic() - started) * 1000)
+            self._remember_locked(key, result)
+        if self.persistent:
+            self._save(text, target_lang, result)
+        return result
+
+    def submit(self, text: str, target_lang: str = "en") -> "Future[str]":
+        """
+        Запускает перевод в фоновом потоке.
+
+        Аргументы:
+            text (str): Исходный текст.
+            target_lang (str): Язык перевода.
+
+        Возвращает:
+            Future[str]: Будущий результат перевода.
+        """
+        if text.isascii():
+            future: "Future[str]" = Future()
+            future.set_result(self.translate(text, target_lang))
+            return future
+        return self._executor.submit(releases_connection(self.translate), text, target_lang)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает долю попаданий и задержку обращений к переводчику.
+
+        Возвращает:
+            Dict[str, Any]: Статистика сервиса перевода.
+        """
+        with self._lock:
+            hits = self._memory_hits + self._db_hits
+            lookups = hits + self._misses
+            latencies = sorted(self._latencies)
+            return {
+                "skipped_ascii": self._skipped,
+                "memory_hits": self._memory_hits,
+                "db_hits": self._db_hits,
+                "misses": self._misses,
+                "errors": self._errors,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "latency_ms_p50": percentile(latencies, 50),
+                "latency_ms_p95": percentile(latencies, 95),
+            }
+
+    def shutdown(self) -> None:
+        """
+        Останавливает потоки фонового перевода.
+        """
+        self._executor.shutdown(wait=False)
+
+    def _remember_locked(self, key: Tuple[str, str], value: str) -> None:
+        self._memo[key] = value
+        self._memo.move_to_end(key)
+        while len(self._memo) > self.max_entries:
+            self._memo.popitem(last=False)
+
+    def _load(self, text: str, target_lang: str) -> str | None:
+        try:
+            record = Translation.get_or_none(
+                (Translation.source == text) & (Translation.target_lang == target_lang)
+            )
+        except Exception as e:
+            self.logger.error(f"Ошибка при чтении перевода: {str(e)}")
+            return None
+        return record.text if record is not None else None
+
+    def _save(self, text: str, target_lang: str, result: str) -> None:
+        try:
+            Translation.insert(
+                source=text, target_lang=target_lang, text=result
+            ).on_conflict_replace().execute()
+        except Exception as e:
+            self.logger.error(f"Ошибка при сохранении перевода: {str(e)}")
@@ -0,0 +1,122 @@
+import hmac
+import logging
+import threading
+from typing import Any, Dict
+
+from flask import Flask, Response, abort, request
+from telebot import TeleBot, apihelper, types
+from werkzeug.serving import make_server
+
+# Заголовок, в котором Telegram передаёт secret_token, указанный в setWebhook
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def create_webhook_app(bot: TeleBot, path: str, secret_token: str) -> Flask:
+    """
+    Создаёт Flask-приложение, принимающее обновления Telegram.
+
+    Обновление передаётся в process_new_updates: в многопоточном режиме TeleBot
+    обработчики выполняются его пулом потоков, а HTTP-ответ возвращается сразу.
+
+    Аргументы:
+        bot (TeleBot): Экземпляр TeleBot с зарегистрированными обработчиками.
+        path (str): Путь эндпоинта обновлений.
+        secret_token (str): Ожидаемое значение заголовка SECRET_HEADER.
+
+    Возвращает:
+        Flask: Приложение с единственным POST-эндпоинтом.
+
+    Исключения:
+        ValueError: Если secret_token пуст: без проверки заголовка обновления мог бы слать кто угодно.
+    """
+    if not secret_token:
+        raise ValueError("secret_token не может быть пустым")
+    app = Flask(__name__)
+    stats: Dict[str, int] = {"accepted": 0, "rejected": 0}
+    stats_lock = threading.Lock()
+    app.config["WEBHOOK_STATS"] = stats
+
+    @app.post(path)
+    def receive_update() -> Response:
+        if not hmac.compare_digest(
+            request.headers.get(SECRET_HEADER, ""), secret_token
+        ):
+            with stats_lock:
+                stats["rejected"] += 1
+            abort(403)
+        update = types.Update.de_json(request.get_data(as_text=True))
+        bot.process_new_updates([update])
+        with stats_lock:
+            stats["accepted"] += 1
+        return Response(status=200)
+
+    return app
+
+
+class WebhookServer:
+    """
+    Многопоточный HTTP-сервер, принимающий обновления Telegram вместо long polling.
+
+    Атрибуты:
+        bot (TeleBot): Экземпляр TeleBot с зарегистрированными обработчиками.
+        app (Flask): Приложение с эндпоинтом обновлений.
+        port (int): Фактический порт сервера (при port=0 выбирается свободный).
+    """
+
+    def __init__(
+        self, bot: TeleBot, host: str, port: int, path: str, secret_token: str
+    ) -> None:
+        """
+        Инициализирует сервер.
+
+        Аргументы:
+            bot (TeleBot): Экземпляр TeleBot с зарегистрированными обработчиками.
+            host (str): Адрес, на котором слушает сервер.
+            port (int): Порт сервера.
+            path (str): Путь эндпоинта обновлений.
+            secret_token (str): Секрет для проверки заголовка SECRET_HEADER.
+        """
+        self.logger = logging.getLogger(__name__)
+        # Журнал каждого запроса werkzeug на потоке обновлений только тормозит приём
+        logging.getLogger("werkzeug").setLevel(logging.WARNING)
+        self.bot: TeleBot = bot
+        self._secret_token: str = secret_token
+        self.app: Flask = create_webhook_app(bot, path, secret_token)
+        self._server = make_server(host, port, self.app, threaded=True)
+        self.port: int = self._server.server_port
+
+    def set_webhook(self, url: str) -> Any:
+        """
+        Регистрирует адрес сервера в Telegram вместе с secret_token.
+
+        Аргументы:
+            url (str): Полный публичный адрес эндпоинта обновлений.
+
+        Возвращает:
+            Any: Ответ метода setWebhook.
+        """
+        params: Dict[str, Any] = {"url": url, "secret_token": self._secret_token}
+        return apihelper._make_request(
+            self.bot.token, "setWebhook", params=params, method="post"
+        )
+
+    def serve_forever(self) -> None:
+        """
+        Обрабатывает входящие запросы до вызова shutdown().
+        """
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        """
+        Останавливает сервер.
+        """
+        self._server.shutdown()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Возвращает количество принятых и отклонённых обновлений.
+
+        Возвращает:
+            Dict[str, int]: Счётчики эндпоинта.
+        """
+        return dict(self.app.config["WEBHOOK_STATS"])
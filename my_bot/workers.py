@@ -0,0 +1,240 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, List, Optional, Union
+
+from telebot import types
+
+from my_bot.scheduler import FairScheduler
+from my_bot.stats import percentile
+
+
+@dataclass
+class GenerationJob:
+    """
+    Задание на генерацию изображения, ожидающее свободного воркера.
+
+    Атрибуты:
+        message (types.Message): Сообщение пользователя, инициировавшее генерацию.
+        text_description (Union[str, Future]): Описание изображения или будущий результат его перевода.
+        ack_message_id (Optional[int]): Идентификатор сообщения "Идёт генерация...".
+        samples (int): Количество вариантов изображения.
+        enqueued_at (float): Момент постановки в очередь (time.monotonic()).
+        refunded (bool): Возвращены ли пользователю токены за задание.
+    """
+
+    message: types.Message
+    text_description: Union[str, "Future[str]"]
+    ack_message_id: Optional[int] = None
+    samples: int = 1
+    enqueued_at: float = field(default_factory=time.monotonic)
+    refunded: bool = field(default=False, init=False)
+    _refund_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
+
+    def description(self) -> str:
+        """
+        Возвращает описание изображения, дождавшись перевода, если он ещё выполняется.
+
+        Возвращает:
+            str: Текстовое описание изображения.
+        """
+        if isinstance(self.text_description, Future):
+            return self.text_description.result()
+        return self.text_description
+
+    def claim_refund(self) -> bool:
+        """
+        Отмечает задание как возвращённое.
+
+        Токены за задание может вернуть и воркер после ошибки, и остановка бота,
+        поэтому возвращает их только тот, кто вызвал метод первым.
+
+        Возвращает:
+            bool: True, если токены ещё не возвращались и их должен вернуть вызывающий код.
+        """
+        with self._refund_lock:
+            if self.refunded:
+                return False
+            self.refunded = True
+            return True
+
+
+class GenerationWorkerPool:
+    """
+    Пул фоновых воркеров генерации изображений с ограниченной очередью заданий.
+
+    Обработчики TeleBot только ставят задание в очередь, а воркеры выполняют
+    долгий запрос к Stability AI и доставляют результат пользователю. Порядок
+    выдачи заданий определяет FairScheduler: пользователи чередуются, а частота
+    запусков ограничена корзинами токенов.
+
+    Атрибуты:
+        workers (int): Количество потоков-воркеров.
+        queue_size (int): Максимальная длина очереди заданий.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[GenerationJob], None],
+        workers: int = 2,
+        queue_size: int = 100,
+        latency_window: int = 500,
+        scheduler: Optional[FairScheduler[GenerationJob]] = None,
+    ) -> None:
+        """
+        Инициализирует пул воркеров.
+
+        Аргументы:
+            handler (Callable[[GenerationJob], None]): Функция, выполняющая задание.
+            workers (int): Количество потоков-воркеров.
+            queue_size (int): Максимальная длина очереди заданий.
+            latency_window (int): Количество последних заданий для расчёта перцентилей.
+            scheduler (Optional[FairScheduler]): Планировщик заданий. По умолчанию -
+                чередование пользователей без ограничения частоты, на queue_size заданий.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.workers: int = max(1, workers)
+        self._handler = handler
+        self._scheduler: FairScheduler[GenerationJob] = scheduler or FairScheduler(
+            max_pending=queue_size
+        )
+        self.queue_size: int = self._scheduler.max_pending
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._busy: int = 0
+        self._running: List[GenerationJob] = []
+        self._completed: int = 0
+        self._failed: int = 0
+        self._rejected: int = 0
+        self._wait_times: Deque[float] = deque(maxlen=latency_window)
+        self._run_times: Deque[float] = deque(maxlen=latency_window)
+
+    def start(self) -> None:
+        """
+        Запускает потоки-воркеры. Повторный вызов ничего не делает.
+        """
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"generation-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, job: GenerationJob) -> bool:
+        """
+        Ставит задание в очередь пользователя без ожидания.
+
+        Запуск задания расходует столько токенов корзин, сколько вариантов изображения оно генерирует.
+
+        Аргументы:
+            job (GenerationJob): Задание на генерацию.
+
+        Возвращает:
+            bool: True, если задание принято, False, если очередь переполнена.
+        """
+        if self._scheduler.put(job.message.chat.id, job, cost=job.samples):
+            return True
+        with self._lock:
+            self._rejected += 1
+        return False
+
+    def shutdown(
+        self, wait: bool = True, timeout: Optional[float] = None
+    ) -> List[GenerationJob]:
+        """
+        Перестаёт принимать задания и останавливает воркеры.
+
+        Воркеры успевают выполнить поставленные задания, пока не истечёт timeout;
+        задания, которые так и не были запущены, убираются из очереди и
+        возвращаются, чтобы вызывающий код мог вернуть за них токены.
+
+        Аргументы:
+            wait (bool): Дождаться завершения потоков. Если False, очередь не
+                обрабатывается и все ожидающие задания возвращаются сразу.
+            timeout (Optional[float]): Сколько секунд ждать обработки очереди. None - без ограничения.
+
+        Возвращает:
+            List[GenerationJob]: Задания, которые не были запущены.
+        """
+        self._scheduler.close()
+        if wait:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            for thread in self._threads:
+                thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+        self._threads = []
+        return self._scheduler.drain()
+
+    def running(self) -> List[GenerationJob]:
+        """
+        Возвращает задания, которые сейчас выполняются воркерами.
+
+        После shutdown() с истёкшим timeout это задания, которые не успели завершиться.
+
+        Возвращает:
+            List[GenerationJob]: Выполняющиеся задания.
+        """
+        with self._lock:
+            return list(self._running)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает текущее состояние пула для подбора количества воркеров.
+
+        Возвращает:
+            Dict[str, Any]: Глубина очереди, занятость воркеров, счётчики, задержки (мс)
+                и состояние планировщика с префиксом scheduler_.
+        """
+        scheduler_stats = {
+            f"scheduler_{name}": value for name, value in self._scheduler.stats().items()
+        }
+        with self._lock:
+            wait_times = sorted(self._wait_times)
+            run_times = sorted(self._run_times)
+            return {
+                "workers": self.workers,
+                "busy_workers": self._busy,
+                "queue_depth": self._scheduler.qsize(),
+                "queue_size": self.queue_size,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "wait_ms_p50": percentile(wait_times, 50),
+                "wait_ms_p95": percentile(wait_times, 95),
+                "run_ms_p50": percentile(run_times, 50),
+                "run_ms_p95": percentile(run_times, 95),
+                "run_ms_max": round(run_times[-1], 2) if run_times else 0.0,
+                **scheduler_stats,
+            }
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._scheduler.get()
+            if job is None:
+                return
+            started = time.monotonic()
+            with self._lock:
+                self._busy += 1
+                self._running.append(job)
+                self._wait_times.append((started - job.enqueued_at) * 1000)
+            failed = False
+            try:
+                self._handler(job)
+            except Exception as e:
+                failed = True
+                self.logger.error(f"Ошибка в воркере генерации: {str(e)}")
+            finally:
+                with self._lock:
+                    self._busy -= 1
+                    self._running.remove(job)
+                    self._run_times.append((time.monotonic() - started) * 1000)
+                    if failed:
+                        self._failed += 1
+                    else:
+                        self._completed += 1
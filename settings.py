@@ -11,3 +11,94 @@ class ProjectSettings(BaseSettings):
     bot_token: SecretStr = os.getenv("BOT_TOKEN", None)
     stability_ai_token: SecretStr = os.getenv("STABILITY_AI_TOKEN", None)
     stability_ai_url: StrictStr = os.getenv("STABILITY_AI_URL", None)
+
+    # Пул фоновой генерации изображений
+    generation_workers: int = 2
+    generation_queue_size: int = 100
+    # Сколько секунд при остановке бота ждать обработки очереди; за остальные задания токены возвращаются
+    generation_shutdown_timeout: float = 30.0
+
+    # Честный планировщик генераций: запусков в секунду и размер всплеска (rate = 0 - без ограничения)
+    scheduler_user_rate: float = 0.2
+    scheduler_user_burst: int = 4
+    scheduler_global_rate: float = 2.0
+    scheduler_global_burst: int = 10
+
+    # Обработка обновлений и состояния диалогов
+    bot_threads: int = 4
+    session_ttl: float = 24 * 60 * 60
+    session_persistent: bool = False
+
+    # Режим вариаций: сколько изображений генерировать одним запросом (не больше 10)
+    variant_samples: int = 4
+
+    # HTTP-транспорт сервиса генерации изображений
+    stability_connect_timeout: float = 5.0
+    stability_read_timeout: float = 90.0
+    stability_max_retries: int = 2
+    stability_breaker_threshold: int = 5
+    stability_breaker_reset_timeout: float = 30.0
+    stability_binary_response: bool = True
+
+    # Кэш результатов генерации (пустой image_cache_dir отключает дисковый уровень)
+    image_cache_enabled: bool = True
+    image_cache_memory_mb: int = 64
+    image_cache_dir: str = "image_cache"
+    image_cache_disk_mb: int = 1024
+
+    # Перекодирование изображений перед отправкой (формат JPEG или WEBP)
+    image_postprocess_enabled: bool = False
+    image_postprocess_format: str = "JPEG"
+    image_postprocess_quality: int = 85
+    image_postprocess_max_side: int = 1024
+    image_postprocess_workers: int = 2
+
+    # Повторная отправка загруженных изображений по file_id
+    file_id_cache_persistent: bool = True
+
+    # Перевод описаний изображений
+    translation_persistent: bool = True
+
+    # Фоновая пакетная запись истории запросов
+    history_batch_size: int = 100
+    history_flush_interval: float = 1.0
+
+    # Перенос старых строк History в архив. По умолчанию выключен: перенесённые строки
+    # пропадают из /history. Для включения задайте период в секундах, например 86400
+    history_retention_days: int = 180
+    history_archive_dir: str = "history_archive"
+    history_maintenance_interval: float = 0
+    history_vacuum_pages: int = 0
+
+    # База данных SQLite (db_pool_max_connections = 0 отключает пул соединений)
+    db_path: str = "lecture.db"
+    db_journal_mode: str = "wal"
+    db_auto_vacuum: str = "incremental"
+    db_synchronous: str = "normal"
+    db_cache_size: int = -64000
+    db_mmap_size: int = 256 * 1024 * 1024
+    db_busy_timeout: int = 5000
+    db_pool_max_connections: int = 0
+    db_pool_stale_timeout: float = 300.0
+    db_pool_timeout: float = 10.0
+
+    # Способ получения обновлений: "polling" или "webhook"
+    bot_mode: StrictStr = "polling"
+    webhook_url: str = ""
+    webhook_path: str = "/telegram/webhook"
+    webhook_host: str = "0.0.0.0"
+    webhook_port: int = 8443
+    webhook_secret: SecretStr = SecretStr("")
+
+    # Эндпоинт метрик Prometheus (/metrics)
+    metrics_enabled: bool = True
+    metrics_host: str = "127.0.0.1"
+    metrics_port: int = 9108
+
+    # Выборочное профилирование (cProfile и tracemalloc). При profiling_signal оно
+    # переключается SIGUSR2, но обёртки вокруг обработчиков ставятся заранее
+    profiling_enabled: bool = False
+    profiling_signal: bool = False
+    profiling_sample_rate: float = 0.01
+    profiling_dir: str = "profiles"
+    profiling_max_files: int = 200
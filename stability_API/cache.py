@@ -0,0 +1,301 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from stability_API.decode import artifact_bytes
+
+# Параметры тела запроса, от которых зависит результат генерации
+KEY_PARAMS = ("steps", "width", "height", "seed", "cfg_scale", "samples")
+
+# Поля артефакта, которые хранятся в JSON-описании записи рядом с файлами изображений
+_META_FIELDS = {"seed": int, "finishReason": str}
+
+
+def normalize_prompt(text: str) -> str:
+    """
+    Приводит описание изображения к каноническому виду.
+
+    Лишние пробелы схлопываются, регистр приводится к нижнему: токенизатор CLIP
+    в Stable Diffusion всё равно не различает регистр, поэтому изображение не меняется.
+
+    Аргументы:
+        text (str): Текстовое описание изображения.
+
+    Возвращает:
+        str: Нормализованное описание.
+    """
+    return " ".join(text.split()).lower()
+
+
+def make_cache_key(body: Dict[str, Any]) -> str:
+    """
+    Строит ключ кэша по телу запроса к сервису генерации.
+
+    Аргументы:
+        body (Dict[str, Any]): Тело запроса с text_prompts и параметрами генерации.
+
+    Возвращает:
+        str: Хэш SHA-256 в шестнадцатеричном виде.
+    """
+    material = {name: body.get(name) for name in KEY_PARAMS}
+    # Описание нормализуется только в ключе: сервису уходит текст пользователя как есть
+    material["text_prompts"] = [
+        {**prompt, "text": normalize_prompt(prompt["text"])}
+        for prompt in body.get("text_prompts") or []
+    ]
+    encoded = json.dumps(material, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _artifacts_size(artifacts: List[Dict[str, Any]]) -> int:
+    size = 0
+    for artifact in artifacts:
+        for value in artifact.values():
+            if isinstance(value, (str, bytes, bytearray)):
+                size += len(value)
+    return size
+
+
+class ImageResultCache:
+    """
+    Двухуровневый кэш результатов генерации: LRU в памяти и каталог на диске.
+
+    Оба уровня ограничены по размеру и вытесняют давно не использованные записи.
+    На диске запись - это файлы изображений <key>.<n>.png и описание <key>.json
+    с полями seed и finishReason; запись, которую не удалось прочитать, считается промахом.
+
+    Атрибуты:
+        memory_max_bytes (int): Максимальный объём записей в памяти.
+        disk_dir (Optional[str]): Каталог дискового уровня. None отключает его.
+        disk_max_bytes (int): Максимальный объём файлов на диске.
+    """
+
+    def __init__(
+        self,
+        memory_max_bytes: int = 64 * 1024 * 1024,
+        disk_dir: Optional[str] = "image_cache",
+        disk_max_bytes: int = 1024 * 1024 * 1024,
+    ) -> None:
+        """
+        Инициализирует кэш и строит индекс уже сохранённых на диске записей.
+
+        Аргументы:
+            memory_max_bytes (int): Максимальный объём записей в памяти.
+            disk_dir (Optional[str]): Каталог дискового уровня. None отключает его.
+            disk_max_bytes (int): Максимальный объём файлов на диске.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.memory_max_bytes: int = memory_max_bytes
+        self.disk_dir: Optional[str] = disk_dir or None
+        self.disk_max_bytes: int = disk_max_bytes
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._memory_sizes: Dict[str, int] = {}
+        self._memory_bytes: int = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes: int = 0
+        self._memory_hits: int = 0
+        self._disk_hits: int = 0
+        self._misses: int = 0
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Возвращает результат генерации из кэша.
+
+        Аргументы:
+            key (str): Ключ, построенный make_cache_key.
+
+        Возвращает:
+            Optional[List[Dict[str, Any]]]: Список артефактов или None при промахе.
+        """
+        with self._lock:
+            artifacts = self._memory.get(key)
+            if artifacts is not None:
+                self._memory.move_to_end(key)
+                self._memory_hits += 1
+                return list(artifacts)
+            on_disk = key in self._disk
+
+        if on_disk:
+            artifacts = self._read_disk(key)
+            if artifacts is not None:
+                with self._lock:
+                    self._disk_hits += 1
+                    if key in self._disk:
+                        self._disk.move_to_end(key)
+                    self._remember_locked(key, artifacts)
+                return list(artifacts)
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, key: str, artifacts: List[Dict[str, Any]]) -> None:
+        """
+        Сохраняет результат генерации на обоих уровнях кэша.
+
+        Аргументы:
+            key (str): Ключ, построенный make_cache_key.
+            artifacts (List[Dict[str, Any]]): Список артефактов от сервиса генерации.
+        """
+        if not artifacts:
+            return
+        with self._lock:
+            self._remember_locked(key, artifacts)
+        if self.disk_dir:
+            self._write_disk(key, artifacts)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает счётчики попаданий и промахов и занятый объём.
+
+        Возвращает:
+            Dict[str, Any]: Статистика кэша.
+        """
+        with self._lock:
+            hits = self._memory_hits + self._disk_hits
+            lookups = hits + self._misses
+            return {
+                "memory_hits": self._memory_hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _remember_locked(self, key: str, artifacts: List[Dict[str, Any]]) -> None:
+        size = _artifacts_size(artifacts)
+        if size > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._memory_sizes[key]
+        self._memory[key] = artifacts
+        self._memory.move_to_end(key)
+        self._memory_sizes[key] = size
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            old_key, _ = self._memory.popitem(last=False)
+            self._memory_bytes -= self._memory_sizes.pop(old_key)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _image_path(self, key: str, index: int) -> str:
+        return os.path.join(self.disk_dir, f"{key}.{index}.png")
+
+    def _load_disk_index(self) -> None:
+        sizes: Dict[str, int] = {}
+        mtimes: Dict[str, float] = {}
+        files: Dict[str, List[str]] = {}
+        for entry in os.scandir(self.disk_dir):
+            if not entry.is_file():
+                continue
+            if entry.name.endswith((".pkl", ".tmp")):
+                # Записи прежнего формата и недописанные файлы не читаются
+                os.remove(entry.path)
+                continue
+            key = entry.name.split(".", 1)[0]
+            stat = entry.stat()
+            sizes[key] = sizes.get(key, 0) + stat.st_size
+            files.setdefault(key, []).append(entry.path)
+            if entry.name.endswith(".json"):
+                mtimes[key] = stat.st_mtime
+        for key, paths in files.items():
+            if key not in mtimes:
+                # Изображения без описания остались от прерванной записи
+                for path in paths:
+                    os.remove(path)
+        for key in sorted(mtimes, key=mtimes.get):
+            self._disk[key] = sizes[key]
+            self._disk_bytes += sizes[key]
+
+    def _forget_disk(self, key: str) -> None:
+        with self._lock:
+            size = self._disk.pop(key, None)
+            if size is not None:
+                self._disk_bytes -= size
+        self._remove_disk(key)
+
+    def _remove_disk(self, key: str) -> None:
+        # Сначала описание, чтобы частично удалённая запись не читалась
+        try:
+            os.remove(self._meta_path(key))
+        except FileNotFoundError:
+            pass
+        index = 0
+        while os.path.exists(self._image_path(key, index)):
+            os.remove(self._image_path(key, index))
+            index += 1
+
+    def _read_disk(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        meta_path = self._meta_path(key)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as file:
+                meta = json.load(file)
+            artifacts = []
+            for index, fields in enumerate(meta["artifacts"]):
+                artifact: Dict[str, Any] = {
+                    name: kind(fields[name])
+                    for name, kind in _META_FIELDS.items()
+                    if name in fields
+                }
+                with open(self._image_path(key, index), "rb") as file:
+                    artifact["binary"] = file.read()
+                artifacts.append(artifact)
+            os.utime(meta_path)
+            return artifacts
+        except FileNotFoundError:
+            self._forget_disk(key)
+        except Exception as e:
+            self.logger.error(f"Ошибка чтения кэша изображений: {str(e)}")
+            self._forget_disk(key)
+        return None
+
+    def _write_disk(self, key: str, artifacts: List[Dict[str, Any]]) -> None:
+        suffix = f".{uuid.uuid4().hex}.tmp"
+        written: List[str] = []
+        try:
+            meta = []
+            for index, artifact in enumerate(artifacts):
+                path = self._image_path(key, index)
+                written.append(path)
+                with open(path + suffix, "wb") as file:
+                    file.write(artifact_bytes(artifact))
+                meta.append({name: artifact[name] for name in _META_FIELDS if name in artifact})
+            meta_path = self._meta_path(key)
+            written.append(meta_path)
+            with open(meta_path + suffix, "w", encoding="utf-8") as file:
+                json.dump({"artifacts": meta}, file)
+            # Описание переименовывается последним: без него запись не видна при чтении
+            for path in written:
+                os.replace(path + suffix, path)
+            size = sum(os.path.getsize(path) for path in written)
+        except Exception as e:
+            self.logger.error(f"Ошибка записи кэша изображений: {str(e)}")
+            for path in written:
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            return
+
+        evicted = []
+        with self._lock:
+            self._disk_bytes -= self._disk.pop(key, 0)
+            self._disk[key] = size
+            self._disk_bytes += size
+            while self._disk_bytes > self.disk_max_bytes and len(self._disk) > 1:
+                old_key, old_size = self._disk.popitem(last=False)
+                self._disk_bytes -= old_size
+                evicted.append(old_key)
+        for old_key in evicted:
+            self._remove_disk(old_key)
@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+import re
+from typing import Any, Dict, Iterable, List
+
+import requests
+
+# Размер фрагмента, которым читается тело ответа сервиса
+CHUNK_SIZE = 64 * 1024
+
+# Начало значения поля base64 в JSON-ответе сервиса
+_BASE64_FIELD = re.compile(rb'"base64"\s*:\s*"')
+# Сколько байт в конце метаданных может занимать ещё не дочитанный маркер поля
+_MARKER_TAIL = 32
+
+
+def artifact_bytes(artifact: Dict[str, Any]) -> bytes:
+    """
+    Возвращает содержимое изображения из артефакта сервиса генерации.
+
+    Артефакты, полученные потоковым декодированием, уже содержат байты в поле binary;
+    поле base64 остаётся у записей, сохранённых в кэше до перехода на двоичный формат.
+
+    Аргументы:
+        artifact (Dict[str, Any]): Артефакт сервиса генерации.
+
+    Возвращает:
+        bytes: Содержимое изображения.
+    """
+    binary = artifact.get("binary")
+    if binary is not None:
+        return binary
+    return base64.b64decode(artifact["base64"])
+
+
+def read_binary(response: requests.Response, chunk_size: int = CHUNK_SIZE) -> bytearray:
+    """
+    Читает тело ответа в заранее выделенный буфер без промежуточной склейки фрагментов.
+
+    Аргументы:
+        response (requests.Response): Ответ, полученный с stream=True.
+        chunk_size (int): Размер читаемого фрагмента в байтах.
+
+    Возвращает:
+        bytearray: Содержимое тела ответа.
+    """
+    try:
+        expected = int(response.headers.get("Content-Length", 0))
+    except ValueError:
+        expected = 0
+    buffer = bytearray(expected)
+    position = 0
+    for chunk in response.iter_content(chunk_size):
+        buffer[position : position + len(chunk)] = chunk
+        position += len(chunk)
+    del buffer[position:]
+    return buffer
+
+
+def binary_artifact(response: requests.Response, chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Строит артефакт из ответа на запрос с Accept: image/png.
+
+    Аргументы:
+        response (requests.Response): Ответ, полученный с stream=True.
+        chunk_size (int): Размер читаемого фрагмента в байтах.
+
+    Возвращает:
+        Dict[str, Any]: Артефакт с байтами изображения, seed и finishReason.
+    """
+    artifact: Dict[str, Any] = {"binary": read_binary(response, chunk_size)}
+    seed = response.headers.get("Seed")
+    if seed is not None and seed.isdigit():
+        artifact["seed"] = int(seed)
+    finish_reason = response.headers.get("Finish-Reason")
+    if finish_reason is not None:
+        artifact["finishReason"] = finish_reason
+    return artifact
+
+
+def decode_json_artifacts(chunks: Iterable[bytes]) -> List[Dict[str, Any]]:
+    """
+    Потоково разбирает JSON-ответ сервиса, декодируя поля base64 по мере чтения.
+
+    Строки base64 не накапливаются целиком: каждый фрагмент сразу декодируется в
+    буфер изображения, а в разбираемый JSON попадают только метаданные. Поэтому
+    текст ответа, декодированные байты и их копия не лежат в памяти одновременно.
+
+    Аргументы:
+        chunks (Iterable[bytes]): Фрагменты тела ответа, например response.iter_content().
+
+    Возвращает:
+        List[Dict[str, Any]]: Список артефактов с байтами изображения в поле binary.
+
+    Исключения:
+        ValueError: Если ответ оборван или не является корректным JSON.
+    """
+    meta = bytearray()
+    scan_from = 0
+    # Метаданные до этой позиции уже просмотрены и не содержат незакрытого маркера
+    scanned = 0
+    images: List[bytearray] = []
+    pending = b""
+    in_string = False
+
+    for chunk in chunks:
+        data = bytes(chunk)
+        while data:
+            if not in_string:
+                meta += data
+                data = b""
+                match = _BASE64_FIELD.search(meta, scan_from)
+                if match is None:
+                    scan_from = max(scanned, len(meta) - _MARKER_TAIL)
+                    continue
+                data = bytes(meta[match.end() :])
+                del meta[match.end() :]
+                images.append(bytearray())
+                pending = b""
+                in_string = True
+                continue
+
+            end = data.find(b'"')
+            payload = data if end < 0 else data[:end]
+            encoded = pending + payload.replace(b"\\", b"")
+            usable = len(encoded) - len(encoded) % 4
+            try:
+                images[-1] += binascii.a2b_base64(encoded[:usable])
+            except binascii.Error as e:
+                raise ValueError(f"Некорректные данные base64: {e}")
+            pending = encoded[usable:]
+            if end < 0:
+                data = b""
+                continue
+            if pending:
+                raise ValueError("Строка base64 оборвана")
+            meta += b'"'
+            scan_from = scanned = len(meta)
+            in_string = False
+            data = data[end + 1 :]
+
+    if in_string:
+        raise ValueError("Ответ сервиса оборван внутри строки base64")
+    parsed = json.loads(bytes(meta))
+    artifacts: List[Dict[str, Any]] = parsed.get("artifacts", [])
+    decoded = iter(images)
+    for artifact in artifacts:
+        if "base64" in artifact:
+            del artifact["base64"]
+            artifact["binary"] = next(decoded)
+    return artifacts
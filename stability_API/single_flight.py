@@ -0,0 +1,90 @@
+import threading
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call(Generic[T]):
+    """
+    Выполняющийся вызов, результат которого ждут несколько потоков.
+    """
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Optional[T] = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight(Generic[T]):
+    """
+    Объединение одновременных вызовов с одинаковым ключом в один.
+
+    Первый поток с новым ключом выполняет функцию, остальные ждут его результата
+    или исключения. После завершения ключ освобождается, и следующий вызов снова
+    выполняется.
+    """
+
+    def __init__(self) -> None:
+        """
+        Инициализирует пустую таблицу выполняющихся вызовов.
+        """
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call[T]] = {}
+        self._executed: int = 0
+        self._coalesced: int = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Выполняет fn или присоединяется к уже выполняющемуся вызову с тем же ключом.
+
+        Аргументы:
+            key (str): Ключ вызова.
+            fn (Callable[[], T]): Функция, выполняемая один раз на группу вызовов.
+
+        Возвращает:
+            Tuple[T, bool]: Результат и признак того, что он получен от чужого вызова.
+
+        Исключения:
+            BaseException: Исключение, выброшенное fn, получают все ожидающие.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._executed += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает количество выполненных и сэкономленных вызовов.
+
+        Возвращает:
+            Dict[str, Any]: Выполненные вызовы, присоединившиеся к ним и вызовы в работе.
+        """
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "in_flight": len(self._calls),
+            }
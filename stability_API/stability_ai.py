@@ -1,21 +1,27 @@
 import os
 import logging
-from typing import List, Dict, Any
+import threading
+import time
+from typing import List, Dict, Any, Optional
 import requests
-from PIL import Image
-import base64
 import io
 import uuid
 
-from dotenv import load_dotenv
-
-load_dotenv()
-
-# Конфигурация логгера
-logging.basicConfig(
-    filename="error.log",
-    level=logging.ERROR,
-    format="%(asctime)s - %(levelname)s - %(message)s",
+from stability_API.cache import ImageResultCache, make_cache_key
+from stability_API.single_flight import SingleFlight
+from stability_API.decode import (
+    CHUNK_SIZE,
+    artifact_bytes,
+    binary_artifact,
+    decode_json_artifacts,
+)
+from stability_API.transport import (
+    RETRY_STATUSES,
+    CircuitBreaker,
+    backoff_delay,
+    connection_stats,
+    create_session,
+    retry_after_seconds,
 )
 
 
@@ -26,28 +32,111 @@ class ImageGenerationService:
     Атрибуты:
         _token (str): Токен для аутентификации в API сервиса генерации изображений.
         _url (str): URL эндпоинта API сервиса генерации изображений.
+        _session (requests.Session): HTTP-сессия с пулом keep-alive соединений.
+        _breaker (CircuitBreaker): Предохранитель от запросов к недоступному сервису.
+        _cache (Optional[ImageResultCache]): Кэш результатов генерации.
+        _single_flight (SingleFlight): Объединение одновременных одинаковых запросов.
     """
 
-    def __init__(self, token: str, url: str) -> None:
+    def __init__(
+        self,
+        token: str,
+        url: str,
+        pool_size: int = 2,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 90.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        cache: Optional[ImageResultCache] = None,
+        binary_response: bool = True,
+    ) -> None:
         """
         Инициализирует экземпляр класса ImageGenerationService.
 
         Аргументы:
             token (str): Токен для аутентификации в API сервиса генерации изображений.
             url (str): URL эндпоинта API сервиса генерации изображений.
+            pool_size (int): Размер пула соединений, обычно равен числу воркеров генерации.
+            connect_timeout (float): Таймаут установки соединения в секундах.
+            read_timeout (float): Таймаут ожидания ответа в секундах.
+            max_retries (int): Максимальное число повторов при ответах 429/5xx и сетевых ошибках.
+            backoff_base (float): Базовая задержка между повторами в секундах.
+            backoff_max (float): Максимальная задержка между повторами в секундах.
+            breaker_threshold (int): Количество ошибок подряд до размыкания предохранителя.
+            breaker_reset_timeout (float): Время в секундах до пробного запроса после размыкания.
+            cache (Optional[ImageResultCache]): Кэш результатов генерации. None отключает кэширование.
+            binary_response (bool): Запрашивать изображение байтами (Accept: image/png), а не в base64.
         """
         self._token = token
         self._url = url
+        self._session: requests.Session = create_session(pool_size)
+        self._timeout = (connect_timeout, read_timeout)
+        self._max_retries: int = max(0, max_retries)
+        self._backoff_base: float = backoff_base
+        self._backoff_max: float = backoff_max
+        self._breaker: CircuitBreaker = CircuitBreaker(
+            breaker_threshold, breaker_reset_timeout
+        )
+        self._stats_lock = threading.Lock()
+        self._calls: int = 0
+        self._retries: int = 0
+        self._failures: int = 0
+        self._cache: Optional[ImageResultCache] = cache
+        self._binary_response: bool = binary_response
+        self._single_flight: SingleFlight[List[Dict[str, Any]]] = SingleFlight()
 
-    def generate_image(self, text_description: str) -> List[Dict[str, Any]]:
+    @classmethod
+    def from_settings(cls, settings: Any) -> "ImageGenerationService":
+        """
+        Создаёт сервис по настройкам проекта.
+
+        Аргументы:
+            settings (ProjectSettings): Настройки проекта.
+
+        Возвращает:
+            ImageGenerationService: Настроенный экземпляр сервиса.
+        """
+        cache: Optional[ImageResultCache] = None
+        if settings.image_cache_enabled:
+            cache = ImageResultCache(
+                memory_max_bytes=settings.image_cache_memory_mb * 1024 * 1024,
+                disk_dir=settings.image_cache_dir,
+                disk_max_bytes=settings.image_cache_disk_mb * 1024 * 1024,
+            )
+        return cls(
+            settings.stability_ai_token.get_secret_value(),
+            settings.stability_ai_url,
+            pool_size=settings.generation_workers,
+            connect_timeout=settings.stability_connect_timeout,
+            read_timeout=settings.stability_read_timeout,
+            max_retries=settings.stability_max_retries,
+            breaker_threshold=settings.stability_breaker_threshold,
+            breaker_reset_timeout=settings.stability_breaker_reset_timeout,
+            cache=cache,
+            binary_response=settings.stability_binary_response,
+        )
+
+    def generate_image(
+        self, text_description: str, samples: int = 1
+    ) -> List[Dict[str, Any]]:
         """
         Генерирует изображение на основе предоставленного текстового описания.
 
+        При seed=0 результат детерминирован, поэтому повторные запросы с тем же
+        нормализованным описанием и параметрами отдаются из кэша, а одновременные
+        одинаковые запросы объединяются в один вызов сервиса. Тело ответа читается
+        потоком: изображение приходит байтами или декодируется из base64 по фрагментам.
+
         Аргументы:
             text_description (str): Текстовое описание для генерации изображения.
+            samples (int): Количество вариантов изображения, получаемых одним запросом.
 
         Возвращает:
-            List[Dict[str, Any]]: Список словарей, каждый из которых содержит информацию об изображении.
+            List[Dict[str, Any]]: Список словарей, каждый из которых содержит информацию об изображении
+                и его содержимое в поле binary.
 
         Исключения:
             RuntimeError: Если произошла ошибка при генерации изображения.
@@ -59,30 +148,184 @@ class ImageGenerationService:
             "height": 1024,
             "seed": 0,
             "cfg_scale": 5,
-            "samples": 1,
+            "samples": samples,
             "text_prompts": [{"text": text_description, "weight": 1}],
         }
+        cache_key = make_cache_key(body)
+        if self._cache is not None:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        artifacts, shared = self._single_flight.do(
+            cache_key, lambda: self._fetch(body, cache_key)
+        )
+        return list(artifacts) if shared else artifacts
+
+    def _fetch(self, body: Dict[str, Any], cache_key: str) -> List[Dict[str, Any]]:
+        """
+        Запрашивает изображение у сервиса и сохраняет результат в кэш.
+
+        Аргументы:
+            body (Dict[str, Any]): Тело запроса.
+            cache_key (str): Ключ кэша, построенный make_cache_key.
+
+        Возвращает:
+            List[Dict[str, Any]]: Список артефактов с байтами изображения в поле binary.
+
+        Исключения:
+            RuntimeError: Если произошла ошибка при генерации изображения.
+        """
+        # Двоичный ответ содержит только одно изображение
+        binary = self._binary_response and body["samples"] == 1
         headers = {
-            "Accept": "application/json",
+            "Accept": "image/png" if binary else "application/json",
             "Content-Type": "application/json",
             "Authorization": f"Bearer {self._token}",
         }
-        response = requests.post(self._url, headers=headers, json=body)
-        if response.status_code == 200:
-            data = response.json()
-            return data.get("artifacts", [])
-        else:
-            error_message = (
-                f"Ошибка при генерации изображения. Код ошибки: {response.status_code}"
-            )
-            logging.error(error_message)
+        response = self._post(headers, body)
+        try:
+            if response.status_code != 200:
+                error_message = (
+                    f"Ошибка при генерации изображения. Код ошибки: {response.status_code}"
+                )
+                logging.error(error_message)
+                raise RuntimeError("Ошибка при генерации изображения 😢")
+            artifacts = self._read_artifacts(response)
+        finally:
+            response.close()
+        if self._cache is not None:
+            self._cache.put(cache_key, artifacts)
+        return artifacts
+
+    def _read_artifacts(self, response: requests.Response) -> List[Dict[str, Any]]:
+        """
+        Читает артефакты из успешного ответа сервиса.
+
+        Аргументы:
+            response (requests.Response): Ответ, полученный с stream=True.
+
+        Возвращает:
+            List[Dict[str, Any]]: Список артефактов с байтами изображения в поле binary.
+
+        Исключения:
+            RuntimeError: Если ответ оборван или повреждён.
+        """
+        try:
+            if response.headers.get("Content-Type", "").startswith("image/"):
+                return [binary_artifact(response)]
+            return decode_json_artifacts(response.iter_content(CHUNK_SIZE))
+        except (ValueError, requests.RequestException) as e:
+            logging.error(f"Ошибка чтения ответа сервиса генерации: {e}")
             raise RuntimeError("Ошибка при генерации изображения 😢")
 
+    def _post(self, headers: Dict[str, str], body: Dict[str, Any]) -> requests.Response:
+        """
+        Отправляет запрос через пул соединений с таймаутами, повторами и предохранителем.
+
+        Аргументы:
+            headers (Dict[str, str]): Заголовки запроса.
+            body (Dict[str, Any]): Тело запроса.
+
+        Возвращает:
+            requests.Response: Последний полученный ответ сервиса.
+
+        Исключения:
+            RuntimeError: Если предохранитель разомкнут или сервис недоступен.
+        """
+        if not self._breaker.allow():
+            raise RuntimeError(
+                "Сервис генерации временно недоступен. Попробуйте позже 😢"
+            )
+        with self._stats_lock:
+            self._calls += 1
+
+        attempt = 0
+        while True:
+            response = None
+            try:
+                response = self._session.post(
+                    self._url,
+                    headers=headers,
+                    json=body,
+                    timeout=self._timeout,
+                    stream=True,
+                )
+            except requests.RequestException as e:
+                logging.error(f"Ошибка соединения с сервисом генерации: {e}")
+
+            retryable = response is None or response.status_code in RETRY_STATUSES
+            if not retryable:
+                self._breaker.record_success()
+                return response
+            if attempt >= self._max_retries:
+                self._breaker.record_failure()
+                with self._stats_lock:
+                    self._failures += 1
+                if response is None:
+                    raise RuntimeError("Ошибка при генерации изображения 😢")
+                return response
+
+            delay = backoff_delay(attempt, self._backoff_base, self._backoff_max)
+            if response is not None:
+                retry_after = retry_after_seconds(response)
+                if retry_after is not None:
+                    delay = min(retry_after, self._backoff_max)
+                response.close()
+            attempt += 1
+            with self._stats_lock:
+                self._retries += 1
+            time.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает статистику обращений к сервису генерации.
+
+        Возвращает:
+            Dict[str, Any]: Вызовы, повторы, ошибки, переиспользование соединений и состояние предохранителя.
+        """
+        with self._stats_lock:
+            result: Dict[str, Any] = {
+                "calls": self._calls,
+                "retries": self._retries,
+                "failures": self._failures,
+            }
+        result.update(connection_stats(self._session))
+        result.update(self._breaker.stats())
+        result.update(
+            {
+                f"single_flight_{name}": value
+                for name, value in self._single_flight.stats().items()
+            }
+        )
+        if self._cache is not None:
+            result.update(
+                {f"cache_{name}": value for name, value in self._cache.stats().items()}
+            )
+        return result
+
+    def close(self) -> None:
+        """
+        Закрывает соединения пула.
+        """
+        self._session.close()
+
 
 def main() -> None:
     """
     Главная функция программы.
     """
+    # Pillow и .env нужны только при запуске модуля как программы
+    from dotenv import load_dotenv
+    from PIL import Image
+
+    load_dotenv()
+    logging.basicConfig(
+        filename="error.log",
+        level=logging.ERROR,
+        format="%(asctime)s - %(levelname)s - %(message)s",
+    )
+
     stability_ai_token: str = os.getenv("STABILITY_AI_TOKEN")
     stability_ai_url: str = os.getenv("STABILITY_AI_URL")
 
@@ -107,7 +350,7 @@ def main() -> None:
                 os.makedirs(result_dir)
 
             for image_data in generated_images:
-                img_data: bytes = base64.b64decode(image_data["base64"])
+                img_data: bytes = artifact_bytes(image_data)
                 img_io: io.BytesIO = io.BytesIO(img_data)
                 image: Image.Image = Image.open(img_io)
 
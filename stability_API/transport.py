@@ -0,0 +1,189 @@
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Коды ответа, при которых запрос к сервису имеет смысл повторить
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """
+    Создаёт HTTP-сессию с пулом keep-alive соединений.
+
+    Аргументы:
+        pool_size (int): Максимальное число одновременно открытых соединений к хосту.
+
+    Возвращает:
+        requests.Session: Сессия с подключённым HTTPAdapter.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def connection_stats(session: requests.Session) -> Dict[str, int]:
+    """
+    Считает открытые и повторно использованные соединения пула сессии.
+
+    Аргументы:
+        session (requests.Session): Сессия, созданная create_session.
+
+    Возвращает:
+        Dict[str, int]: Количество запросов, новых соединений и переиспользований.
+    """
+    opened = 0
+    requests_sent = 0
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+    return {
+        "http_requests": requests_sent,
+        "connections_opened": opened,
+        "connections_reused": max(0, requests_sent - opened),
+    }
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Возвращает задержку перед повтором по схеме экспоненциального роста с полным джиттером.
+
+    Аргументы:
+        attempt (int): Номер повтора, начиная с 0.
+        base (float): Базовая задержка в секундах.
+        cap (float): Максимальная задержка в секундах.
+
+    Возвращает:
+        float: Задержка в секундах.
+    """
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+class CircuitBreaker:
+    """
+    Предохранитель, который перестаёт пропускать запросы к недоступному сервису.
+
+    После failure_threshold ошибок подряд предохранитель размыкается и в течение
+    reset_timeout секунд запросы сразу отклоняются. Затем пропускается один
+    пробный запрос: успех замыкает цепь, ошибка снова размыкает её.
+
+    Атрибуты:
+        failure_threshold (int): Количество ошибок подряд до размыкания.
+        reset_timeout (float): Время в секундах до пробного запроса.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        """
+        Инициализирует предохранитель.
+
+        Аргументы:
+            failure_threshold (int): Количество ошибок подряд до размыкания.
+            reset_timeout (float): Время в секундах до пробного запроса.
+        """
+        self.failure_threshold: int = max(1, failure_threshold)
+        self.reset_timeout: float = reset_timeout
+        self._lock = threading.Lock()
+        self._state: str = self.CLOSED
+        self._failures: int = 0
+        self._opened_at: float = 0.0
+        self._trial_in_flight: bool = False
+        self._times_opened: int = 0
+        self._rejected: int = 0
+
+    def allow(self) -> bool:
+        """
+        Проверяет, можно ли сейчас отправить запрос.
+
+        Возвращает:
+            bool: True, если запрос разрешён.
+        """
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    self._rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    self._rejected += 1
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        """
+        Отмечает успешный ответ сервиса и замыкает цепь.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """
+        Отмечает ошибку сервиса и при необходимости размыкает цепь.
+        """
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != self.OPEN:
+                    self._times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Возвращает состояние предохранителя.
+
+        Возвращает:
+            Dict[str, Any]: Состояние, ошибки подряд, число размыканий и отклонённых запросов.
+        """
+        with self._lock:
+            return {
+                "breaker_state": self._state,
+                "breaker_consecutive_failures": self._failures,
+                "breaker_times_opened": self._times_opened,
+                "breaker_rejected": self._rejected,
+            }
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """
+    Извлекает задержку из заголовка Retry-After, если сервис её указал.
+
+    Аргументы:
+        response (requests.Response): Ответ сервиса.
+
+    Возвращает:
+        Optional[float]: Задержка в секундах или None.
+    """
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
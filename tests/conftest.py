@@ -0,0 +1,33 @@
+import os
+import sys
+
+import peewee as pw
+import pytest
+
+# Тесты запускаются и как pytest из корня, и как python -m pytest: пакеты проекта ищутся от корня
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")))
+
+from database.common.models import UserQuota, db  # noqa: E402
+from database.utils.migrations import migrate  # noqa: E402
+
+
+@pytest.fixture
+def database(tmp_path):
+    """
+    Файловая база SQLite с актуальной схемой, к которой привязан прокси db.
+
+    Файл нужен, а не :memory:, чтобы у каждого потока было своё соединение к той же базе.
+    """
+    previous = db.obj
+    engine = pw.SqliteDatabase(
+        str(tmp_path / "test.db"),
+        pragmas={"auto_vacuum": "incremental", "journal_mode": "wal", "busy_timeout": 5000},
+    )
+    db.initialize(engine)
+    db.connect()
+    migrate(db)
+    UserQuota._refilled_for = None
+    yield db
+    db.close()
+    UserQuota._refilled_for = None
+    db.initialize(previous)
@@ -0,0 +1,84 @@
+from database.common.models import History, MonthlyRequests
+from database.utils.CRUD import BufferedWriter
+
+
+def _row(index: int, **extra):
+    return {
+        "chat_id": 1,
+        "name": "user",
+        "number": str(index),
+        "message": f"request {index}",
+        "token_count": 10,
+        **extra,
+    }
+
+
+def test_flush_writes_rows_and_rollups(database):
+    writer = BufferedWriter(database, History, batch_size=100, flush_interval=60)
+    for index in range(5):
+        writer.add(_row(index))
+
+    assert writer.flush() == 5
+    assert History.select().count() == 5
+    assert [row.token_count for row in History.select()] == [9] * 5
+    assert MonthlyRequests.select().get().total_requests == 5
+
+
+def test_bad_row_does_not_lose_the_batch(database):
+    writer = BufferedWriter(database, History, batch_size=100, flush_interval=60)
+    for index in range(3):
+        writer.add(_row(index))
+    writer.add(_row(3, name=None))
+
+    assert writer.flush() == 3
+    stats = writer.stats()
+    assert stats["rows_written"] == 3
+    assert stats["failed_batches"] == 1
+    assert stats["rows_failed"] == 1
+    # Повторная запись по одной строке не списывает токен дважды
+    assert [row.token_count for row in History.select()] == [9] * 3
+    assert MonthlyRequests.select().get().total_requests == 3
+
+
+def test_rows_are_stamped_when_added(database):
+    writer = BufferedWriter(database, History, batch_size=100, flush_interval=60)
+    first, second = _row(0), _row(1)
+    writer.add(first)
+    writer.add(second)
+    assert first["last_generated_at"] <= second["last_generated_at"]
+
+    writer.flush()
+    stored = [row.last_generated_at for row in History.select().order_by(History.id)]
+    assert stored == [first["last_generated_at"], second["last_generated_at"]]
+
+
+def test_background_thread_flushes_on_close(database):
+    writer = BufferedWriter(database, History, batch_size=100, flush_interval=60).start()
+    writer.add(_row(0))
+    writer.close()
+    assert History.select().count() == 1
+
+
+def test_flushed_batch_is_timed_as_db_store(database, monkeypatch):
+    import database.utils.CRUD as crud_module
+    from database.core import crud
+    from monitoring.metrics import MetricsRegistry
+    from my_bot.my_bot import Bot
+    from stability_API.stability_ai import ImageGenerationService
+
+    # Bot подменяет функцию модуля; monkeypatch вернёт исходную после теста
+    monkeypatch.setattr(crud_module, "_insert_rows", crud_module._insert_rows)
+    registry = MetricsRegistry()
+    writer = BufferedWriter(database, History, batch_size=100, flush_interval=60)
+    Bot(
+        "123456:test",
+        ImageGenerationService("token", "http://127.0.0.1:9/generate"),
+        crud,
+        history_writer=writer,
+        metrics=registry,
+    )
+    for index in range(5):
+        writer.add(_row(index))
+    writer.flush()
+
+    assert 'upstream_duration_seconds_count{call="db_store"} 1' in registry.render()
@@ -0,0 +1,56 @@
+import os
+
+from stability_API.cache import ImageResultCache, make_cache_key
+
+ARTIFACTS = [
+    {"binary": b"\x89PNG first", "seed": 1, "finishReason": "SUCCESS"},
+    {"binary": b"\x89PNG second", "seed": 2, "finishReason": "SUCCESS"},
+]
+
+
+def test_cache_key_ignores_case_and_spacing_only():
+    body = {"seed": 0, "samples": 1, "text_prompts": [{"text": "A  red Fox", "weight": 1}]}
+    same = {"seed": 0, "samples": 1, "text_prompts": [{"text": "a red fox ", "weight": 1}]}
+    other = {"seed": 0, "samples": 2, "text_prompts": [{"text": "a red fox", "weight": 1}]}
+    assert make_cache_key(body) == make_cache_key(same)
+    assert make_cache_key(body) != make_cache_key(other)
+    # Тело запроса не меняется: сервис получает текст пользователя как есть
+    assert body["text_prompts"][0]["text"] == "A  red Fox"
+
+
+def test_disk_entries_survive_restart(tmp_path):
+    cache = ImageResultCache(memory_max_bytes=1024, disk_dir=str(tmp_path))
+    cache.put("key", ARTIFACTS)
+
+    assert sorted(os.listdir(tmp_path)) == ["key.0.png", "key.1.png", "key.json"]
+    restarted = ImageResultCache(memory_max_bytes=1024, disk_dir=str(tmp_path))
+    assert restarted.get("key") == ARTIFACTS
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_corrupt_entry_is_a_miss_and_removed(tmp_path):
+    ImageResultCache(disk_dir=str(tmp_path)).put("key", ARTIFACTS)
+    with open(tmp_path / "key.json", "w") as file:
+        file.write("{not json")
+
+    cache = ImageResultCache(disk_dir=str(tmp_path))
+    assert cache.get("key") is None
+    assert cache.stats()["misses"] == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_legacy_and_orphan_files_are_removed(tmp_path):
+    for name in ("old.pkl", "key.0.png", "key.json.abc.tmp"):
+        (tmp_path / name).write_bytes(b"x")
+    cache = ImageResultCache(disk_dir=str(tmp_path))
+    assert os.listdir(tmp_path) == []
+    assert cache.stats()["disk_entries"] == 0
+
+
+def test_disk_level_evicts_oldest_entries(tmp_path):
+    cache = ImageResultCache(memory_max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=200)
+    for index in range(5):
+        cache.put(f"key{index}", [{"binary": bytes(80), "seed": index}])
+    assert cache.stats()["disk_bytes"] <= 200
+    assert cache.get("key0") is None
+    assert cache.get("key4") == [{"binary": bytes(80), "seed": 4}]
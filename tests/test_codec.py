@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from benchmarks.bench_codec import _ALPHABET, legacy_decrypt, legacy_encrypt
+from my_bot.codec import codec
+
+KEYS = [7, 1111111, 123456789, 5008001234, 9876543210]
+
+
+def _random_texts(seed: int, count: int = 200):
+    rng = random.Random(seed)
+    return ["".join(rng.choices(_ALPHABET, k=rng.randint(0, 60))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_codec_matches_character_loop(key):
+    for text in _random_texts(key):
+        encrypted = codec.encrypt(text, key)
+        assert encrypted == legacy_encrypt(text, key)
+        assert codec.decrypt(encrypted, key) == legacy_decrypt(encrypted, key) == text
+
+
+@pytest.mark.parametrize("key", KEYS)
+def test_chat_ids_are_unchanged(key):
+    assert codec.encrypt(key, key) == legacy_encrypt(key, key) == str(key)
+    assert codec.decrypt(str(key), key) == str(key)
+
+
+def test_decrypt_many_keeps_order():
+    key = 123456789
+    texts = _random_texts(0, 20)
+    encrypted = [legacy_encrypt(text, key) for text in texts]
+    assert codec.decrypt_many(encrypted, key) == texts
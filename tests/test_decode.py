@@ -0,0 +1,48 @@
+import base64
+import json
+
+import pytest
+
+from stability_API.decode import artifact_bytes, decode_json_artifacts
+
+
+def _response(images):
+    return json.dumps(
+        {
+            "artifacts": [
+                {"base64": base64.b64encode(image).decode(), "seed": index, "finishReason": "SUCCESS"}
+                for index, image in enumerate(images)
+            ]
+        }
+    ).encode()
+
+
+def _chunks(data: bytes, size: int):
+    return [data[start : start + size] for start in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 100_000])
+def test_streaming_decode_matches_json(chunk_size):
+    images = [bytes(range(256)) * 3, b"\x89PNG" + b"x" * 1001]
+    artifacts = decode_json_artifacts(_chunks(_response(images), chunk_size))
+
+    assert [artifact_bytes(artifact) for artifact in artifacts] == images
+    assert [artifact["seed"] for artifact in artifacts] == [0, 1]
+    assert all("base64" not in artifact for artifact in artifacts)
+
+
+def test_escaped_slashes_are_ignored():
+    image = b"\xff\xfe\xfd" * 50
+    encoded = base64.b64encode(image).decode().replace("/", "\\/")
+    data = ('{"artifacts": [{"base64": "%s", "seed": 1}]}' % encoded).encode()
+    assert artifact_bytes(decode_json_artifacts(_chunks(data, 5))[0]) == image
+
+
+def test_truncated_response_is_rejected():
+    data = _response([b"image" * 100])
+    with pytest.raises(ValueError):
+        decode_json_artifacts(_chunks(data[: len(data) // 2], 16))
+
+
+def test_artifact_bytes_accepts_base64_field():
+    assert artifact_bytes({"base64": base64.b64encode(b"png").decode()}) == b"png"
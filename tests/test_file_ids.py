@@ -0,0 +1,46 @@
+from database.common.models import TelegramFile
+from my_bot.file_ids import FileIdCache, content_hash
+
+
+def test_upload_then_reuse_counts_uploaded_size():
+    cache = FileIdCache(persistent=False)
+    key = content_hash(b"original png")
+    assert cache.get(key) is None
+
+    cache.record_upload(key, "file-1", 300)
+    assert cache.get(key) == "file-1"
+    cache.record_reuse(key)
+    cache.record_reuse(key)
+
+    assert cache.stats() == {
+        "entries": 1,
+        "uploads": 1,
+        "upload_bytes": 300,
+        "reuses": 2,
+        "upload_bytes_saved": 600,
+    }
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = FileIdCache(max_entries=2, persistent=False)
+    cache.record_upload("a", "file-a", 1)
+    cache.record_upload("b", "file-b", 1)
+    cache.get("a")
+    cache.record_upload("c", "file-c", 1)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "file-a"
+    assert cache.get("c") == "file-c"
+
+
+def test_persistent_entries_survive_restart_and_can_be_forgotten(database):
+    FileIdCache().record_upload("key", "file-1", 300)
+
+    restarted = FileIdCache()
+    assert restarted.get("key") == "file-1"
+    restarted.record_reuse("key")
+    assert restarted.stats()["upload_bytes_saved"] == 300
+
+    restarted.forget("key")
+    assert restarted.get("key") is None
+    assert TelegramFile.select().count() == 0
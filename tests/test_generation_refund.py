@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+from telebot import types
+
+from database.common.models import DAILY_TOKENS, UserQuota
+from database.core import crud
+from my_bot.my_bot import Bot
+from my_bot.workers import GenerationJob
+
+
+class FailingService:
+    """Сервис генерации, который ждёт события и падает."""
+
+    def __init__(self) -> None:
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate_image(self, text_description, samples=1):
+        self.started.set()
+        self.release.wait(5)
+        raise RuntimeError("upstream error")
+
+
+def _message(chat_id: int = 1) -> types.Message:
+    return types.Message.de_json(
+        {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "user"},
+            "text": "cat",
+        }
+    )
+
+
+@pytest.fixture
+def bot(database):
+    service = FailingService()
+    bot = Bot("123456:test", service, crud, shutdown_timeout=0.05)
+    bot.replies = []
+    bot.bot.reply_to = lambda message, text, **kwargs: bot.replies.append(text)
+    bot.bot.send_message = lambda *args, **kwargs: None
+    bot.service = service
+    return bot
+
+
+def test_failed_generation_refunds_once(bot):
+    UserQuota.consume(1, 3)
+    UserQuota.consume(1, 2)
+    job = GenerationJob(_message(), "cat", samples=2)
+
+    with pytest.raises(RuntimeError):
+        bot._run_generation_job(job)
+    assert UserQuota.remaining(1) == DAILY_TOKENS - 3
+    assert bot.replies == ["Произошла ошибка: upstream error"]
+
+    bot._refund_job(job)
+    assert UserQuota.remaining(1) == DAILY_TOKENS - 3
+
+
+def test_shutdown_refunds_jobs_that_are_still_running(bot):
+    bot.service.release.clear()
+    UserQuota.consume(1, 3)
+    UserQuota.consume(1, 2)
+    bot.generation_pool.start()
+    assert bot.generation_pool.submit(GenerationJob(_message(), "cat", samples=2))
+    assert bot.service.started.wait(5)
+
+    bot.shutdown()
+    assert UserQuota.remaining(1) == DAILY_TOKENS - 3
+
+    # Задание завершается ошибкой уже после остановки и не возвращает токены повторно
+    bot.service.release.set()
+    while bot.generation_pool.running():
+        time.sleep(0.01)
+    assert UserQuota.remaining(1) == DAILY_TOKENS - 3
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+
+from database.common.models import History
+
+START = datetime(2024, 3, 1, 12, 0)
+
+
+def _add_rows(chat_id: int, count: int) -> None:
+    # По три строки на одну и ту же секунду: порядок внутри неё задаёт id
+    History.insert_many(
+        [
+            {
+                "chat_id": chat_id,
+                "name": "user",
+                "number": str(index),
+                "message": "/start" if index % 5 == 0 else f"request {index}",
+                "last_generated_at": START + timedelta(seconds=index // 3),
+            }
+            for index in range(count)
+        ]
+    ).execute()
+
+
+def _key(entry: History):
+    return entry.last_generated_at, entry.id
+
+
+def test_older_pages_cover_history_once_newest_first(database):
+    _add_rows(1, 40)
+    _add_rows(2, 10)
+    expected = list(
+        History.select()
+        .where((History.chat_id == 1) & ~(History.message.startswith("/")))
+        .order_by(History.last_generated_at.desc(), History.id.desc())
+    )
+
+    seen = []
+    cursor = None
+    while True:
+        page = list(History.requests_page(1, 7, before=cursor))
+        if not page:
+            break
+        seen.extend(page)
+        cursor = _key(page[-1])
+
+    assert [entry.id for entry in seen] == [entry.id for entry in expected]
+    assert all(entry.chat_id == 1 and not entry.message.startswith("/") for entry in seen)
+
+
+def test_newer_page_returns_rows_after_cursor_oldest_first(database):
+    _add_rows(1, 40)
+    first = list(History.requests_page(1, 7))
+    second = list(History.requests_page(1, 7, before=_key(first[-1])))
+
+    back = list(History.requests_page(1, 7, after=_key(second[0])))
+
+    assert [entry.id for entry in back] == [entry.id for entry in reversed(first)]
+
+
+def test_page_after_newest_row_is_empty(database):
+    _add_rows(1, 10)
+    newest = History.requests_page(1, 1).get()
+    assert list(History.requests_page(1, 5, after=_key(newest))) == []
@@ -0,0 +1,73 @@
+import os
+from datetime import datetime, timedelta
+
+from database.common.models import History, MonthlyRequests
+from database.utils.CRUD import _insert_rows
+from database.utils.maintenance import archive_history, archive_path, compact, read_archive
+
+NOW = datetime(2024, 6, 30, 12, 0)
+
+
+def _add_history(database, count: int) -> None:
+    # Каждые две строки - одна секунда, чтобы граница пачки приходилась на равные времена
+    rows = [
+        {
+            "chat_id": index % 3,
+            "name": "user",
+            "number": str(index),
+            "message": f"request {index}",
+            "token_count": 10,
+            "last_generated_at": NOW - timedelta(days=120) + timedelta(hours=index // 2),
+        }
+        for index in range(count)
+    ]
+    _insert_rows(database, History, *rows)
+
+
+def test_archive_moves_only_old_rows_and_keeps_rollups(database, tmp_path):
+    _add_history(database, 3000)
+    cutoff = NOW - timedelta(days=90)
+    old = list(
+        History.select().where(History.last_generated_at < cutoff).order_by(History.id).dicts()
+    )
+    kept = History.select().where(History.last_generated_at >= cutoff).count()
+    months_before = list(MonthlyRequests.select().order_by(MonthlyRequests.chat_id).dicts())
+
+    archived = archive_history(database, str(tmp_path / "archive"), 90, batch_size=101, now=NOW)
+
+    assert archived == len(old)
+    assert History.select().where(History.last_generated_at < cutoff).count() == 0
+    assert History.select().count() == kept
+    assert list(MonthlyRequests.select().order_by(MonthlyRequests.chat_id).dicts()) == months_before
+
+    restored = []
+    for month in sorted({row["last_generated_at"].strftime("%Y-%m") for row in old}):
+        restored.extend(read_archive(archive_path(str(tmp_path / "archive"), month)))
+    assert sorted(row["id"] for row in restored) == [row["id"] for row in old]
+    by_id = {row["id"]: row for row in restored}
+    for row in old:
+        assert by_id[row["id"]]["message"] == row["message"]
+        assert by_id[row["id"]]["last_generated_at"] == row["last_generated_at"].isoformat(sep=" ")
+
+
+def test_second_archive_run_appends_nothing(database, tmp_path):
+    _add_history(database, 200)
+    archive_dir = str(tmp_path / "archive")
+    assert archive_history(database, archive_dir, 90, now=NOW) > 0
+    sizes = {name: os.path.getsize(os.path.join(archive_dir, name)) for name in os.listdir(archive_dir)}
+
+    assert archive_history(database, archive_dir, 90, now=NOW) == 0
+    assert {
+        name: os.path.getsize(os.path.join(archive_dir, name)) for name in os.listdir(archive_dir)
+    } == sizes
+
+
+def test_compact_returns_free_pages(database, tmp_path):
+    _add_history(database, 3000)
+    archive_history(database, str(tmp_path / "archive"), 0, now=NOW + timedelta(days=1))
+
+    result = compact(database)
+
+    assert result["free_pages_before"] > 0
+    assert result["free_pages_after"] == 0
+    assert result["pages_after"] < result["pages_before"]
@@ -0,0 +1,99 @@
+import pytest
+from telebot import types
+from telebot.apihelper import ApiException
+
+from database.core import crud
+from my_bot.my_bot import Bot
+from my_bot.workers import GenerationJob
+from stability_API.stability_ai import ImageGenerationService
+
+IMAGES = [b"first image", b"second image", b"third image"]
+
+
+class FakeTelegram:
+    """Записывает альбомы и отвечает на них сообщениями с новыми file_id."""
+
+    def __init__(self) -> None:
+        self.albums = []
+        self.rejected = set()
+        self.uploaded = 0
+
+    def send_media_group(self, chat_id, media):
+        items = [photo.media for photo in media]
+        self.albums.append(items)
+        if any(item in self.rejected for item in items):
+            raise ApiException("wrong file identifier", "sendMediaGroup", None)
+        messages = []
+        for item in items:
+            if not isinstance(item, str):
+                self.uploaded += 1
+                item = f"file-{self.uploaded}"
+            messages.append(_photo_message(chat_id, item))
+        return messages
+
+
+def _photo_message(chat_id, file_id):
+    return types.Message.de_json(
+        {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": chat_id, "type": "private"},
+            "photo": [{"file_id": file_id, "file_unique_id": file_id, "width": 1, "height": 1}],
+        }
+    )
+
+
+@pytest.fixture
+def bot():
+    bot = Bot("123456:test", ImageGenerationService("token", "http://127.0.0.1:9/generate"), crud)
+    bot.telegram = FakeTelegram()
+    bot.bot.send_media_group = bot.telegram.send_media_group
+    return bot
+
+
+def test_album_is_uploaded_once_then_sent_by_file_id(bot):
+    bot.send_media_group(1, IMAGES)
+    bot.send_media_group(1, IMAGES)
+
+    assert bot.telegram.albums[0] == IMAGES
+    assert bot.telegram.albums[1] == ["file-1", "file-2", "file-3"]
+    stats = bot.file_ids.stats()
+    assert (stats["uploads"], stats["reuses"]) == (3, 3)
+    assert stats["upload_bytes_saved"] == sum(len(image) for image in IMAGES)
+
+
+def test_rejected_file_id_falls_back_to_upload(bot):
+    bot.send_media_group(1, IMAGES[:2])
+    bot.telegram.rejected.add("file-1")
+    bot.send_media_group(1, IMAGES)
+
+    assert bot.telegram.albums[1] == ["file-1", "file-2", IMAGES[2]]
+    assert bot.telegram.albums[2] == IMAGES
+    assert bot.file_ids.stats()["reuses"] == 0
+
+
+def test_variants_job_sends_one_album(bot, database, monkeypatch):
+    requested = []
+
+    def generate_image(text_description, samples=1):
+        requested.append(samples)
+        return [{"binary": image, "seed": index} for index, image in enumerate(IMAGES)]
+
+    monkeypatch.setattr(bot.image_generation_service, "generate_image", generate_image)
+    bot.bot.send_photo = lambda *args, **kwargs: pytest.fail("variants must be sent as an album")
+    bot.bot.delete_message = lambda *args, **kwargs: None
+    bot.bot.send_message = lambda *args, **kwargs: None
+    message = types.Message.de_json(
+        {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "user"},
+            "text": "cat",
+        }
+    )
+
+    bot._run_generation_job(GenerationJob(message, "cat", ack_message_id=2, samples=3))
+    assert requested == [3]
+    assert bot.telegram.albums == [IMAGES]
+    assert bot.history_writer.flush() == 1
@@ -0,0 +1,66 @@
+import pytest
+
+from monitoring.metrics import MetricsRegistry, _Metric
+
+
+def test_counter_exposition():
+    registry = MetricsRegistry()
+    counter = registry.counter("updates_total", "Обновления", ["kind"])
+    counter.labels("message").inc()
+    counter.labels("message").inc(2)
+    counter.labels('call"back').inc()
+
+    assert registry.render() == (
+        "# HELP updates_total Обновления\n"
+        "# TYPE updates_total counter\n"
+        'updates_total{kind="call\\"back"} 1\n'
+        'updates_total{kind="message"} 3\n'
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Задержка", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    lines = registry.render().splitlines()
+    assert lines[1] == "# TYPE latency_seconds histogram"
+    assert lines[2:] == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]
+
+
+def test_gauge_callback_skips_non_numeric_values():
+    registry = MetricsRegistry()
+    registry.gauge_callback(
+        "pool", "Пул", lambda: {"busy": 2, "enabled": True, "name": "x", "ratio": 0.5}
+    )
+    assert registry.render() == (
+        "# HELP pool_busy Пул\n# TYPE pool_busy gauge\npool_busy 2\n"
+        "# HELP pool_ratio Пул\n# TYPE pool_ratio gauge\npool_ratio 0.5\n"
+    )
+
+
+def test_failing_callback_does_not_break_exposition():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Запросы").inc()
+    registry.gauge_callback("broken", "Сломано", lambda: 1 / 0)
+    text = registry.render()
+    assert "requests_total 1\n" in text
+    assert text.endswith("# broken: division by zero\n")
+
+
+def test_metric_name_and_label_checks():
+    registry = MetricsRegistry()
+    registry.counter("value", "Значение", ["a"])
+    with pytest.raises(ValueError):
+        registry.histogram("value", "Значение")
+    with pytest.raises(ValueError):
+        registry.counter("value", "Значение", ["a"]).labels()
+    with pytest.raises(TypeError):
+        _Metric("base", "Базовая")
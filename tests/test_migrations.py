@@ -0,0 +1,71 @@
+import peewee as pw
+import pytest
+
+from database.common.models import History, MonthlyRequests
+from database.utils.migrations import MODELS, SCHEMA_VERSION, migrate, schema_version
+
+# Таблица history в том виде, в каком её создавала первая версия бота
+BASELINE_HISTORY = """
+CREATE TABLE "history" (
+    "id" INTEGER NOT NULL PRIMARY KEY,
+    "chat_id" INTEGER NOT NULL,
+    "name" TEXT NOT NULL,
+    "number" TEXT NOT NULL,
+    "message" TEXT NOT NULL,
+    "token_count" INTEGER NOT NULL,
+    "last_generated_at" DATETIME NOT NULL
+)
+"""
+
+
+@pytest.fixture
+def baseline_db(tmp_path):
+    engine = pw.SqliteDatabase(str(tmp_path / "baseline.db"))
+    engine.connect()
+    engine.execute_sql(BASELINE_HISTORY)
+    rows = [
+        (1, "hello", "2024-01-05 10:00:00"),
+        (1, "/start", "2024-01-05 10:01:00"),
+        (1, "cat", "2024-01-20 10:00:00"),
+        (1, "dog", "2024-02-01 09:00:00"),
+        (2, "fox", "2024-02-03 09:00:00"),
+    ]
+    for chat_id, message, generated_at in rows:
+        engine.execute_sql(
+            'INSERT INTO "history" ("chat_id", "name", "number", "message", '
+            '"token_count", "last_generated_at") VALUES (?, ?, ?, ?, ?, ?)',
+            (chat_id, "user", "1", message, 10, generated_at),
+        )
+    yield engine
+    engine.close()
+
+
+def test_migrate_upgrades_baseline_database(baseline_db):
+    assert schema_version(baseline_db) == 0
+    assert migrate(baseline_db)
+    assert schema_version(baseline_db) == SCHEMA_VERSION
+
+    tables = set(baseline_db.get_tables())
+    assert {model._meta.table_name for model in MODELS} <= tables
+    indexes = {index.name for index in baseline_db.get_indexes("history")}
+    assert "history_chat_id_last_generated_at" in indexes
+    assert "history_last_generated_at" in indexes
+
+    with baseline_db.bind_ctx(MODELS):
+        assert History.select().count() == 5
+        months = {
+            (row.chat_id, row.month): row.total_requests for row in MonthlyRequests.select()
+        }
+    assert months == {(1, "2024-01"): 2, (1, "2024-02"): 1, (2, "2024-02"): 1}
+
+
+def test_forced_migrate_does_not_count_history_twice(baseline_db):
+    migrate(baseline_db)
+    assert migrate(baseline_db, force=True)
+    with baseline_db.bind_ctx(MODELS):
+        assert (
+            MonthlyRequests.get(
+                (MonthlyRequests.chat_id == 1) & (MonthlyRequests.month == "2024-01")
+            ).total_requests
+            == 2
+        )
@@ -0,0 +1,48 @@
+import io
+
+import pytest
+from PIL import Image
+
+from my_bot.postprocess import ImagePostProcessor
+
+
+def _png(size=(512, 256)) -> bytes:
+    output = io.BytesIO()
+    Image.radial_gradient("L").resize(size).convert("RGBA").save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def processor():
+    processor = ImagePostProcessor(enabled=True, image_format="jpeg", max_side=128, workers=1)
+    yield processor
+    processor.shutdown()
+
+
+def test_disabled_processor_returns_original():
+    data = _png()
+    assert ImagePostProcessor().process(data) is data
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        ImagePostProcessor(image_format="gif")
+
+
+def test_png_is_reencoded_and_downscaled(processor):
+    data = _png()
+    result = processor.process(data)
+
+    with Image.open(io.BytesIO(result)) as image:
+        assert image.format == "JPEG"
+        assert image.size == (128, 64)
+    stats = processor.stats()
+    assert stats["processed"] == 1
+    assert stats["bytes_before"] == len(data)
+    assert stats["bytes_after"] == len(result) < len(data)
+    assert processor._executor._mp_context.get_start_method() in ("forkserver", "spawn")
+
+
+def test_broken_image_is_sent_unchanged(processor):
+    assert processor.process(b"not an image") == b"not an image"
+    assert processor.stats()["errors"] == 1
@@ -0,0 +1,74 @@
+import os
+import threading
+
+from monitoring.profiling import Profiler
+
+
+def _profiles(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith(".prof"))
+
+
+def test_disabled_profiler_only_calls_through(tmp_path):
+    profiler = Profiler(enabled=False, sample_rate=1.0, output_dir=str(tmp_path / "p"))
+    assert profiler.wrap("work")(lambda x: x * 2)(21) == 42
+    assert not os.path.exists(tmp_path / "p")
+
+
+def test_sampled_call_writes_profile_and_allocations(tmp_path):
+    profiler = Profiler(enabled=True, sample_rate=1.0, output_dir=str(tmp_path))
+    assert profiler.wrap("work")(lambda: [bytes(1000) for _ in range(10)])()[0] == bytes(1000)
+
+    (profile,) = _profiles(tmp_path)
+    assert profile.endswith("-work.prof")
+    with open(tmp_path / profile.replace(".prof", ".txt"), encoding="utf-8") as file:
+        assert file.readline().startswith("work: ")
+
+
+def test_nested_and_concurrent_calls_are_not_profiled_twice(tmp_path):
+    profiler = Profiler(enabled=True, sample_rate=1.0, output_dir=str(tmp_path))
+    inner_started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    @profiler.wrap("inner")
+    def inner():
+        inner_started.set()
+        release.wait(5)
+
+    @profiler.wrap("outer")
+    def outer():
+        inner()
+
+    def concurrent():
+        try:
+            profiler.wrap("other")(lambda: None)()
+        except Exception as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=outer)
+    thread.start()
+    inner_started.wait(5)
+    # Пока профилируется outer, второй поток выполняет функцию без профиля
+    concurrent()
+    release.set()
+    thread.join()
+
+    assert errors == []
+    assert [name.rsplit("-", 1)[1] for name in _profiles(tmp_path)] == ["outer.prof"]
+
+
+def test_old_profiles_are_rotated(tmp_path):
+    profiler = Profiler(enabled=True, sample_rate=1.0, output_dir=str(tmp_path), max_files=2)
+    work = profiler.wrap("work")(lambda: None)
+    for _ in range(4):
+        work()
+    assert len(_profiles(tmp_path)) == 2
+    assert len(os.listdir(tmp_path)) == 4
+
+
+def test_toggle_switches_profiling():
+    profiler = Profiler()
+    profiler.toggle()
+    assert profiler.enabled
+    profiler.toggle()
+    assert not profiler.enabled
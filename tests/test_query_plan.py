@@ -0,0 +1,31 @@
+import peewee as pw
+import pytest
+
+from database.utils.migrations import migrate
+from database.utils.query_plan import audit
+
+
+@pytest.fixture
+def engine():
+    engine = pw.SqliteDatabase(":memory:")
+    engine.connect()
+    migrate(engine, force=True)
+    yield engine
+    engine.close()
+
+
+def test_bot_queries_use_indexes(engine):
+    assert audit(engine) == []
+
+
+def test_audit_reports_full_scans(engine):
+    for index in engine.get_indexes("history"):
+        engine.execute_sql(f'DROP INDEX "{index.name}"')
+
+    problems = audit(engine)
+    assert {name for name, _ in problems} == {
+        "history.requests_page_first",
+        "history.requests_page",
+        "history.requests_page_newer",
+    }
+    assert all(detail.startswith("SCAN") for _, detail in problems)
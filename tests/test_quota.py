@@ -0,0 +1,64 @@
+import threading
+from datetime import date, timedelta
+
+from database.common.models import DAILY_TOKENS, UserQuota, db
+
+
+def test_new_user_starts_with_daily_quota(database):
+    assert UserQuota.remaining(1) == DAILY_TOKENS
+    assert UserQuota.consume(1)
+    assert UserQuota.remaining(1) == DAILY_TOKENS - 1
+
+
+def test_consume_never_goes_negative(database):
+    assert UserQuota.consume(1, DAILY_TOKENS - 2)
+    assert not UserQuota.consume(1, 3)
+    assert UserQuota.remaining(1) == 2
+    assert UserQuota.consume(1, 2)
+    assert not UserQuota.consume(1)
+    assert UserQuota.remaining(1) == 0
+
+
+def test_consume_more_than_daily_quota_is_rejected(database):
+    assert not UserQuota.consume(1, DAILY_TOKENS + 1)
+    assert UserQuota.remaining(1) == DAILY_TOKENS
+
+
+def test_refund_is_capped_by_daily_quota(database):
+    UserQuota.consume(1, 4)
+    UserQuota.refund(1, 3)
+    assert UserQuota.remaining(1) == DAILY_TOKENS - 1
+    UserQuota.refund(1, 10)
+    assert UserQuota.remaining(1) == DAILY_TOKENS
+
+
+def test_quota_is_refilled_on_a_new_day(database):
+    UserQuota.consume(1, DAILY_TOKENS)
+    UserQuota.update(refilled_on=date.today() - timedelta(days=1)).execute()
+    UserQuota._refilled_for = None
+    assert UserQuota.remaining(1) == DAILY_TOKENS
+
+
+def test_concurrent_consume_spends_exactly_the_quota(database):
+    results = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(8)
+
+    def spend() -> None:
+        barrier.wait()
+        try:
+            for _ in range(10):
+                spent = UserQuota.consume(7)
+                with lock:
+                    results.append(spent)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=spend) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == DAILY_TOKENS
+    assert UserQuota.remaining(7) == 0
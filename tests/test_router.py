@@ -0,0 +1,64 @@
+import pytest
+from telebot import types
+
+from my_bot.router import Router, route_key
+
+
+def _message(text):
+    return types.Message.de_json(
+        {"message_id": 1, "date": 0, "chat": {"id": 1, "type": "private"}, "text": text}
+    )
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def router(calls):
+    router = Router(lambda message: calls.append(("text", message.text)))
+    router.add(lambda message: calls.append(("tokens", message.text)), "Токены 💰", "/tokens")
+    router.add(
+        lambda message: calls.append(("generate", message.text)),
+        "/generate",
+        when=lambda message: message.chat.id != 2,
+    )
+    return router
+
+
+@pytest.mark.parametrize(
+    "text, key",
+    [("/start", "/start"), ("/start@my_bot payload", "/start"), ("Токены 💰", "Токены 💰"), (None, "")],
+)
+def test_route_key(text, key):
+    assert route_key(text) == key
+
+
+def test_commands_and_buttons_share_a_route(router, calls):
+    for text in ("/tokens", "/tokens@my_bot", "Токены 💰"):
+        router.dispatch(_message(text))
+    assert [name for name, _ in calls] == ["tokens"] * 3
+
+
+def test_unknown_text_and_rejected_guard_go_to_fallback(router, calls):
+    router.dispatch(_message("a red fox"))
+    rejected = _message("/generate")
+    rejected.chat.id = 2
+    router.dispatch(rejected)
+    router.dispatch(_message("/generate"))
+    assert calls == [("text", "a red fox"), ("text", "/generate"), ("generate", "/generate")]
+
+
+def test_duplicate_route_is_rejected(router):
+    with pytest.raises(ValueError):
+        router.add(lambda message: None, "/tokens@other_bot")
+
+
+def test_handlers_can_be_wrapped(router, calls):
+    for handler in router.handlers:
+        function = handler["function"]
+        handler["function"] = lambda message, function=function: function(message) or calls.append("wrapped")
+    router.dispatch(_message("/tokens"))
+    router.dispatch(_message("hello"))
+    assert calls == [("tokens", "/tokens"), "wrapped", ("text", "hello"), "wrapped"]
@@ -0,0 +1,78 @@
+import threading
+import time
+
+from my_bot.scheduler import FairScheduler, TokenBucket
+
+
+def test_users_are_served_in_turn():
+    scheduler = FairScheduler(max_pending=20)
+    for index in range(4):
+        scheduler.put("heavy", f"heavy-{index}")
+    scheduler.put("light", "light-0")
+    scheduler.put("other", "other-0")
+
+    order = [scheduler.get() for _ in range(6)]
+
+    # Пользователи с одним заданием не ждут, пока обработаются все задания тяжёлого
+    assert order.index("light-0") < 3
+    assert order.index("other-0") < 3
+    assert [item for item in order if item.startswith("heavy")] == [f"heavy-{i}" for i in range(4)]
+
+
+def test_put_rejects_when_full_or_closed():
+    scheduler = FairScheduler(max_pending=2)
+    assert scheduler.put(1, "a")
+    assert scheduler.put(2, "b")
+    assert not scheduler.put(3, "c")
+    scheduler.close()
+    assert scheduler.get() in ("a", "b")
+    assert not scheduler.put(1, "d")
+
+
+def test_get_returns_none_after_close_when_empty():
+    scheduler = FairScheduler()
+    scheduler.put(1, "a")
+    scheduler.close()
+    assert scheduler.get() == "a"
+    assert scheduler.get() is None
+
+
+def test_drain_returns_waiting_items():
+    scheduler = FairScheduler()
+    for index in range(3):
+        scheduler.put(index % 2, index)
+    scheduler.close()
+    assert sorted(scheduler.drain()) == [0, 1, 2]
+    assert scheduler.qsize() == 0
+    assert scheduler.get() is None
+
+
+def test_user_rate_limits_bursts():
+    scheduler = FairScheduler(user_rate=20.0, user_burst=2)
+    for index in range(3):
+        scheduler.put(1, index)
+    started = time.monotonic()
+    assert [scheduler.get() for _ in range(3)] == [0, 1, 2]
+    # Третье задание ждёт пополнения корзины: 1 токен при 20 в секунду
+    assert time.monotonic() - started >= 0.04
+    assert scheduler.stats()["throttled_waits"] >= 1
+
+
+def test_get_wakes_up_on_put():
+    scheduler = FairScheduler()
+    result = []
+    consumer = threading.Thread(target=lambda: result.append(scheduler.get()))
+    consumer.start()
+    time.sleep(0.05)
+    scheduler.put(1, "job")
+    consumer.join(timeout=1)
+    assert result == ["job"]
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate=2.0, capacity=3, now=0.0)
+    assert bucket.delay(3, 0.0) == 0.0
+    bucket.take(3, 0.0)
+    assert bucket.delay(1, 0.0) == 0.5
+    assert bucket.delay(1, 0.5) == 0.0
+    assert bucket.is_full(10.0)
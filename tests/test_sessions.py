@@ -0,0 +1,59 @@
+from types import SimpleNamespace
+
+import pytest
+
+import my_bot.sessions as sessions_module
+from database.common.models import ChatState
+from my_bot.sessions import SessionStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(sessions_module, "time", SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+
+def test_sessions_are_separate_per_chat(clock):
+    store = SessionStore()
+    store.set_generating(1, True, samples=4)
+
+    assert store.is_generating(1)
+    assert store.samples(1) == 4
+    assert not store.is_generating(2)
+    assert store.samples(2) == 1
+
+
+def test_inactive_session_expires(clock):
+    store = SessionStore(ttl=60)
+    store.set_generating(1, True)
+    clock.now += 61
+
+    assert not store.is_generating(1)
+    assert store.stats() == {"sessions": 0, "evicted": 1, "persistent": False}
+
+
+def test_sweep_evicts_other_inactive_chats(clock):
+    store = SessionStore(ttl=60, sweep_interval=30)
+    store.set_generating(1, True)
+    clock.now += 61
+    store.set_generating(2, True)
+
+    assert store.stats()["sessions"] == 1
+    assert store.evict_expired() == 0
+
+
+def test_persistent_session_survives_restart(database, clock):
+    SessionStore(persistent=True).set_generating(1, True, samples=3)
+
+    restarted = SessionStore(persistent=True)
+    assert restarted.is_generating(1)
+    assert restarted.samples(1) == 3
+
+
+def test_expired_persistent_session_is_deleted(database, clock):
+    SessionStore(ttl=60, persistent=True).set_generating(1, True)
+    clock.now += 61
+
+    assert not SessionStore(ttl=60, persistent=True).is_generating(1)
+    assert ChatState.select().count() == 0
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from stability_API.single_flight import SingleFlight
+
+
+def _run_concurrently(flight: SingleFlight, key: str, fn, callers: int):
+    results = []
+    errors = []
+    lock = threading.Lock()
+
+    def call() -> None:
+        try:
+            value = flight.do(key, fn)
+            with lock:
+                results.append(value)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        release.wait(1)
+        return "image"
+
+    threads, results, errors = _run_concurrently(flight, "key", fn, 5)
+    # Ждём, пока все вызовы присоединятся к первому
+    while flight.stats()["coalesced"] + flight.stats()["executed"] < 5:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert errors == []
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {value for value, _ in results} == {"image"}
+
+
+def test_error_reaches_every_waiter_and_key_is_released():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(1)
+        raise RuntimeError("boom")
+
+    threads, results, errors = _run_concurrently(flight, "key", failing, 3)
+    while flight.stats()["coalesced"] + flight.stats()["executed"] < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == []
+    assert len(errors) == 3
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flight.do("key", lambda: "again") == ("again", False)
+
+
+def test_sequential_calls_run_again():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == (1, False)
+    assert flight.do("key", lambda: 2) == (2, False)
+    with pytest.raises(ValueError):
+        flight.do("key", lambda: int("x"))
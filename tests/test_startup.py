@@ -0,0 +1,33 @@
+import peewee as pw
+
+from database.common.models import db
+from database.utils.migrations import SCHEMA_VERSION, migrate, schema_version
+from my_bot.file_ids import FileIdCache
+from my_bot.sessions import SessionStore
+from my_bot.translation import TranslationService
+
+DDL = ("CREATE", "ALTER", "DROP", "ANALYZE")
+
+
+def test_migrate_is_skipped_when_version_matches(tmp_path):
+    engine = pw.SqliteDatabase(str(tmp_path / "fresh.db"))
+    engine.connect()
+    assert migrate(engine)
+    assert schema_version(engine) == SCHEMA_VERSION
+    assert not migrate(engine)
+    engine.close()
+
+
+def test_startup_on_current_database_runs_no_ddl(database):
+    statements = []
+    db.connection().set_trace_callback(statements.append)
+    try:
+        assert not migrate(db)
+        SessionStore(persistent=True)
+        FileIdCache(persistent=True)
+        TranslationService(persistent=True).shutdown()
+    finally:
+        db.connection().set_trace_callback(None)
+
+    assert "PRAGMA user_version" in statements
+    assert not [sql for sql in statements if sql.lstrip().upper().startswith(DDL)]
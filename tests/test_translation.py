@@ -0,0 +1,70 @@
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from my_bot.translation import TranslationService
+
+
+@pytest.fixture
+def translator_calls(monkeypatch):
+    calls = []
+
+    def translate(text, target_lang):
+        calls.append(text)
+        if text == "ошибка":
+            raise ConnectionError("offline")
+        return f"{target_lang}:{len(calls)}"
+
+    # Переводчик ходит в сеть, поэтому подменяется модуль mtranslate целиком
+    monkeypatch.setitem(sys.modules, "mtranslate", SimpleNamespace(translate=translate))
+    return calls
+
+
+def test_ascii_text_is_not_translated(translator_calls):
+    service = TranslationService(persistent=False)
+    assert service.translate("red fox") == "red fox"
+    assert translator_calls == []
+    assert service.stats()["skipped_ascii"] == 1
+    service.shutdown()
+
+
+def test_repeated_text_is_served_from_memory(translator_calls):
+    service = TranslationService(persistent=False)
+    assert service.translate("лиса") == "en:1"
+    assert service.translate("лиса") == "en:1"
+    assert service.submit("лиса").result() == "en:1"
+
+    assert translator_calls == ["лиса"]
+    stats = service.stats()
+    assert (stats["misses"], stats["memory_hits"], stats["hit_rate"]) == (1, 2, 0.6667)
+    service.shutdown()
+
+
+def test_memory_tier_evicts_oldest_translation(translator_calls):
+    service = TranslationService(max_entries=1, persistent=False)
+    service.translate("лиса")
+    service.translate("кот")
+    service.translate("лиса")
+    assert translator_calls == ["лиса", "кот", "лиса"]
+    service.shutdown()
+
+
+def test_database_tier_survives_restart(database, translator_calls):
+    first = TranslationService()
+    first.translate("лиса")
+    first.shutdown()
+    restarted = TranslationService()
+
+    assert restarted.translate("лиса") == "en:1"
+    assert restarted.translate("лиса", "de") == "de:2"
+    assert translator_calls == ["лиса", "лиса"]
+    assert restarted.stats()["db_hits"] == 1
+    restarted.shutdown()
+
+
+def test_translator_error_returns_source_text(translator_calls):
+    service = TranslationService(persistent=False)
+    assert service.translate("ошибка") == "ошибка"
+    assert service.stats()["errors"] == 1
+    service.shutdown()
@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import stability_API.transport as transport
+from benchmarks.fake_stability import FakeStabilityServer
+from stability_API.stability_ai import ImageGenerationService
+from stability_API.transport import CircuitBreaker, backoff_delay, retry_after_seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=100.0)
+    monkeypatch.setattr(transport, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+@pytest.fixture
+def fake_server():
+    server = FakeStabilityServer(payload_size=1024).start()
+    yield server
+    server.stop()
+
+
+def test_breaker_opens_after_threshold_and_lets_one_trial_through(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    clock.now += 30
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+    assert breaker.stats() == {
+        "breaker_state": "closed",
+        "breaker_consecutive_failures": 0,
+        "breaker_times_opened": 1,
+        "breaker_rejected": 2,
+    }
+
+
+def test_failed_trial_reopens_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    for _ in range(5):
+        breaker.record_failure()
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    assert breaker.stats()["breaker_times_opened"] == 2
+
+
+def test_backoff_delay_is_capped():
+    assert all(0 <= backoff_delay(attempt, 0.5, 4.0) <= 4.0 for attempt in range(10))
+    assert backoff_delay(0, 0.0, 4.0) == 0.0
+
+
+@pytest.mark.parametrize(
+    "header, expected", [(None, None), ("3", 3.0), ("-1", 0.0), ("soon", None)]
+)
+def test_retry_after_seconds(header, expected):
+    response = requests.Response()
+    if header is not None:
+        response.headers["Retry-After"] = header
+    assert retry_after_seconds(response) == expected
+
+
+def test_server_errors_are_retried_then_open_breaker(fake_server):
+    fake_server.error_rate = 1.0
+    service = ImageGenerationService(
+        "token", fake_server.url, max_retries=2, backoff_base=0.0, breaker_threshold=1
+    )
+    with pytest.raises(RuntimeError):
+        service.generate_image("cat")
+    assert fake_server.stats()["requests"] == 3
+
+    with pytest.raises(RuntimeError, match="временно недоступен"):
+        service.generate_image("dog")
+    assert fake_server.stats()["requests"] == 3
+    stats = service.stats()
+    assert (stats["calls"], stats["retries"], stats["failures"]) == (1, 2, 1)
+    assert stats["breaker_state"] == "open"
+    service.close()
+
+
+def test_connections_are_reused(fake_server):
+    service = ImageGenerationService("token", fake_server.url, pool_size=1)
+    for text in ("cat", "dog", "fox"):
+        (artifact,) = service.generate_image(text)
+        assert len(artifact["binary"]) == 1024
+    stats = service.stats()
+    assert stats["http_requests"] == 3
+    assert stats["connections_opened"] == 1
+    service.close()
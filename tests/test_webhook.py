@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from telebot import TeleBot
+
+from my_bot.webhook import SECRET_HEADER, create_webhook_app
+
+UPDATE = json.dumps(
+    {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "user"},
+            "text": "hello",
+        },
+    }
+)
+
+
+@pytest.fixture
+def client_and_updates():
+    bot = TeleBot("123456:test", threaded=False)
+    received = []
+    bot.process_new_updates = received.extend
+    app = create_webhook_app(bot, "/hook", "secret")
+    return app.test_client(), received, app.config["WEBHOOK_STATS"]
+
+
+@pytest.mark.parametrize("headers", [{}, {SECRET_HEADER: "wrong"}, {SECRET_HEADER: ""}])
+def test_update_without_valid_secret_is_rejected(client_and_updates, headers):
+    client, received, stats = client_and_updates
+    response = client.post("/hook", data=UPDATE, headers=headers)
+    assert response.status_code == 403
+    assert received == []
+    assert stats == {"accepted": 0, "rejected": 1}
+
+
+def test_update_with_secret_is_processed(client_and_updates):
+    client, received, stats = client_and_updates
+    response = client.post("/hook", data=UPDATE, headers={SECRET_HEADER: "secret"})
+    assert response.status_code == 200
+    assert [update.message.text for update in received] == ["hello"]
+    assert stats == {"accepted": 1, "rejected": 0}
+
+
+def test_empty_secret_is_refused():
+    with pytest.raises(ValueError):
+        create_webhook_app(TeleBot("123456:test", threaded=False), "/hook", "")
+
+
+def test_start_webhook_needs_secret_or_url():
+    from database.core import crud
+    from my_bot.my_bot import Bot
+    from stability_API.stability_ai import ImageGenerationService
+
+    bot = Bot(
+        "123456:test", ImageGenerationService("token", "http://127.0.0.1:9/generate"), crud
+    )
+    with pytest.raises(RuntimeError):
+        bot.start_webhook("127.0.0.1", 0, "", "/hook", "")